@@ -0,0 +1,4 @@
+"""
+Benchmarks of the parsing engines on generated inputs of representative grammars.
+Run `python -m benchmarks --help` from the repository root
+"""
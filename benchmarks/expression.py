@@ -0,0 +1,94 @@
+"""
+Arithmetic expressions with left recursive sums and products, one per line
+"""
+
+import random
+import re
+from pyPars import SyntaxObject, GrammarClass, SelectionFirst, ZeroOrMore
+from pyPars.so_modifiers import TextSaver, SelfReplacable
+
+
+class WS(SyntaxObject, metaclass=GrammarClass):
+    grammar = re.compile("[ \t]*")
+
+
+class Num(SyntaxObject, TextSaver, metaclass=GrammarClass):
+    grammar = re.compile("[0-9]+")
+
+
+class Name(SyntaxObject, TextSaver, metaclass=GrammarClass):
+    grammar = re.compile("[a-z_][a-z0-9_]*")
+
+
+class AddOp(SyntaxObject, TextSaver, metaclass=GrammarClass):
+    grammar = re.compile("[+-]")
+
+
+class MulOp(SyntaxObject, TextSaver, metaclass=GrammarClass):
+    grammar = re.compile("[*/]")
+
+
+class Expression(SyntaxObject, SelfReplacable, metaclass=GrammarClass):
+    grammar = None  # set below, as it references itself
+
+
+class Term(SyntaxObject, SelfReplacable, metaclass=GrammarClass):
+    grammar = None  # set below, as it references itself
+
+
+class Atom(SyntaxObject, SelfReplacable, metaclass=GrammarClass):
+    grammar = (
+        SelectionFirst()
+        / {"self": Num / Name}
+        / ("(", WS, {"self": Expression}, WS, ")")
+    )
+
+
+Expression.grammar = (
+    SelectionFirst()
+    / ({"left": Expression}, WS, {"op": AddOp}, WS, {"right": Term})
+    / {"self": Term}
+)
+
+Term.grammar = (
+    SelectionFirst()
+    / ({"left": Term}, WS, {"op": MulOp}, WS, {"right": Atom})
+    / {"self": Atom}
+)
+
+
+class Program(SyntaxObject, metaclass=GrammarClass):
+    grammar = ZeroOrMore((WS, {"line": Expression}, WS, "\n"))
+
+
+NAMES = ("a", "b", "count", "total", "x_1", "y_2", "width", "height")
+
+
+def generateExpression(rng: random.Random, depth: int) -> str:
+    """
+    Returns an expression with up to depth nested parentheses
+    """
+    parts = []
+    for i in range(rng.randint(1, 5)):
+        if i > 0:
+            parts.append(rng.choice((" + ", " - ", " * ", " / ", "*", "+")))
+        if depth > 0 and rng.random() < 0.3:
+            parts.append("(" + generateExpression(rng, depth - 1) + ")")
+        elif rng.random() < 0.5:
+            parts.append(str(rng.randint(0, 9999)))
+        else:
+            parts.append(rng.choice(NAMES))
+    return "".join(parts)
+
+
+def generate(size: int, depth: int, rng: random.Random) -> str:
+    """
+    Returns lines of expressions, about size characters long
+    """
+    lines = []
+    length = 0
+    while length < size:
+        line = generateExpression(rng, depth) + "\n"
+        lines.append(line)
+        length += len(line)
+    return "".join(lines)
@@ -0,0 +1,80 @@
+"""
+INI configuration files, with comments and dotted section names
+"""
+
+import random
+import re
+from pyPars import SyntaxObject, GrammarClass, SelectionFirst, ZeroOrMore
+from pyPars.so_modifiers import TextSaver
+
+
+class WS(SyntaxObject, metaclass=GrammarClass):
+    grammar = re.compile("[ \t]*")
+
+
+class NL(SyntaxObject, metaclass=GrammarClass):
+    grammar = re.compile("\r?\n")
+
+
+class Comment(SyntaxObject, TextSaver, metaclass=GrammarClass):
+    grammar = re.compile("[;#][^\n]*")
+
+
+class Key(SyntaxObject, TextSaver, metaclass=GrammarClass):
+    grammar = re.compile(r"[A-Za-z0-9_.\-]+")
+
+
+class Value(SyntaxObject, TextSaver, metaclass=GrammarClass):
+    grammar = re.compile("[^\r\n]*")
+
+
+class Entry(SyntaxObject, metaclass=GrammarClass):
+    grammar = {"key": Key}, WS, SelectionFirst("=", ":"), WS, {"value": Value}
+
+
+# an entry, a comment or an empty line
+Line = WS, [SelectionFirst() / {"entry": Entry} / {"comment": Comment}], NL
+
+
+class SectionName(SyntaxObject, TextSaver, metaclass=GrammarClass):
+    grammar = re.compile(r"[^\]\r\n]+")
+
+
+class Section(SyntaxObject, metaclass=GrammarClass):
+    grammar = WS, "[", {"name": SectionName}, "]", WS, NL, ZeroOrMore(Line)
+
+
+class IniFile(SyntaxObject, metaclass=GrammarClass):
+    grammar = ZeroOrMore(Line), ZeroOrMore({"section": Section})
+
+
+WORDS = ("server", "client", "db", "cache", "log", "auth", "http", "paths", "limits")
+
+
+def generate(size: int, depth: int, rng: random.Random) -> str:
+    """
+    Returns an INI file about size characters long,
+    whose section names have up to depth dotted parts
+    """
+    lines = ["; generated configuration\n", "version = 1\n", "\n"]
+    length = sum(len(line) for line in lines)
+    while length < size:
+        name = ".".join(rng.choice(WORDS) for _ in range(rng.randint(1, max(depth, 1))))
+        section = [f"[{name}]\n"]
+        for i in range(rng.randint(1, 12)):
+            if rng.random() < 0.1:
+                section.append(f"# {rng.choice(WORDS)} settings\n")
+            key = f"{rng.choice(WORDS)}_{i}"
+            value = rng.choice(
+                (
+                    str(rng.randint(0, 65535)),
+                    "true",
+                    f"/var/{rng.choice(WORDS)}/{rng.choice(WORDS)}.conf",
+                    " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 6))),
+                )
+            )
+            section.append(f"{key}{rng.choice((' = ', '=', ': '))}{value}\n")
+        section.append("\n")
+        lines.extend(section)
+        length += sum(len(line) for line in section)
+    return "".join(lines)
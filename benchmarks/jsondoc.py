@@ -0,0 +1,100 @@
+"""
+JSON documents, with nested objects and arrays
+"""
+
+import json
+import random
+import re
+from pyPars import SyntaxObject, GrammarClass, ZeroOrMore
+from pyPars.so_modifiers import TextSaver, SelfReplacable
+
+
+class WS(SyntaxObject, metaclass=GrammarClass):
+    grammar = re.compile("[ \t\r\n]*")
+
+
+class String(SyntaxObject, TextSaver, metaclass=GrammarClass):
+    grammar = re.compile(r'"(?:[^"\\]|\\.)*"')
+
+
+class Number(SyntaxObject, TextSaver, metaclass=GrammarClass):
+    grammar = re.compile(r"-?(?:0|[1-9][0-9]*)(?:\.[0-9]+)?(?:[eE][+-]?[0-9]+)?")
+
+
+class Constant(SyntaxObject, TextSaver, metaclass=GrammarClass):
+    grammar = re.compile("true|false|null")
+
+
+class Value(SyntaxObject, SelfReplacable, metaclass=GrammarClass):
+    grammar = None  # set below, as objects and arrays contain values
+
+
+class Member(SyntaxObject, metaclass=GrammarClass):
+    grammar = {"key": String}, WS, ":", WS, {"value": Value}
+
+
+class Object(SyntaxObject, metaclass=GrammarClass):
+    grammar = (
+        "{",
+        WS,
+        [{"member": Member}, WS, ZeroOrMore((",", WS, {"member": Member}, WS))],
+        "}",
+    )
+
+
+class Array(SyntaxObject, metaclass=GrammarClass):
+    grammar = (
+        "[",
+        WS,
+        [{"item": Value}, WS, ZeroOrMore((",", WS, {"item": Value}, WS))],
+        "]",
+    )
+
+
+Value.grammar = {"self": Object / Array / String / Number / Constant}
+
+
+class Document(SyntaxObject, metaclass=GrammarClass):
+    grammar = WS, {"value": Value}, WS
+
+
+WORDS = ("id", "name", "value", "tags", "enabled", "size", "items", "owner", "ratio")
+
+
+def generateValue(rng: random.Random, depth: int):
+    """
+    Returns a Python value with up to depth nested containers
+    """
+    if depth > 0 and rng.random() < 0.6:
+        if rng.random() < 0.5:
+            return [generateValue(rng, depth - 1) for _ in range(rng.randint(0, 4))]
+        return {
+            rng.choice(WORDS) + str(i): generateValue(rng, depth - 1)
+            for i in range(rng.randint(0, 4))
+        }
+    return rng.choice(
+        (
+            rng.randint(-1000, 100000),
+            round(rng.uniform(-1e3, 1e3), 3),
+            " ".join(rng.choice(WORDS) for _ in range(rng.randint(0, 4))),
+            'quoted "text"\n',
+            True,
+            False,
+            None,
+        )
+    )
+
+
+def generate(size: int, depth: int, rng: random.Random) -> str:
+    """
+    Returns a JSON array of records, about size characters long
+    """
+    records = []
+    length = 0
+    while length < size:
+        record = {
+            word: generateValue(rng, depth - 1) for word in rng.sample(WORDS, 4)
+        }
+        records.append(json.dumps(record, indent=2))
+        length += len(records[-1]) + 2
+    return "[\n" + ",\n".join(records) + "\n]\n"
@@ -0,0 +1,314 @@
+"""
+Runs the benchmark workloads with each parsing engine and reports their throughput,
+peak memory and how their time grows with the size of the input
+"""
+
+import argparse
+import json
+import math
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass, asdict
+from typing import Callable
+from pyPars import (
+    SyntaxObject,
+    GrammarClass,
+    parse,
+    compileGrammar,
+    compileArenaGrammar,
+    generateParserModule,
+)
+from pyPars.text.string import StringText
+from . import expression, jsondoc, ini
+
+
+@dataclass
+class Workload:
+    """
+    A grammar and a generator of its inputs.
+    `generate(size, depth, rng)` returns a text of about size characters
+    with up to depth levels of nesting
+    """
+
+    name: str
+    rootClass: GrammarClass
+    generate: Callable[[int, int, random.Random], str]
+
+
+WORKLOADS = {
+    workload.name: workload
+    for workload in (
+        Workload("expression", expression.Program, expression.generate),
+        Workload("json", jsondoc.Document, jsondoc.generate),
+        Workload("ini", ini.IniFile, ini.generate),
+    )
+}
+
+ENGINES = ("recursive", "iterative", "compiled", "generated", "arena")
+
+
+@dataclass
+class BenchmarkResult:
+    """
+    The measurements of one workload parsed with one engine.
+    `seconds` is the best time of the repeated parses, `peakMemory` the most bytes
+    allocated while parsing, including the syntax tree
+    """
+
+    workload: str
+    engine: str
+    size: int
+    depth: int
+    bytes: int
+    nodes: int
+    seconds: float
+    bytesPerSecond: float
+    nodesPerSecond: float
+    peakMemory: int
+
+
+def makeParser(
+    engine: str, rootClass: GrammarClass
+) -> Callable[[StringText, SyntaxObject], int | None]:
+    """
+    Returns a function parsing a text from its start with the given engine
+    """
+    if engine in ("recursive", "iterative"):
+        return lambda mytext, attrStore: parse(
+            mytext, 0, rootClass, attrStore, engine=engine
+        )
+    elif engine == "compiled":
+        grammar = compileGrammar(rootClass)
+        return lambda mytext, attrStore: grammar.parse(mytext, 0, attrStore)
+    elif engine == "generated":
+        namespace = {}
+        exec(generateParserModule(rootClass), namespace)
+        generatedParse = namespace["parse"]
+        return lambda mytext, attrStore: generatedParse(mytext, 0, attrStore)
+    elif engine == "arena":
+        grammar = compileArenaGrammar(rootClass)
+        return lambda mytext, attrStore: grammar.parse(mytext, 0, attrStore)
+    else:
+        raise ValueError(f"Unknown engine '{engine}', expected one of {ENGINES}")
+
+
+def countNodes(syntaxObject: SyntaxObject) -> int:
+    """
+    Returns the number of objects in the tree, counting shared option groups once
+    """
+    count = 0
+    seen = set()
+    pending = [syntaxObject]
+    while len(pending) > 0:
+        current = pending.pop()
+        if id(current) in seen:
+            continue
+        seen.add(id(current))
+        count += 1
+        for grammarAttrName in current.so_grammarAttributeNames:
+            pending.extend(getattr(current, grammarAttrName))
+        for group in current.so_options:
+            pending.extend(group)
+    return count
+
+
+def runBenchmark(
+    workload: Workload,
+    engine: str,
+    size: int,
+    depth: int,
+    repeat: int = 3,
+    seed: int = 0,
+) -> BenchmarkResult:
+    """
+    Parses a generated input of the workload repeat times and measures the best run
+    """
+    text = workload.generate(size, depth, random.Random(seed))
+    parser = makeParser(engine, workload.rootClass)
+
+    seconds = math.inf
+    for _ in range(repeat):
+        attrStore = workload.rootClass()
+        start = time.perf_counter()
+        position = parser(StringText(text), attrStore)
+        seconds = min(seconds, time.perf_counter() - start)
+        if position != len(text):
+            raise RuntimeError(
+                f"The {engine} engine stopped at {position} of {len(text)} in the {workload.name} workload"
+            )
+    nodes = countNodes(attrStore)
+    del attrStore
+
+    # measured on its own run, as tracing the allocations slows parsing down
+    mytext = StringText(text)
+    tracemalloc.start()
+    try:
+        parser(mytext, workload.rootClass())
+        peakMemory = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    byteCount = len(text.encode("utf-8"))
+    return BenchmarkResult(
+        workload.name,
+        engine,
+        size,
+        depth,
+        byteCount,
+        nodes,
+        seconds,
+        byteCount / seconds,
+        nodes / seconds,
+        peakMemory,
+    )
+
+
+def runSuite(
+    workloads: list[str] | None = None,
+    engines: list[str] = ENGINES,
+    sizes: list[int] = (10_000, 30_000, 100_000),
+    depth: int = 4,
+    repeat: int = 3,
+    seed: int = 0,
+    log: Callable[[str], None] | None = None,
+) -> list[BenchmarkResult]:
+    """
+    Runs every workload with every engine at every size
+    """
+    results = []
+    for name in WORKLOADS if workloads is None else workloads:
+        for engine in engines:
+            for size in sizes:
+                result = runBenchmark(
+                    WORKLOADS[name], engine, size, depth, repeat, seed
+                )
+                results.append(result)
+                if log is not None:
+                    log(formatResult(result))
+    return results
+
+
+def formatResult(result: BenchmarkResult) -> str:
+    return (
+        f"{result.workload:<10} {result.engine:<9} {result.bytes:>9} B"
+        f" {result.seconds * 1000:>10.1f} ms"
+        f" {result.bytesPerSecond / 1000:>9.1f} kB/s"
+        f" {result.nodesPerSecond / 1000:>9.1f} knodes/s"
+        f" {result.peakMemory / 1e6:>8.1f} MB"
+    )
+
+
+def scalingExponents(results: list[BenchmarkResult]) -> dict[tuple[str, str], float]:
+    """
+    Returns the slope of log(time) over log(bytes) for each workload and engine
+    measured at more than one size. 1 means the time grows linearly with the input
+    """
+    curves: dict[tuple[str, str], list[BenchmarkResult]] = {}
+    for result in results:
+        curves.setdefault((result.workload, result.engine), []).append(result)
+
+    exponents = {}
+    for key, curve in curves.items():
+        points = [
+            (math.log(result.bytes), math.log(result.seconds)) for result in curve
+        ]
+        if len({x for x, _ in points}) < 2:
+            continue
+        meanX = sum(x for x, _ in points) / len(points)
+        meanY = sum(y for _, y in points) / len(points)
+        exponents[key] = sum((x - meanX) * (y - meanY) for x, y in points) / sum(
+            (x - meanX) ** 2 for x, _ in points
+        )
+    return exponents
+
+
+def saveResults(results: list[BenchmarkResult], path: str) -> None:
+    """
+    Writes the results and a description of the machine to a JSON file
+    """
+    with open(path, "w") as f:
+        json.dump(
+            {
+                "python": sys.version,
+                "platform": platform.platform(),
+                "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "results": [asdict(result) for result in results],
+            },
+            f,
+            indent=2,
+        )
+
+
+def loadResults(path: str) -> list[BenchmarkResult]:
+    with open(path) as f:
+        return [BenchmarkResult(**result) for result in json.load(f)["results"]]
+
+
+def compareResults(
+    baseline: list[BenchmarkResult], results: list[BenchmarkResult]
+) -> str:
+    """
+    Returns a table of the throughput of the results relative to the baseline,
+    for the runs with the same workload, engine, size and depth
+    """
+    baselineRuns = {
+        (result.workload, result.engine, result.size, result.depth): result
+        for result in baseline
+    }
+    lines = []
+    for result in results:
+        old = baselineRuns.get(
+            (result.workload, result.engine, result.size, result.depth)
+        )
+        if old is None:
+            continue
+        lines.append(
+            f"{result.workload:<10} {result.engine:<9} {result.size:>9}"
+            f" {result.bytesPerSecond / old.bytesPerSecond:>6.2f}x speed"
+            f" {result.peakMemory / old.peakMemory:>6.2f}x memory"
+        )
+    return "\n".join(lines)
+
+
+def main(argv: list[str] | None = None) -> None:
+    argParser = argparse.ArgumentParser(
+        prog="python -m benchmarks", description="Benchmarks the pyPars engines"
+    )
+    argParser.add_argument("--workload", action="append", choices=list(WORKLOADS))
+    argParser.add_argument("--engine", action="append", choices=ENGINES)
+    argParser.add_argument(
+        "--sizes",
+        type=lambda value: [int(size) for size in value.split(",")],
+        default=[10_000, 30_000, 100_000],
+        help="comma separated input sizes in characters",
+    )
+    argParser.add_argument("--depth", type=int, default=4)
+    argParser.add_argument("--repeat", type=int, default=3)
+    argParser.add_argument("--seed", type=int, default=0)
+    argParser.add_argument(
+        "--output", help="path of the JSON file to save the results to"
+    )
+    argParser.add_argument("--compare", help="path of saved results to compare with")
+    args = argParser.parse_args(argv)
+
+    results = runSuite(
+        args.workload,
+        ENGINES if args.engine is None else args.engine,
+        args.sizes,
+        args.depth,
+        args.repeat,
+        args.seed,
+        log=print,
+    )
+
+    print()
+    for (workload, engine), exponent in scalingExponents(results).items():
+        print(f"{workload:<10} {engine:<9} time ~ size^{exponent:.2f}")
+    if args.compare is not None:
+        print()
+        print(compareResults(loadResults(args.compare), results))
+    if args.output is not None:
+        saveResults(results, args.output)
@@ -1,5 +1,4 @@
 from pyPars import *
-from pyPars import _
 from pyPars.text.string import *
 from pyPars.so_modifiers import *
 import json
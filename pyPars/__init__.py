@@ -1,9 +1,23 @@
 from ._parsing import *
-from ._syntax_object import SyntaxObject
+from ._syntax_object import SyntaxObject, syntaxClass
+from ._serialize import toJson, writeJson, toTuple
+from ._packed_tree import packTree, PackedTree
+from ._parse_cache import ParseCache, grammarFingerprint
+from ._packrat import PackratMemo, TextEdit
+from ._first_sets import FirstSet, FirstSetAnalysis
+from ._tracing import ParseTracer, RuleProfiler, RuleStats
+from ._compile import compileGrammar, CompiledGrammar
+from ._arena import compileArenaGrammar, ArenaGrammar, ParseArena
+from ._frozen import freezeGrammar, FrozenGrammar, ParserContext
+from ._codegen import generateParserModule, writeParserModule
+from ._batch import parseMany, BatchResult
+from ._chunked import parseChunked
+from ._streaming import iterParse
 from ._rules import (
     Opt,
     OneOrMore,
     ZeroOrMore,
+    Cut,
     Attr,
     atr,
     SelectionFirst,
@@ -0,0 +1,692 @@
+from array import array
+from itertools import accumulate, repeat
+from typing import Any, Iterator
+from .text import Text, NatT, PosT, PatternT, MatchT
+from .text.string import StringText
+from ._syntax_object import SyntaxObject, viewClass
+from ._rules import (
+    Attr,
+    SelectionFirst,
+    Selection,
+    SelectionLongest,
+    Opt,
+    OneOrMore,
+    ZeroOrMore,
+    GrammarClass,
+    GrammarRule,
+)
+from ._rule_canonize import tryMergeLiteralOptions
+from ._parsing import (
+    LeftRecursiveIterationContext,
+    LeftRecursionException,
+    CutFailure,
+    forgetInvolvedRules,
+)
+from ._compile import CompiledGrammar, Matcher
+from . import so_modifiers as mod
+import forward_decl as fw
+
+
+# Class of the nodes that only hold attributes, like the temporary objects of other engines
+TEMP_CLASS = -1
+
+# Names of the edges that aren't attributes:
+# the attributes and option groups of the target are the owner's too
+INCLUDE = -1
+# the target is the first option of a new option group of the owner
+GROUP_START = -2
+# the target is the next option of the owner's last option group
+GROUP_MEMBER = -3
+
+
+class ParseArena:
+    """
+    The nodes parsed by an ArenaGrammar, stored in columns instead of objects.
+    For node i, `nodeClasses[i]` is the index of its class in `classes` (TEMP_CLASS for
+    nodes that only hold attributes) and `spanStarts[i]:spanEnds[i]` the text it spans.
+    Edge j stores `edgeTargets[j]` into node `edgeOwners[j]` under the attribute
+    `attributeNames[edgeNames[j]]`, or is an INCLUDE, GROUP_START or GROUP_MEMBER edge.
+    Node 0 is the root, whose attributes are the ones of the parsed attrStore.
+
+    The query methods work on the columns without creating objects.
+    `getObject()` returns the SyntaxObject of a node, which is created empty and only
+    filled from the arena when one of its attributes is first read. Walking into it
+    creates the objects of its attributes the same way, the rest of the tree isn't built.
+    """
+
+    def __init__(self, grammar: "ArenaGrammar", mytext: Text) -> None:
+        self.grammar = grammar
+        self.mytext = mytext
+        self.classes = grammar.classes
+        self.attributeNames = grammar.attributeNames
+        #: the end of the match, None if it failed
+        self.position: PosT | None = None
+
+        self.nodeClasses = array("i")
+        self.spanStarts = array("q")
+        self.spanEnds = array("q")
+        self.edgeOwners = array("q")
+        self.edgeNames = array("i")
+        self.edgeTargets = array("q")
+        # saved texts of the nodes, for texts that don't keep their content
+        self.texts: dict[int, Any] = {}
+
+        # the edges sorted by owner, and the range of each node's edges in them,
+        # built once the parse is over
+        self.sortedEdges: array | None = None
+        self.edgeOffsets: array | None = None
+        self.parentColumn: array | None = None
+
+        # objects created for the nodes, and the nodes of the ones not filled yet
+        self.objects: dict[int, SyntaxObject] = {}
+        self.unfilledNodes: dict[int, int] = {}
+        self.viewClasses: dict[int, type] = {}
+        self.groups: dict[int, tuple[SyntaxObject, ...]] = {}
+
+    def __len__(self) -> int:
+        return len(self.nodeClasses)
+
+    def newNode(self, classIndex: int, startPos: PosT) -> int:
+        self.nodeClasses.append(classIndex)
+        self.spanStarts.append(startPos)
+        self.spanEnds.append(startPos)
+        return len(self.nodeClasses) - 1
+
+    def addEdge(self, owner: int, nameIndex: int, target: int) -> None:
+        self.edgeOwners.append(owner)
+        self.edgeNames.append(nameIndex)
+        self.edgeTargets.append(target)
+
+    def addOptions(self, owner: int, options: list[int]) -> None:
+        """
+        Same as `SyntaxObject.extendOptions()`
+        """
+        if len(options) == 1:
+            self.addEdge(owner, INCLUDE, options[0])
+            return
+        self.addEdge(owner, GROUP_START, options[0])
+        for option in options[1:]:
+            self.addEdge(owner, GROUP_MEMBER, option)
+
+    def mark(self) -> tuple[int, int]:
+        return len(self.nodeClasses), len(self.edgeOwners)
+
+    def truncate(
+        self,
+        nodeMark: int,
+        edgeMark: int,
+        ruleId2recursionContext: dict[int, LeftRecursiveIterationContext],
+    ) -> None:
+        """
+        Removes the nodes and edges added after the mark by a match that failed,
+        and the recursion contexts of the selections it matched
+        """
+        del self.nodeClasses[nodeMark:]
+        del self.spanStarts[nodeMark:]
+        del self.spanEnds[nodeMark:]
+        del self.edgeOwners[edgeMark:]
+        del self.edgeNames[edgeMark:]
+        del self.edgeTargets[edgeMark:]
+        if len(self.texts) > 0:
+            for node in [node for node in self.texts if node >= nodeMark]:
+                del self.texts[node]
+        if len(ruleId2recursionContext) > 0:
+            for ruleId, recursionContext in list(ruleId2recursionContext.items()):
+                if (
+                    recursionContext is not None
+                    and recursionContext.attrStore >= nodeMark
+                ):
+                    del ruleId2recursionContext[ruleId]
+
+    def seal(self) -> None:
+        """
+        Sorts the edges by owner, once the parse is over
+        """
+        if self.sortedEdges is not None:
+            return
+        # a counting sort, keeping the edges of each owner in the order they were added
+        edgeOwners = self.edgeOwners
+        edgeOffsets = array("q", repeat(0, len(self) + 1))
+        for owner in edgeOwners:
+            edgeOffsets[owner + 1] += 1
+        edgeOffsets = array("q", accumulate(edgeOffsets))
+        positions = edgeOffsets[:-1]
+        sortedEdges = array("q", repeat(0, len(edgeOwners)))
+        for edge, owner in enumerate(edgeOwners):
+            sortedEdges[positions[owner]] = edge
+            positions[owner] += 1
+        self.sortedEdges = sortedEdges
+        self.edgeOffsets = edgeOffsets
+
+    def nodeClass(self, node: int) -> type:
+        classIndex = self.nodeClasses[node]
+        return SyntaxObject if classIndex == TEMP_CLASS else self.classes[classIndex]
+
+    def nodeSpan(self, node: int) -> tuple[PosT, PosT]:
+        return self.spanStarts[node], self.spanEnds[node]
+
+    def nodeText(self, node: int) -> NatT:
+        if node in self.texts:
+            return self.texts[node]
+        return self.mytext[self.spanStarts[node] : self.spanEnds[node]]
+
+    def nodeContent(
+        self, node: int
+    ) -> tuple[list[tuple[int, int]], list[tuple[int, list[int]]]]:
+        """
+        Returns the attribute edges of the node, as (name index, target) pairs,
+        and its option groups, as (first edge, options) pairs.
+        The edges and groups of included nodes are inserted where they were included
+        """
+        self.seal()
+        sortedEdges, edgeOffsets = self.sortedEdges, self.edgeOffsets
+        edgeNames, edgeTargets = self.edgeNames, self.edgeTargets
+        attributes = []
+        groups = []
+        pending = [iter(sortedEdges[edgeOffsets[node] : edgeOffsets[node + 1]])]
+        while len(pending) > 0:
+            for edge in pending[-1]:
+                nameIndex = edgeNames[edge]
+                if nameIndex >= 0:
+                    attributes.append((nameIndex, edgeTargets[edge]))
+                elif nameIndex == INCLUDE:
+                    target = edgeTargets[edge]
+                    pending.append(
+                        iter(sortedEdges[edgeOffsets[target] : edgeOffsets[target + 1]])
+                    )
+                    break
+                elif nameIndex == GROUP_START:
+                    groups.append((edge, [edgeTargets[edge]]))
+                else:
+                    groups[-1][1].append(edgeTargets[edge])
+            else:
+                pending.pop()
+        return attributes, groups
+
+    def attributes(self, node: int) -> list[tuple[str, int]]:
+        """
+        Returns the attribute names and target nodes of the node, without its option groups
+        """
+        return [
+            (self.attributeNames[nameIndex], target)
+            for nameIndex, target in self.nodeContent(node)[0]
+        ]
+
+    def parents(self) -> array:
+        """
+        Returns the column of the parent of each node: the node it is an attribute
+        or an option of. It is -1 for the root and for the nodes of matches that were
+        discarded, which aren't reachable from the root
+        """
+        if self.parentColumn is None:
+            parents = array("q", repeat(-1, len(self)))
+            pending = [0]
+            while len(pending) > 0:
+                node = pending.pop()
+                attributes, groups = self.nodeContent(node)
+                children = [target for _, target in attributes]
+                for _, options in groups:
+                    children.extend(options)
+                for child in children:
+                    if parents[child] == -1 and child != 0:
+                        parents[child] = node
+                        pending.append(child)
+            self.parentColumn = parents
+        return self.parentColumn
+
+    def iterNodes(self, cls: type) -> Iterator[int]:
+        """
+        Yields the nodes of the tree that are instances of cls, in the order they were parsed
+        """
+        classIndices = {
+            index
+            for index, nodeClass in enumerate(self.classes)
+            if issubclass(nodeClass, cls)
+        }
+        parents = self.parents()
+        for node, classIndex in enumerate(self.nodeClasses):
+            if classIndex in classIndices and parents[node] != -1:
+                yield node
+
+    def getObject(self, node: int) -> SyntaxObject:
+        """
+        Returns the object of the node, the same one on every call.
+        It is filled from the arena when one of its attributes is first read.
+        Until then its type is a view subclass of the node's class, so `isinstance()`
+        holds but `type(obj) is cls` doesn't, and caches keyed by `type()` see the view.
+        Use `syntaxClass()` to get the class, it fills the object first
+        """
+        syntaxObject = self.objects.get(node)
+        if syntaxObject is None:
+            viewClass = self.viewClass(self.nodeClasses[node])
+            syntaxObject = object.__new__(viewClass)
+            self.objects[node] = syntaxObject
+            self.unfilledNodes[id(syntaxObject)] = node
+        return syntaxObject
+
+    def viewClass(self, classIndex: int) -> type:
+        """
+        Returns the class of the unfilled objects of a class.
+        It has the layout of the class, so that filling an object turns it into
+        an instance of the class itself
+        """
+        if classIndex not in self.viewClasses:
+            cls = SyntaxObject if classIndex == TEMP_CLASS else self.classes[classIndex]
+            self.viewClasses[classIndex] = viewClass(cls, self.fillObject)
+        return self.viewClasses[classIndex]
+
+    def fillObject(self, syntaxObject: SyntaxObject) -> None:
+        node = self.unfilledNodes.pop(id(syntaxObject))
+        cls = self.nodeClass(node)
+        object.__setattr__(syntaxObject, "__class__", cls)
+        cls.__init__(syntaxObject)
+        if isinstance(syntaxObject, mod.TextSaver):
+            if node in self.texts:
+                syntaxObject.so_savedText = self.texts[node]
+            else:
+                syntaxObject.so_textSource = (
+                    self.mytext,
+                    self.spanStarts[node],
+                    self.spanEnds[node],
+                )
+        if isinstance(syntaxObject, mod.SpanSaver):
+            syntaxObject.so_span = (self.spanStarts[node], self.spanEnds[node])
+        self.extendObject(syntaxObject, node)
+
+    def extendObject(self, syntaxObject: SyntaxObject, node: int) -> None:
+        """
+        Adds the attributes and option groups of the node to the object,
+        creating the objects of the nodes they refer to
+        """
+        attributes, groups = self.nodeContent(node)
+        for nameIndex, target in attributes:
+            syntaxObject.extendGrammarAttribute(
+                self.attributeNames[nameIndex], self.attributeValues(target)
+            )
+        if len(groups) > 0:
+            syntaxObject.addOptionGroups(
+                [self.optionGroup(edge, options) for edge, options in groups]
+            )
+
+    def attributeValues(self, node: int) -> list[SyntaxObject]:
+        """
+        Returns the objects stored in an attribute for a node,
+        replacing SelfReplacable nodes with their `self` attribute
+        """
+        classIndex = self.nodeClasses[node]
+        if classIndex == TEMP_CLASS or not self.grammar.selfReplacable[classIndex]:
+            return [self.getObject(node)]
+        selfTargets = [
+            target
+            for nameIndex, target in self.nodeContent(node)[0]
+            if self.attributeNames[nameIndex] == "self"
+        ]
+        if len(selfTargets) == 0:
+            return [self.getObject(node)]
+        values = []
+        for target in selfTargets:
+            values.extend(self.attributeValues(target))
+        return values
+
+    def optionGroup(self, edge: int, options: list[int]) -> tuple[SyntaxObject, ...]:
+        # groups included by several nodes are shared, like the ones of the objects
+        if edge not in self.groups:
+            self.groups[edge] = tuple(self.getObject(option) for option in options)
+        return self.groups[edge]
+
+
+class ArenaGrammar(CompiledGrammar):
+    """
+    A compiled grammar that stores the parsed nodes in a ParseArena
+    instead of creating an object per node.
+    Its matchers take the node being parsed into instead of the object, and the arena
+    instead of the packrat memo. Failed matches are undone by truncating the arena.
+    Use `compileArenaGrammar()` to make one.
+    """
+
+    def __init__(self, rule: GrammarRule, textType: type[Text]) -> None:
+        # indices of the classes and attribute names in the arena columns
+        self.classes: list[GrammarClass] = []
+        self.classIndices: dict[GrammarClass, int] = {}
+        self.selfReplacable: list[bool] = []
+        self.attributeNames: list[str] = []
+        self.attributeIndices: dict[str, int] = {}
+        super().__init__(rule, textType)
+
+    def classIndex(self, cls: GrammarClass) -> int:
+        if cls not in self.classIndices:
+            self.classIndices[cls] = len(self.classes)
+            self.classes.append(cls)
+            self.selfReplacable.append(issubclass(cls, mod.SelfReplacable))
+        return self.classIndices[cls]
+
+    def attributeIndex(self, name: str) -> int:
+        if name not in self.attributeIndices:
+            self.attributeIndices[name] = len(self.attributeNames)
+            self.attributeNames.append(name)
+        return self.attributeIndices[name]
+
+    def parseArena(
+        self, mytext: Text[NatT, PosT, PatternT, MatchT], pos: PosT
+    ) -> ParseArena:
+        """
+        Parses the grammar at pos and returns the arena of the parsed nodes.
+        Its `position` is the end of the match, or None if it failed
+        """
+        if (
+            mytext.GetNativeType() is not self.NatT
+            or mytext.GetPatternType() is not self.PatternT
+        ):
+            raise TypeError(
+                f"The grammar was compiled for texts like '{self.textType.__name__}', not '{type(mytext).__name__}'"
+            )
+        arena = ParseArena(self, mytext)
+        root = arena.newNode(TEMP_CLASS, pos)
+        try:
+            arena.position = self.matcher(mytext, pos, {}, root, arena)
+        except CutFailure:
+            arena.position = None
+        if arena.position is not None:
+            arena.spanEnds[root] = arena.position
+        return arena
+
+    def parse(
+        self,
+        mytext: Text[NatT, PosT, PatternT, MatchT],
+        pos: PosT,
+        attrStore: SyntaxObject | None = None,
+        memo: None = None,
+    ) -> PosT | None:
+        """
+        Same as `parse()`. The attributes stored in attrStore are objects
+        that are only filled when they are walked into
+        """
+        if memo is not None:
+            raise ValueError("Arena grammars don't support packrat memos")
+        if attrStore is None:
+            attrStore = SyntaxObject()
+        arena = self.parseArena(mytext, pos)
+        arena.extendObject(attrStore, 0)
+        return arena.position
+
+    def compileSelection(self, rule: Selection) -> Matcher:
+        optionMatchers = [self.compileRule(option) for option in rule.options]
+
+        def matchSelection(mytext, startPos, ruleId2recursionContext, currentNode, arena):
+            minPos = None
+            validOptions: list[int] = []
+
+            startMark = arena.mark()
+            for optionMatcher in optionMatchers:
+                nodeMark, edgeMark = arena.mark()
+                tempNode = arena.newNode(TEMP_CLASS, startPos)
+                try:
+                    newPos = optionMatcher(
+                        mytext, startPos, ruleId2recursionContext, tempNode, arena
+                    )
+                except CutFailure:
+                    arena.truncate(*startMark, ruleId2recursionContext)
+                    return None
+                if newPos is None:
+                    arena.truncate(nodeMark, edgeMark, ruleId2recursionContext)
+                elif minPos is None or newPos < minPos:
+                    minPos = newPos
+                    validOptions = [tempNode]
+                elif newPos == minPos:
+                    validOptions.append(tempNode)
+
+            if len(validOptions) > 0:
+                arena.addOptions(currentNode, validOptions)
+            return minPos
+
+        return matchSelection
+
+    def compileSelectionFirst(self, rule: SelectionFirst) -> Matcher:
+        mergedPattern = tryMergeLiteralOptions(rule, self.NatT, self.PatternT)
+        if mergedPattern is not None:
+            return self.compilePattern(mergedPattern)
+
+        ruleId = id(rule)
+        optionMatchers = [self.compileRule(option) for option in rule.options]
+        candidateMatchers = self.compileDispatch(rule.options, optionMatchers)
+
+        def matchSelectionFirst(mytext, startPos, ruleId2recursionContext, currentNode, arena):
+            if ruleId in ruleId2recursionContext:
+                recursionContext = ruleId2recursionContext[ruleId]
+                if recursionContext is None:
+                    raise LeftRecursionException(rule)
+                arena.addEdge(currentNode, INCLUDE, recursionContext.attrStore)
+                return recursionContext.position
+
+            ruleId2recursionContext[ruleId] = None
+
+            # options that have higher priority than the accepted one,
+            # but rely on lower priority options to be accepted first
+            higherPriorityRecursions: list[Matcher] = []
+
+            newPos = None
+            for optionMatcher in candidateMatchers(mytext, startPos):
+                # unlike Opt and repetitions, each option gets a node of its own:
+                # the recursion context refers to the accepted one, which is included
+                # again when the selection is reached at the same position, and is
+                # replaced by the options that grow the left recursion
+                nodeMark, edgeMark = arena.mark()
+                tempNode = arena.newNode(TEMP_CLASS, startPos)
+                try:
+                    newPos = optionMatcher(
+                        mytext, startPos, ruleId2recursionContext, tempNode, arena
+                    )
+                except LeftRecursionException as e:
+                    arena.truncate(nodeMark, edgeMark, ruleId2recursionContext)
+                    if e.grammar_cls is rule:
+                        higherPriorityRecursions.append(optionMatcher)
+                        continue
+                    del ruleId2recursionContext[ruleId]
+                    raise
+                except CutFailure:
+                    arena.truncate(nodeMark, edgeMark, ruleId2recursionContext)
+                    del ruleId2recursionContext[ruleId]
+                    return None
+
+                if newPos is not None:
+                    recursionContext = LeftRecursiveIterationContext(newPos, tempNode)
+                    ruleId2recursionContext[ruleId] = recursionContext
+                    break
+                arena.truncate(nodeMark, edgeMark, ruleId2recursionContext)
+
+            if newPos is None:
+                del ruleId2recursionContext[ruleId]
+                return None
+
+            # grow the match with the options that recurse to the left
+            tryRecursions = len(higherPriorityRecursions) > 0
+            # rules entered by the growing options are involved in the recursion,
+            # so their contexts are dropped after each attempt while the seed is reused
+            outerRuleIds = set(ruleId2recursionContext)
+            while tryRecursions:
+                tryRecursions = False
+                indexReached = 0
+                for indexReached, optionMatcher in enumerate(higherPriorityRecursions):
+                    nodeMark, edgeMark = arena.mark()
+                    tempNode = arena.newNode(TEMP_CLASS, startPos)
+                    try:
+                        newPos = optionMatcher(
+                            mytext, startPos, ruleId2recursionContext, tempNode, arena
+                        )
+                    except CutFailure:
+                        # a committed option failed to grow the match, keep what it has
+                        arena.truncate(nodeMark, edgeMark, ruleId2recursionContext)
+                        forgetInvolvedRules(ruleId2recursionContext, outerRuleIds)
+                        break
+                    forgetInvolvedRules(ruleId2recursionContext, outerRuleIds)
+                    if newPos is not None and newPos > recursionContext.position:
+                        tryRecursions = True
+                        recursionContext.position = newPos
+                        recursionContext.attrStore = tempNode
+                        break
+                    arena.truncate(nodeMark, edgeMark, ruleId2recursionContext)
+                higherPriorityRecursions = higherPriorityRecursions[
+                    0 : indexReached + 1
+                ]
+
+            recursionContext.complete = True
+            arena.addEdge(currentNode, INCLUDE, recursionContext.attrStore)
+            return recursionContext.position
+
+        return matchSelectionFirst
+
+    def compileSelectionLongest(self, rule: SelectionLongest) -> Matcher:
+        mergedPattern = tryMergeLiteralOptions(rule, self.NatT, self.PatternT)
+        if mergedPattern is not None:
+            return self.compilePattern(mergedPattern)
+
+        ruleId = id(rule)
+        optionMatchers = [self.compileRule(option) for option in rule.options]
+
+        def matchSelectionLongest(mytext, startPos, ruleId2recursionContext, currentNode, arena):
+            if ruleId in ruleId2recursionContext:
+                recursionContext = ruleId2recursionContext[ruleId]
+                if recursionContext is None:
+                    raise LeftRecursionException(rule)
+                arena.addEdge(currentNode, INCLUDE, recursionContext.attrStore)
+                return recursionContext.position
+            ruleId2recursionContext[ruleId] = None
+
+            maxpos = None
+            longestOptions: list[int] = []
+            startMark = arena.mark()
+            for optionMatcher in optionMatchers:
+                nodeMark, edgeMark = arena.mark()
+                tempNode = arena.newNode(TEMP_CLASS, startPos)
+                try:
+                    newPos = optionMatcher(
+                        mytext, startPos, ruleId2recursionContext, tempNode, arena
+                    )
+                except LeftRecursionException:
+                    arena.truncate(*startMark, ruleId2recursionContext)
+                    del ruleId2recursionContext[ruleId]
+                    raise
+                except CutFailure:
+                    arena.truncate(*startMark, ruleId2recursionContext)
+                    del ruleId2recursionContext[ruleId]
+                    return None
+                if newPos is not None and (maxpos is None or newPos >= maxpos):
+                    if maxpos is None or newPos > maxpos:
+                        maxpos = newPos
+                        longestOptions = []
+                    longestOptions.append(tempNode)
+                else:
+                    arena.truncate(nodeMark, edgeMark, ruleId2recursionContext)
+
+            if maxpos is None:
+                del ruleId2recursionContext[ruleId]
+                return None
+
+            resultNode = arena.newNode(TEMP_CLASS, startPos)
+            arena.addOptions(resultNode, longestOptions)
+            ruleId2recursionContext[ruleId] = LeftRecursiveIterationContext(
+                maxpos, resultNode, True
+            )
+            arena.addEdge(currentNode, INCLUDE, resultNode)
+            return maxpos
+
+        return matchSelectionLongest
+
+    def compileOpt(self, rule: Opt) -> Matcher:
+        ruleMatcher = self.compileRule(rule.rule)
+
+        def matchOpt(mytext, startPos, ruleId2recursionContext, currentNode, arena):
+            # parsed into the node itself, a failed match is truncated away
+            nodeMark, edgeMark = arena.mark()
+            newPos = ruleMatcher(
+                mytext, startPos, ruleId2recursionContext, currentNode, arena
+            )
+            if newPos is None:
+                arena.truncate(nodeMark, edgeMark, ruleId2recursionContext)
+                return startPos
+            return newPos
+
+        return matchOpt
+
+    def compileRepetition(self, rule: OneOrMore | ZeroOrMore) -> Matcher:
+        ruleMatcher = self.compileRule(rule.rule)
+        firstRequired = isinstance(rule, OneOrMore)
+
+        def matchRepetition(mytext, startPos, ruleId2recursionContext, currentNode, arena):
+            nodeMark, edgeMark = arena.mark()
+            newPos = ruleMatcher(
+                mytext, startPos, ruleId2recursionContext, currentNode, arena
+            )
+            if newPos is None:
+                arena.truncate(nodeMark, edgeMark, ruleId2recursionContext)
+                return None if firstRequired else startPos
+
+            while newPos is not None:
+                startPos = newPos
+                nodeMark, edgeMark = arena.mark()
+                recursionContexts = {}
+                newPos = ruleMatcher(
+                    mytext, startPos, recursionContexts, currentNode, arena
+                )
+            arena.truncate(nodeMark, edgeMark, recursionContexts)
+            return startPos
+
+        return matchRepetition
+
+    def compileAttr(self, rule: Attr) -> Matcher:
+        nameIndex = self.attributeIndex(rule.name)
+        attrClasses: list[GrammarClass] = []
+        for attrClass in rule.attrClasses.options:
+            if isinstance(attrClass, fw.OpaqueFwRef):
+                attrClass = attrClass.get_ref()
+            if not isinstance(attrClass, GrammarClass):
+                raise ValueError(
+                    f"An attribute rule's attrClasses must be of GrammarClass or SelectionFirst[GrammarClass] type."
+                )
+            self.compileGrammarClass(attrClass)
+            attrClasses.append(attrClass)
+        classMatchers = self.classMatchers
+        candidateClasses = self.compileDispatch(
+            attrClasses,
+            [
+                (
+                    attrClass,
+                    self.classIndex(attrClass),
+                    issubclass(attrClass, mod.TextSaver),
+                )
+                for attrClass in attrClasses
+            ],
+        )
+
+        def matchAttr(mytext, startPos, ruleId2recursionContext, currentNode, arena):
+            for attrClass, classIndex, savesText in candidateClasses(mytext, startPos):
+                nodeMark, edgeMark = arena.mark()
+                newNode = arena.newNode(classIndex, startPos)
+                try:
+                    newPos = classMatchers[attrClass](
+                        mytext, startPos, ruleId2recursionContext, newNode, arena
+                    )
+                except CutFailure:
+                    newPos = None
+                if newPos is None:
+                    arena.truncate(nodeMark, edgeMark, ruleId2recursionContext)
+                    continue
+
+                arena.spanEnds[newNode] = newPos
+                if savesText and not mytext.keepsContent:
+                    arena.texts[newNode] = mytext[startPos:newPos]
+                arena.addEdge(currentNode, nameIndex, newNode)
+                return newPos
+            return None
+
+        return matchAttr
+
+
+def compileArenaGrammar(
+    rule: GrammarRule, textType: type[Text] = StringText
+) -> ArenaGrammar:
+    """
+    Compiles the grammar into an ArenaGrammar, which parses instances of textType into
+    a ParseArena and builds the objects of the nodes only when they are walked into
+    """
+    return ArenaGrammar(rule, textType)
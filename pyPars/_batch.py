@@ -0,0 +1,147 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from os import PathLike
+from typing import Iterable, Iterator
+from .text import Text, PosT
+from .text.string import StringText
+from .text.bytes import MmapText
+from ._syntax_object import SyntaxObject
+from ._rules import GrammarClass
+from ._compile import compileGrammar, CompiledGrammar
+from ._packed_tree import packTree, PackedTree
+
+
+@dataclass
+class BatchResult:
+    """
+    The result of parsing one document of a batch.
+    `index` is the position of the document in the batch and `path` its path, if it was read from a file.
+    `position` is the end of the match, or None if the document couldn't be parsed.
+    `syntaxObject` is a PackedTree of the parsed object if the batch was parsed with `packed`
+    """
+
+    index: int
+    path: PathLike | None
+    position: PosT | None
+    syntaxObject: SyntaxObject | PackedTree
+
+
+# The grammar of the current worker process, compiled once when the worker starts
+_workerGrammar: CompiledGrammar | None = None
+_workerEncoding: str = "utf-8"
+_workerPacked: bool = False
+
+
+def initWorker(
+    rootClass: GrammarClass, textType: type[Text], encoding: str, packed: bool
+) -> None:
+    global _workerGrammar, _workerEncoding, _workerPacked
+    _workerGrammar = compileGrammar(rootClass, textType)
+    _workerEncoding = encoding
+    _workerPacked = packed
+
+
+def checkSource(source: str | bytes | PathLike, textType: type[Text]) -> None:
+    """
+    Raises a TypeError if the source can't be parsed as a textType
+    """
+    if isinstance(source, PathLike):
+        return
+    if issubclass(textType, MmapText):
+        raise TypeError(
+            f"Only paths can be parsed as '{textType.__name__}', not '{type(source).__name__}'"
+        )
+    NatT = textType.GetNativeType()
+    bytesLike = isinstance(source, (bytes, bytearray, memoryview))
+    if issubclass(NatT, bytes) != bytesLike:
+        raise TypeError(
+            f"Texts of type '{textType.__name__}' can't be made of '{type(source).__name__}' sources"
+        )
+
+
+def openText(source: str | bytes | PathLike, textType: type[Text]) -> Text:
+    """
+    Returns the text of a source. Files are read in binary mode for bytes text types,
+    and mapped for MmapText
+    """
+    if not isinstance(source, PathLike):
+        return textType(source)
+    if issubclass(textType, MmapText):
+        return textType(source)
+    if issubclass(textType.GetNativeType(), bytes):
+        with open(source, "rb") as file:
+            return textType(file.read())
+    with open(source, encoding=_workerEncoding) as file:
+        return textType(file.read())
+
+
+def parseChunk(chunk: list[tuple[int, str | bytes | PathLike]]) -> list[BatchResult]:
+    """
+    Parses the documents of a chunk in a worker process
+    """
+    results = []
+    for index, source in chunk:
+        mytext = openText(source, _workerGrammar.textType)
+        syntaxObject = _workerGrammar.rule()
+        position = _workerGrammar.parse(mytext, mytext.getStartPos(), syntaxObject)
+        results.append(
+            BatchResult(
+                index,
+                source if isinstance(source, PathLike) else None,
+                position,
+                packTree(syntaxObject, mytext) if _workerPacked else syntaxObject,
+            )
+        )
+    return results
+
+
+def parseMany(
+    sources: Iterable[str | bytes | PathLike],
+    rootClass: GrammarClass,
+    workers: int | None = None,
+    textType: type[Text] = StringText,
+    ordered: bool = True,
+    chunkSize: int = 16,
+    encoding: str = "utf-8",
+    packed: bool = False,
+) -> Iterator[BatchResult]:
+    """
+    Parses many documents as instances of rootClass in a pool of worker processes.
+    Paths (os.PathLike objects) are read by the workers, strings are parsed as texts.
+    With a bytes text type, like BytesText, the files are read in binary mode,
+    `encoding` is ignored and the texts given directly must be bytes.
+    MmapText maps the files, so it only takes paths.
+
+    The grammar is sent to each worker once and compiled there,
+    the documents are sent in chunks of chunkSize to keep the overhead low.
+    With `ordered`, the results are yielded in the order of the sources,
+    otherwise as soon as their chunk is parsed.
+    `workers` is the number of processes, None means one per CPU.
+    The grammar classes must be importable by the workers, so that their objects can be sent back.
+    With `packed`, the workers send back PackedTrees, which are smaller and faster to transfer
+    than the objects, and are only built when they are accessed.
+    """
+    if chunkSize < 1:
+        raise ValueError("chunkSize must be a positive number")
+
+    executor = ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=initWorker,
+        initargs=(rootClass, textType, encoding, packed),
+    )
+    try:
+        futures = []
+        chunk = []
+        for index, source in enumerate(sources):
+            checkSource(source, textType)
+            chunk.append((index, source))
+            if len(chunk) == chunkSize:
+                futures.append(executor.submit(parseChunk, chunk))
+                chunk = []
+        if len(chunk) > 0:
+            futures.append(executor.submit(parseChunk, chunk))
+
+        for future in futures if ordered else as_completed(futures):
+            yield from future.result()
+    finally:
+        executor.shutdown(cancel_futures=True)
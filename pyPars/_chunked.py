@@ -0,0 +1,171 @@
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator
+import os
+import re
+from .text import Text
+from .text.string import StringText
+from ._syntax_object import SyntaxObject
+from ._rules import OneOrMore, ZeroOrMore, GrammarClass
+from ._rule_canonize import tryCanonize
+from ._compile import compileGrammar, CompiledGrammar
+from ._packrat import shiftSpans
+
+
+# The grammar of a repetition item in the current worker process, compiled once when the worker starts
+_workerItemGrammar: CompiledGrammar | None = None
+
+
+def repetitionOf(rootClass: GrammarClass) -> OneOrMore | ZeroOrMore:
+    repetition = tryCanonize(rootClass.grammar)
+    if not isinstance(repetition, (OneOrMore, ZeroOrMore)):
+        raise ValueError(
+            f"The grammar of '{rootClass.__name__}' must be a repetition to be parsed in chunks"
+        )
+    return repetition
+
+
+def initChunkWorker(rootClass: GrammarClass, textType: type[Text]) -> None:
+    global _workerItemGrammar
+    _workerItemGrammar = compileGrammar(repetitionOf(rootClass).rule, textType)
+
+
+def parseItems(
+    itemGrammar: CompiledGrammar,
+    mytext: Text,
+    pos: int,
+    attrStore: SyntaxObject,
+    stopPositions: set[int] = frozenset(),
+) -> tuple[int, int]:
+    """
+    Parses repetition items into attrStore until one fails or a stop position is reached.
+    Returns the position after the last item and the number of parsed items
+    """
+    count = 0
+    while True:
+        tempObject = SyntaxObject()
+        newPos = itemGrammar.parse(mytext, pos, tempObject)
+        if newPos is None or newPos == pos:
+            return pos, count
+        attrStore.extend(tempObject)
+        pos = newPos
+        count += 1
+        if pos in stopPositions:
+            return pos, count
+
+
+def parseChunk(chunkText: str, offset: int) -> tuple[int, SyntaxObject, int]:
+    """
+    Parses the repetition items of a chunk in a worker process.
+    Returns the absolute position after the last item, the object with their attributes and their number
+    """
+    mytext = _workerItemGrammar.textType(chunkText)
+    chunkObject = SyntaxObject()
+    pos, count = parseItems(_workerItemGrammar, mytext, 0, chunkObject)
+    shiftSpans(chunkObject, offset, set())
+    return pos + offset, chunkObject, count
+
+
+def chunkBoundaries(text: str, syncPattern: re.Pattern, chunkSize: int) -> list[int]:
+    """
+    Returns the start of each chunk and the end of the text.
+    Each chunk ends right after the first synchronization point that follows chunkSize characters
+    """
+    boundaries = [0]
+    while boundaries[-1] + chunkSize < len(text):
+        m = syncPattern.search(text, boundaries[-1] + chunkSize)
+        if m is None or m.end() >= len(text):
+            break
+        boundaries.append(m.end())
+    boundaries.append(len(text))
+    return boundaries
+
+
+def iterChunkResults(
+    executor: ProcessPoolExecutor, text: str, boundaries: list[int], window: int
+) -> Iterator[tuple[int, SyntaxObject, int]]:
+    """
+    Yields the results of parseChunk for the chunks in order.
+    A chunk is sliced and sent when fewer than window chunks are pending,
+    so only those chunks are copied out of the text at once
+    """
+    pending = deque()
+    for start, end in zip(boundaries, boundaries[1:]):
+        pending.append(executor.submit(parseChunk, text[start:end], start))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while len(pending) > 0:
+        yield pending.popleft().result()
+
+
+def parseChunked(
+    text: str,
+    rootClass: GrammarClass,
+    syncPattern: re.Pattern | str,
+    attrStore: SyntaxObject | None = None,
+    workers: int | None = None,
+    chunkSize: int = 1 << 20,
+    textType: type[Text] = StringText,
+) -> int | None:
+    """
+    Same as `parse(textType(text), 0, rootClass, attrStore)` for a rootClass whose grammar
+    is a repetition, but parses the chunks of the text in a pool of worker processes.
+
+    The text is split right after the matches of syncPattern,
+    which must be places where a repetition item can start and that no item crosses or looks past,
+    such as the line ends between statements.
+    The attributes of the chunks are appended in order, with their spans moved to the whole text.
+    If a chunk can't be parsed up to its end, the items after it are parsed one by one
+    until they reach the start of a later chunk again.
+    The chunks are copied to the workers a few at a time, so the memory used for them
+    depends on the number of workers and chunkSize, not on the size of the text.
+    Returns the end position of the repetition or None if it failed
+    """
+    if isinstance(syncPattern, str):
+        syncPattern = re.compile(syncPattern)
+    if chunkSize < 1:
+        raise ValueError("chunkSize must be a positive number")
+    if attrStore is None:
+        attrStore = SyntaxObject()
+
+    repetition = repetitionOf(rootClass)
+    boundaries = chunkBoundaries(text, syncPattern, chunkSize)
+    chunkStarts = set(boundaries[1:-1])
+    itemGrammar: CompiledGrammar | None = None
+    mytext: Text | None = None
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    pos = 0
+    itemCount = 0
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=initChunkWorker,
+        initargs=(rootClass, textType),
+    ) as executor:
+        # two chunks per worker keep the workers busy while their results are received
+        chunkResults = iterChunkResults(executor, text, boundaries, 2 * workers)
+        for chunkIndex, (chunkEnd, chunkObject, count) in enumerate(chunkResults):
+            if pos != boundaries[chunkIndex]:
+                # the items parsed one by one went past this chunk
+                continue
+
+            attrStore.extend(chunkObject)
+            pos = chunkEnd
+            itemCount += count
+            if pos == boundaries[chunkIndex + 1]:
+                continue
+
+            # an item crossed the end of the chunk, or the repetition ended in it
+            if itemGrammar is None:
+                itemGrammar = compileGrammar(repetition.rule, textType)
+                mytext = textType(text)
+            pos, count = parseItems(itemGrammar, mytext, pos, attrStore, chunkStarts)
+            itemCount += count
+            if pos not in chunkStarts:
+                break
+
+    if isinstance(repetition, OneOrMore) and itemCount == 0:
+        return None
+    return pos
@@ -0,0 +1,414 @@
+from typing import Any
+from .text import Text, NatT, PatternT
+from .text.string import StringText
+from ._rules import (
+    Concat,
+    Opt,
+    OneOrMore,
+    ZeroOrMore,
+    Cut,
+    Attr,
+    SelectionFirst,
+    Selection,
+    SelectionLongest,
+    GrammarClass,
+    GrammarRule,
+)
+from ._rule_canonize import tryCanonize, tryMergeLiteralOptions
+import forward_decl as fw
+
+
+class ParserModuleGenerator:
+    """
+    Generates the source of a Python module that parses the given grammar.
+    The module has one function per rule with the literals and patterns inlined,
+    so nothing needs to be canonized or interpreted when it is imported or run.
+    Use `generateParserModule()` or `writeParserModule()`.
+    """
+
+    def __init__(self, rule: GrammarRule, textType: type[Text] = StringText) -> None:
+        self.rule = rule
+        self.NatT = textType.GetNativeType()
+        self.PatternT = textType.GetPatternType()
+
+        self.functions: list[list[str]] = []
+        # id of a rule object -> name of the function that parses it
+        self.ruleNames: dict[int, str] = {}
+        # keeps the rule objects alive, so their ids stay unique while generating
+        self.visitedRules: list[Any] = []
+        self.classNames: dict[GrammarClass, str] = {}
+        self.classImports: list[str] = []
+        self.patternNames: dict[tuple, str] = {}
+        self.patternDefinitions: list[str] = []
+        self.nextNodeId = 0
+
+        self.rootName = self.ruleFunction(rule)
+
+    def source(self) -> str:
+        lines = [
+            '"""',
+            f"Parser for {self.rule!r}, generated by pyPars.",
+            "Do not edit, regenerate it from the grammar instead.",
+            '"""',
+            "import re",
+            "from pyPars._syntax_object import SyntaxObject",
+            "from pyPars._parsing import (",
+            "    LeftRecursiveIterationContext,",
+            "    LeftRecursionException,",
+            "    CutFailure,",
+            "    finalizeSyntaxObject,",
+            "    forgetInvolvedRules,",
+            ")",
+        ]
+        lines += self.classImports
+        lines.append("")
+        lines += self.patternDefinitions
+        for function in self.functions:
+            lines += ["", ""] + function
+        lines += [
+            "",
+            "",
+            "def parse(mytext, pos, attrStore=None, memo=None):",
+            "    if attrStore is None:",
+            "        attrStore = SyntaxObject()",
+            "    try:",
+            f"        return {self.rootName}(mytext, pos, {{}}, attrStore, memo)",
+            "    except CutFailure:",
+            "        return None",
+            "",
+        ]
+        return "\n".join(lines)
+
+    def newName(self, kind: str) -> str:
+        self.nextNodeId += 1
+        return f"_{kind}_{self.nextNodeId}"
+
+    def classReference(self, cls: GrammarClass) -> str:
+        if cls not in self.classNames:
+            if cls.__module__ == "__main__" or "<locals>" in cls.__qualname__:
+                raise ValueError(
+                    f"Class '{cls.__qualname__}' must be importable from its module to generate a parser for it"
+                )
+            topName, *attrPath = cls.__qualname__.split(".")
+            alias = self.newName(f"cls_{cls.__name__}")
+            self.classImports.append(
+                f"from {cls.__module__} import {topName} as {alias}"
+            )
+            if len(attrPath) > 0:
+                self.classImports.append(f"{alias} = {alias}.{'.'.join(attrPath)}")
+            self.classNames[cls] = alias
+        return self.classNames[cls]
+
+    def patternReference(self, pattern: PatternT) -> str:
+        key = (pattern.pattern, pattern.flags)
+        if key not in self.patternNames:
+            name = self.newName("pattern").upper()
+            self.patternDefinitions.append(
+                f"{name} = re.compile({pattern.pattern!r}, {pattern.flags})"
+            )
+            self.patternNames[key] = name
+        return self.patternNames[key]
+
+    def matchLines(
+        self, rule: GrammarRule, pos: str, ctx: str, obj: str, target: str
+    ) -> list[str]:
+        """
+        Returns the lines that parse the rule and assign the end position (or None) to target.
+        Literals and patterns are inlined, other rules call their functions.
+        """
+        if isinstance(rule, self.NatT):
+            return [
+                f"m = mytext.startswith({rule!r}, {pos})",
+                f"{target} = None if m is None else m.span[1]",
+            ]
+        elif isinstance(rule, self.PatternT):
+            return [
+                f"m = mytext.matchedby({self.patternReference(rule)}, {pos})",
+                f"{target} = None if m is None else m.span[1]",
+            ]
+        elif rule is Cut:
+            return [f"{target} = {pos}"]
+        else:
+            return [
+                f"{target} = {self.ruleFunction(rule)}(mytext, {pos}, {ctx}, {obj}, memo)"
+            ]
+
+    def ruleFunction(self, rule: GrammarRule) -> str:
+        """
+        Returns the name of the function that parses the rule, generating it if needed
+        """
+        if isinstance(rule, fw.OpaqueFwRef):
+            rule = rule.get_ref()
+        if id(rule) in self.ruleNames:
+            return self.ruleNames[id(rule)]
+        self.visitedRules.append(rule)
+
+        canonRule = tryCanonize(rule)
+        if isinstance(canonRule, GrammarClass):
+            name = self.newName(f"grammar_{canonRule.__name__}")
+        else:
+            name = self.newName(type(canonRule).__name__.lower())
+        # register the name before generating the body, as rules can reference themselves
+        self.ruleNames[id(rule)] = name
+
+        header = f"def {name}(mytext, startPos, ruleId2recursionContext, currentObject, memo):"
+        if isinstance(canonRule, (SelectionFirst, SelectionLongest)):
+            # selections of literals are matched by a single pattern
+            mergedPattern = tryMergeLiteralOptions(canonRule, self.NatT, self.PatternT)
+            if mergedPattern is not None:
+                canonRule = mergedPattern
+        if (
+            isinstance(canonRule, self.NatT)
+            or isinstance(canonRule, self.PatternT)
+            or canonRule is Cut
+        ):
+            body = self.matchLines(
+                canonRule, "startPos", "", "", "newPos"
+            ) + ["return newPos"]
+        elif isinstance(canonRule, Concat):
+            body = self.concatBody(canonRule)
+        elif isinstance(canonRule, Selection):
+            body = self.selectionBody(canonRule)
+        elif isinstance(canonRule, SelectionFirst):
+            body = self.selectionFirstBody(canonRule)
+        elif isinstance(canonRule, SelectionLongest):
+            body = self.selectionLongestBody(canonRule)
+        elif isinstance(canonRule, Opt):
+            body = self.optBody(canonRule)
+        elif isinstance(canonRule, OneOrMore) or isinstance(canonRule, ZeroOrMore):
+            body = self.repetitionBody(canonRule)
+        elif isinstance(canonRule, Attr):
+            body = self.attrBody(canonRule)
+        elif isinstance(canonRule, GrammarClass):
+            body = self.matchLines(
+                canonRule.grammar,
+                "startPos",
+                "ruleId2recursionContext",
+                "currentObject",
+                "newPos",
+            ) + ["return newPos"]
+        else:
+            raise ValueError(f"The rule argument is not of a GrammarRule type")
+
+        self.functions.append([header] + ["    " + line for line in body])
+        return name
+
+    def concatBody(self, rule: Concat) -> list[str]:
+        body = ["newPos = startPos"]
+        # only the first part starts at the same position, so only it can recurse to the left
+        ctx = "ruleId2recursionContext"
+        committed = False
+        for rulepart in rule.items:
+            if rulepart is Cut:
+                committed = True
+                continue
+            body += self.matchLines(rulepart, "newPos", ctx, "currentObject", "newPos")
+            body += [
+                "if newPos is None:",
+                "    raise CutFailure()" if committed else "    return None",
+            ]
+            ctx = "{}"
+        return body + ["return newPos"]
+
+    def optionsTuple(self, options: list[GrammarRule]) -> str:
+        return "(" + "".join(self.ruleFunction(opt) + ", " for opt in options) + ")"
+
+    def selectionBody(self, rule: Selection) -> list[str]:
+        return [
+            "minPos = None",
+            "validOptions = []",
+            f"for option in {self.optionsTuple(rule.options)}:",
+            "    tempObject = SyntaxObject()",
+            "    try:",
+            "        newPos = option(mytext, startPos, ruleId2recursionContext, tempObject, memo)",
+            "    except CutFailure:",
+            "        return None",
+            "    if newPos is not None:",
+            "        if minPos is None or newPos < minPos:",
+            "            minPos = newPos",
+            "            validOptions = [tempObject]",
+            "        elif newPos == minPos:",
+            "            validOptions.append(tempObject)",
+            "if len(validOptions) > 0:",
+            "    currentObject.extendOptions(validOptions)",
+            "return minPos",
+        ]
+
+    def visitedCheckLines(self, ruleKey: str) -> list[str]:
+        return [
+            f"if {ruleKey} in ruleId2recursionContext:",
+            f"    recursionContext = ruleId2recursionContext[{ruleKey}]",
+            "    if recursionContext is None:",
+            f"        raise LeftRecursionException({ruleKey})",
+            "    if memo is not None and not recursionContext.complete:",
+            "        memo.seedReads.append(recursionContext)",
+            "    currentObject.extend(recursionContext.attrStore)",
+            "    return recursionContext.position",
+            f"ruleId2recursionContext[{ruleKey}] = None",
+        ]
+
+    def selectionFirstBody(self, rule: SelectionFirst) -> list[str]:
+        ruleKey = repr(self.newName("selectionFirst"))
+        return self.visitedCheckLines(ruleKey) + [
+            "higherPriorityRecursions = []",
+            "newPos = None",
+            f"for option in {self.optionsTuple(rule.options)}:",
+            "    tempObject = SyntaxObject()",
+            "    try:",
+            "        newPos = option(mytext, startPos, ruleId2recursionContext, tempObject, memo)",
+            "    except LeftRecursionException as e:",
+            f"        if e.grammar_cls == {ruleKey}:",
+            "            higherPriorityRecursions.append(option)",
+            "            continue",
+            f"        del ruleId2recursionContext[{ruleKey}]",
+            "        raise",
+            "    except CutFailure:",
+            f"        del ruleId2recursionContext[{ruleKey}]",
+            "        return None",
+            "    if newPos is not None:",
+            "        recursionContext = LeftRecursiveIterationContext(newPos, tempObject)",
+            f"        ruleId2recursionContext[{ruleKey}] = recursionContext",
+            "        break",
+            "if newPos is None:",
+            f"    del ruleId2recursionContext[{ruleKey}]",
+            "    return None",
+            "tryRecursions = len(higherPriorityRecursions) > 0",
+            "outerRuleIds = set(ruleId2recursionContext)",
+            "while tryRecursions:",
+            "    tryRecursions = False",
+            "    indexReached = 0",
+            "    for indexReached, option in enumerate(higherPriorityRecursions):",
+            "        tempObject = SyntaxObject()",
+            "        try:",
+            "            newPos = option(mytext, startPos, ruleId2recursionContext, tempObject, memo)",
+            "        except CutFailure:",
+            "            forgetInvolvedRules(ruleId2recursionContext, outerRuleIds)",
+            "            break",
+            "        forgetInvolvedRules(ruleId2recursionContext, outerRuleIds)",
+            "        if newPos is not None and newPos > recursionContext.position:",
+            "            tryRecursions = True",
+            "            recursionContext.position = newPos",
+            "            recursionContext.attrStore = tempObject",
+            "            break",
+            "    higherPriorityRecursions = higherPriorityRecursions[0 : indexReached + 1]",
+            "recursionContext.complete = True",
+            "currentObject.extend(recursionContext.attrStore)",
+            "return recursionContext.position",
+        ]
+
+    def selectionLongestBody(self, rule: SelectionLongest) -> list[str]:
+        ruleKey = repr(self.newName("selectionLongest"))
+        return self.visitedCheckLines(ruleKey) + [
+            "maxpos = None",
+            "multiAttrStores = []",
+            f"for option in {self.optionsTuple(rule.options)}:",
+            "    tempObject = SyntaxObject()",
+            "    try:",
+            "        newPos = option(mytext, startPos, ruleId2recursionContext, tempObject, memo)",
+            "    except LeftRecursionException:",
+            f"        del ruleId2recursionContext[{ruleKey}]",
+            "        raise",
+            "    except CutFailure:",
+            f"        del ruleId2recursionContext[{ruleKey}]",
+            "        return None",
+            "    if newPos is not None and (maxpos is None or newPos >= maxpos):",
+            "        if maxpos is None or newPos > maxpos:",
+            "            maxpos = newPos",
+            "            multiAttrStores = []",
+            "        multiAttrStores.append(tempObject)",
+            "if maxpos is None:",
+            f"    del ruleId2recursionContext[{ruleKey}]",
+            "    return None",
+            "resultObject = SyntaxObject()",
+            "resultObject.extendOptions(multiAttrStores)",
+            f"ruleId2recursionContext[{ruleKey}] = LeftRecursiveIterationContext(maxpos, resultObject, True)",
+            "currentObject.extend(resultObject)",
+            "return maxpos",
+        ]
+
+    def optBody(self, rule: Opt) -> list[str]:
+        return (
+            ["tempObject = SyntaxObject()"]
+            + self.matchLines(
+                rule.rule, "startPos", "ruleId2recursionContext", "tempObject", "newPos"
+            )
+            + [
+                "if newPos is None:",
+                "    return startPos",
+                "currentObject.extend(tempObject)",
+                "return newPos",
+            ]
+        )
+
+    def repetitionBody(self, rule: OneOrMore | ZeroOrMore) -> list[str]:
+        body = ["tempObject = SyntaxObject()"]
+        body += self.matchLines(
+            rule.rule, "startPos", "ruleId2recursionContext", "tempObject", "newPos"
+        )
+        if isinstance(rule, OneOrMore):
+            body += ["if newPos is None:", "    return None"]
+        body += [
+            "while newPos is not None:",
+            "    currentObject.extend(tempObject)",
+            "    startPos = newPos",
+            "    tempObject = SyntaxObject()",
+        ]
+        body += [
+            "    " + line
+            for line in self.matchLines(rule.rule, "startPos", "{}", "tempObject", "newPos")
+        ]
+        return body + ["return startPos"]
+
+    def attrBody(self, rule: Attr) -> list[str]:
+        body = []
+        for attrClass in rule.attrClasses.options:
+            if isinstance(attrClass, fw.OpaqueFwRef):
+                attrClass = attrClass.get_ref()
+            if not isinstance(attrClass, GrammarClass):
+                raise ValueError(
+                    f"An attribute rule's attrClasses must be of GrammarClass or SelectionFirst[GrammarClass] type."
+                )
+            cls = self.classReference(attrClass)
+            body += [
+                f"memoEntry = None if memo is None else memo.lookup({cls}, startPos)",
+                "if memoEntry is not None:",
+                "    newPos = memoEntry.position",
+                "    newSyntaxObjectOptions = memoEntry.syntaxObjects",
+                "else:",
+                "    seedMark = 0 if memo is None else len(memo.seedReads)",
+                f"    newSyntaxObject = {cls}()",
+                "    try:",
+                f"        newPos = {self.ruleFunction(attrClass)}(mytext, startPos, ruleId2recursionContext, newSyntaxObject, memo)",
+                "    except CutFailure:",
+                "        newPos = None",
+                "    if newPos is None:",
+                "        newSyntaxObjectOptions = []",
+                "    else:",
+                "        newSyntaxObjectOptions = finalizeSyntaxObject(mytext, startPos, newPos, newSyntaxObject)",
+                "    if memo is not None and all(seed.complete for seed in memo.seedReads[seedMark:]):",
+                "        del memo.seedReads[seedMark:]",
+                f"        memo.store({cls}, startPos, newPos, newSyntaxObjectOptions)",
+                "if newPos is not None:",
+                f"    currentObject.extendGrammarAttribute({rule.name!r}, newSyntaxObjectOptions)",
+                "    return newPos",
+            ]
+        return body + ["return None"]
+
+
+def generateParserModule(rule: GrammarRule, textType: type[Text] = StringText) -> str:
+    """
+    Returns the source of a standalone Python module with a `parse(mytext, pos, attrStore, memo)`
+    function that parses the rule the same way as `parse()`.
+    The GrammarClasses used by the grammar are imported from their modules.
+    """
+    return ParserModuleGenerator(rule, textType).source()
+
+
+def writeParserModule(
+    path: str, rule: GrammarRule, textType: type[Text] = StringText
+) -> None:
+    """
+    Writes the module made by `generateParserModule()` to path
+    """
+    with open(path, "w") as f:
+        f.write(generateParserModule(rule, textType))
@@ -0,0 +1,481 @@
+from typing import Callable
+from .text import Text, NatT, PosT, PatternT, MatchT
+from .text.string import StringText
+from ._syntax_object import SyntaxObject
+from ._rules import (
+    Concat,
+    Opt,
+    OneOrMore,
+    ZeroOrMore,
+    Cut,
+    Attr,
+    SelectionFirst,
+    Selection,
+    SelectionLongest,
+    GrammarClass,
+    GrammarRule,
+)
+from ._rule_canonize import tryCanonize, tryMergeLiteralOptions
+from ._packrat import PackratMemo
+from ._first_sets import FirstSetAnalysis, OptionDispatch
+from ._parsing import (
+    LeftRecursiveIterationContext,
+    LeftRecursionException,
+    CutFailure,
+    finalizeSyntaxObject,
+    forgetInvolvedRules,
+)
+import forward_decl as fw
+
+
+#: A matcher parses its rule at the given position and stores the attributes into the given object.
+#: Returns the end position of the successful match or None if it failed
+Matcher = Callable[
+    [
+        Text[NatT, PosT, PatternT, MatchT],
+        PosT,
+        dict[int, LeftRecursiveIterationContext],
+        SyntaxObject,
+        PackratMemo | None,
+    ],
+    PosT | None,
+]
+
+
+class CompiledGrammar:
+    """
+    A grammar whose rules were canonized once and turned into a graph of matcher functions.
+    Use `compileGrammar()` to make one.
+    """
+
+    def __init__(self, rule: GrammarRule, textType: type[Text]) -> None:
+        self.rule = rule
+        self.textType = textType
+        self.NatT = textType.GetNativeType()
+        self.PatternT = textType.GetPatternType()
+
+        # matchers of the GrammarClass grammars, filled before their first use
+        self.classMatchers: dict[GrammarClass, Matcher] = {}
+        self.firstSets = FirstSetAnalysis(textType)
+        self.matcher = self.compileRule(rule)
+
+    def parse(
+        self,
+        mytext: Text[NatT, PosT, PatternT, MatchT],
+        pos: PosT,
+        attrStore: SyntaxObject | None = None,
+        memo: PackratMemo | None = None,
+    ) -> PosT | None:
+        """
+        Same as `parse()`, but runs the compiled matchers
+        """
+        if (
+            mytext.GetNativeType() is not self.NatT
+            or mytext.GetPatternType() is not self.PatternT
+        ):
+            raise TypeError(
+                f"The grammar was compiled for texts like '{self.textType.__name__}', not '{type(mytext).__name__}'"
+            )
+        if attrStore is None:
+            attrStore = SyntaxObject()
+        try:
+            return self.matcher(mytext, pos, {}, attrStore, memo)
+        except CutFailure:
+            return None
+
+    def compileRule(self, rule: GrammarRule) -> Matcher:
+        if isinstance(rule, fw.OpaqueFwRef):
+            rule = rule.get_ref()
+        rule = tryCanonize(rule)
+
+        if isinstance(rule, self.NatT):
+            return self.compileNative(rule)
+        elif isinstance(rule, self.PatternT):
+            return self.compilePattern(rule)
+        elif rule is Cut:
+            # outside of a concatenation there is nothing left to commit to
+            return lambda mytext, startPos, *args: startPos
+        elif isinstance(rule, Concat):
+            return self.compileConcat(rule)
+        elif isinstance(rule, Selection):
+            return self.compileSelection(rule)
+        elif isinstance(rule, SelectionFirst):
+            return self.compileSelectionFirst(rule)
+        elif isinstance(rule, SelectionLongest):
+            return self.compileSelectionLongest(rule)
+        elif isinstance(rule, Opt):
+            return self.compileOpt(rule)
+        elif isinstance(rule, OneOrMore) or isinstance(rule, ZeroOrMore):
+            return self.compileRepetition(rule)
+        elif isinstance(rule, Attr):
+            return self.compileAttr(rule)
+        elif isinstance(rule, GrammarClass):
+            return self.compileGrammarClass(rule)
+        else:
+            raise ValueError(f"The rule argument is not of a GrammarRule type")
+
+    def compileNative(self, prefix: NatT) -> Matcher:
+        def matchNative(mytext, startPos, ruleId2recursionContext, currentObject, memo):
+            m = mytext.startswith(prefix, startPos)
+            if m is None:
+                return None
+            return m.span[1]
+
+        return matchNative
+
+    def compilePattern(self, pattern: PatternT) -> Matcher:
+        def matchPattern(mytext, startPos, ruleId2recursionContext, currentObject, memo):
+            m = mytext.matchedby(pattern, startPos)
+            if m is None:
+                return None
+            return m.span[1]
+
+        return matchPattern
+
+    def compileConcat(self, rule: Concat) -> Matcher:
+        if any(rulepart is Cut for rulepart in rule.items):
+            return self.compileCommittingConcat(rule)
+        partMatchers = [self.compileRule(rulepart) for rulepart in rule.items]
+        if len(partMatchers) == 0:
+            return lambda mytext, startPos, *args: startPos
+        firstMatcher = partMatchers[0]
+        restMatchers = partMatchers[1:]
+
+        def matchConcat(mytext, startPos, ruleId2recursionContext, currentObject, memo):
+            # only the first part starts at the same position, so only it can recurse to the left
+            newPos = firstMatcher(
+                mytext, startPos, ruleId2recursionContext, currentObject, memo
+            )
+            if newPos is None:
+                return None
+            for partMatcher in restMatchers:
+                newPos = partMatcher(mytext, newPos, {}, currentObject, memo)
+                if newPos is None:
+                    return None
+            return newPos
+
+        return matchConcat
+
+    def compileCommittingConcat(self, rule: Concat) -> Matcher:
+        # the matchers of the parts, and whether a Cut precedes them
+        parts: list[tuple[Matcher, bool]] = []
+        committed = False
+        for rulepart in rule.items:
+            if rulepart is Cut:
+                committed = True
+            else:
+                parts.append((self.compileRule(rulepart), committed))
+
+        def matchCommittingConcat(mytext, startPos, ruleId2recursionContext, currentObject, memo):
+            newPos = startPos
+            # only the first part starts at the same position, so only it can recurse to the left
+            recursionContext = ruleId2recursionContext
+            for partMatcher, committed in parts:
+                newPos = partMatcher(mytext, newPos, recursionContext, currentObject, memo)
+                if newPos is None:
+                    if committed:
+                        raise CutFailure()
+                    return None
+                recursionContext = {}
+            return newPos
+
+        return matchCommittingConcat
+
+    def compileSelection(self, rule: Selection) -> Matcher:
+        optionMatchers = [self.compileRule(option) for option in rule.options]
+
+        def matchSelection(mytext, startPos, ruleId2recursionContext, currentObject, memo):
+            minPos = None
+            validOptions: list[SyntaxObject] = []
+
+            for optionMatcher in optionMatchers:
+                tempObject = SyntaxObject()
+                try:
+                    newPos = optionMatcher(
+                        mytext, startPos, ruleId2recursionContext, tempObject, memo
+                    )
+                except CutFailure:
+                    return None
+                if newPos is not None:
+                    if minPos is None or newPos < minPos:
+                        minPos = newPos
+                        validOptions = [tempObject]
+                    elif newPos == minPos:
+                        validOptions.append(tempObject)
+
+            if len(validOptions) > 0:
+                currentObject.extendOptions(validOptions)
+            return minPos
+
+        return matchSelection
+
+    def compileSelectionFirst(self, rule: SelectionFirst) -> Matcher:
+        mergedPattern = tryMergeLiteralOptions(rule, self.NatT, self.PatternT)
+        if mergedPattern is not None:
+            return self.compilePattern(mergedPattern)
+
+        ruleId = id(rule)
+        optionMatchers = [self.compileRule(option) for option in rule.options]
+        candidateMatchers = self.compileDispatch(rule.options, optionMatchers)
+
+        def matchSelectionFirst(mytext, startPos, ruleId2recursionContext, currentObject, memo):
+            # check if we already visited this rule at this position in text
+            if ruleId in ruleId2recursionContext:
+                recursionContext = ruleId2recursionContext[ruleId]
+                if recursionContext is None:
+                    raise LeftRecursionException(rule)
+                if memo is not None and not recursionContext.complete:
+                    memo.seedReads.append(recursionContext)
+                currentObject.extend(recursionContext.attrStore)
+                return recursionContext.position
+
+            # Prepare for possible recursion later
+            ruleId2recursionContext[ruleId] = None
+
+            # options that have higher priority than the accepted one,
+            # but rely on lower priority options to be accepted first
+            higherPriorityRecursions: list[Matcher] = []
+
+            newPos = None
+            for optionMatcher in candidateMatchers(mytext, startPos):
+                tempObject = SyntaxObject()
+                try:
+                    newPos = optionMatcher(
+                        mytext, startPos, ruleId2recursionContext, tempObject, memo
+                    )
+                except LeftRecursionException as e:
+                    if e.grammar_cls is rule:
+                        higherPriorityRecursions.append(optionMatcher)
+                        continue
+                    del ruleId2recursionContext[ruleId]
+                    raise
+                except CutFailure:
+                    del ruleId2recursionContext[ruleId]
+                    return None
+
+                if newPos is not None:
+                    recursionContext = LeftRecursiveIterationContext(newPos, tempObject)
+                    ruleId2recursionContext[ruleId] = recursionContext
+                    break
+
+            if newPos is None:
+                del ruleId2recursionContext[ruleId]
+                return None
+
+            # now keep checking while we can extend current node by deepening the recursion
+            tryRecursions = len(higherPriorityRecursions) > 0
+            # rules entered by the growing options are involved in the recursion,
+            # so their contexts are dropped after each attempt while the seed is reused
+            outerRuleIds = set(ruleId2recursionContext)
+            while tryRecursions:
+                tryRecursions = False
+                indexReached = 0
+                for indexReached, optionMatcher in enumerate(higherPriorityRecursions):
+                    tempObject = SyntaxObject()
+                    try:
+                        newPos = optionMatcher(
+                            mytext, startPos, ruleId2recursionContext, tempObject, memo
+                        )
+                    except CutFailure:
+                        # a committed option failed to grow the match, keep what it has
+                        forgetInvolvedRules(ruleId2recursionContext, outerRuleIds)
+                        break
+                    forgetInvolvedRules(ruleId2recursionContext, outerRuleIds)
+                    if newPos is not None and newPos > recursionContext.position:
+                        tryRecursions = True
+                        recursionContext.position = newPos
+                        recursionContext.attrStore = tempObject
+                        break
+                higherPriorityRecursions = higherPriorityRecursions[
+                    0 : indexReached + 1
+                ]
+
+            recursionContext.complete = True
+            currentObject.extend(recursionContext.attrStore)
+            return recursionContext.position
+
+        return matchSelectionFirst
+
+    def compileSelectionLongest(self, rule: SelectionLongest) -> Matcher:
+        mergedPattern = tryMergeLiteralOptions(rule, self.NatT, self.PatternT)
+        if mergedPattern is not None:
+            return self.compilePattern(mergedPattern)
+
+        ruleId = id(rule)
+        optionMatchers = [self.compileRule(option) for option in rule.options]
+
+        def matchSelectionLongest(mytext, startPos, ruleId2recursionContext, currentObject, memo):
+            if ruleId in ruleId2recursionContext:
+                recursionContext = ruleId2recursionContext[ruleId]
+                if recursionContext is None:
+                    raise LeftRecursionException(rule)
+                currentObject.extend(recursionContext.attrStore)
+                return recursionContext.position
+            ruleId2recursionContext[ruleId] = None
+
+            maxpos = None
+            multiAttrStores: list[SyntaxObject] = []
+            for optionMatcher in optionMatchers:
+                tempObject = SyntaxObject()
+                try:
+                    newPos = optionMatcher(
+                        mytext, startPos, ruleId2recursionContext, tempObject, memo
+                    )
+                except LeftRecursionException:
+                    del ruleId2recursionContext[ruleId]
+                    raise
+                except CutFailure:
+                    del ruleId2recursionContext[ruleId]
+                    return None
+                if newPos is not None and (maxpos is None or newPos >= maxpos):
+                    if maxpos is None or newPos > maxpos:
+                        maxpos = newPos
+                        multiAttrStores = []
+                    multiAttrStores.append(tempObject)
+
+            if maxpos is None:
+                del ruleId2recursionContext[ruleId]
+                return None
+
+            resultObject = SyntaxObject()
+            resultObject.extendOptions(multiAttrStores)
+            ruleId2recursionContext[ruleId] = LeftRecursiveIterationContext(
+                maxpos, resultObject, True
+            )
+            currentObject.extend(resultObject)
+            return maxpos
+
+        return matchSelectionLongest
+
+    def compileOpt(self, rule: Opt) -> Matcher:
+        ruleMatcher = self.compileRule(rule.rule)
+
+        def matchOpt(mytext, startPos, ruleId2recursionContext, currentObject, memo):
+            tempObject = SyntaxObject()
+            newPos = ruleMatcher(
+                mytext, startPos, ruleId2recursionContext, tempObject, memo
+            )
+            if newPos is None:
+                return startPos
+            currentObject.extend(tempObject)
+            return newPos
+
+        return matchOpt
+
+    def compileRepetition(self, rule: OneOrMore | ZeroOrMore) -> Matcher:
+        ruleMatcher = self.compileRule(rule.rule)
+        firstRequired = isinstance(rule, OneOrMore)
+
+        def matchRepetition(mytext, startPos, ruleId2recursionContext, currentObject, memo):
+            tempObject = SyntaxObject()
+            newPos = ruleMatcher(
+                mytext, startPos, ruleId2recursionContext, tempObject, memo
+            )
+            if newPos is None and firstRequired:
+                return None
+
+            while newPos is not None:
+                currentObject.extend(tempObject)
+                startPos = newPos
+
+                tempObject = SyntaxObject()
+                newPos = ruleMatcher(mytext, startPos, {}, tempObject, memo)
+
+            return startPos
+
+        return matchRepetition
+
+    def compileAttr(self, rule: Attr) -> Matcher:
+        name = rule.name
+        attrClasses: list[GrammarClass] = []
+        for attrClass in rule.attrClasses.options:
+            if isinstance(attrClass, fw.OpaqueFwRef):
+                attrClass = attrClass.get_ref()
+            if not isinstance(attrClass, GrammarClass):
+                raise ValueError(
+                    f"An attribute rule's attrClasses must be of GrammarClass or SelectionFirst[GrammarClass] type."
+                )
+            self.compileGrammarClass(attrClass)
+            attrClasses.append(attrClass)
+        classMatchers = self.classMatchers
+        candidateClasses = self.compileDispatch(attrClasses, attrClasses)
+
+        def matchAttr(mytext, startPos, ruleId2recursionContext, currentObject, memo):
+            for attrClass in candidateClasses(mytext, startPos):
+                memoEntry = None
+                if memo is not None:
+                    memoEntry = memo.lookup(attrClass, startPos)
+
+                if memoEntry is not None:
+                    newPos = memoEntry.position
+                    newSyntaxObjectOptions = memoEntry.syntaxObjects
+                else:
+                    seedMark = len(memo.seedReads) if memo is not None else 0
+                    newSyntaxObject = attrClass()
+                    try:
+                        newPos = classMatchers[attrClass](
+                            mytext, startPos, ruleId2recursionContext, newSyntaxObject, memo
+                        )
+                    except CutFailure:
+                        newPos = None
+                    if newPos is None:
+                        newSyntaxObjectOptions = []
+                    else:
+                        newSyntaxObjectOptions = finalizeSyntaxObject(
+                            mytext, startPos, newPos, newSyntaxObject
+                        )
+                    # results built on a still growing left recursion seed are not final
+                    if memo is not None and all(
+                        seed.complete for seed in memo.seedReads[seedMark:]
+                    ):
+                        del memo.seedReads[seedMark:]
+                        memo.store(attrClass, startPos, newPos, newSyntaxObjectOptions)
+
+                if newPos is not None:
+                    currentObject.extendGrammarAttribute(name, newSyntaxObjectOptions)
+                    return newPos
+            return None
+
+        return matchAttr
+
+    def compileDispatch(
+        self, options: list[GrammarRule], values: list
+    ) -> Callable[[Text, PosT], list]:
+        """
+        Returns a function that selects the values of the options
+        that can match at a position of the text, using their FIRST sets
+        """
+        if len(options) < 2:
+            return lambda mytext, pos: values
+        dispatch = OptionDispatch(
+            values,
+            [self.firstSets.firstSet(option) for option in options],
+            self.textType,
+        )
+        return dispatch.candidates
+
+    def compileGrammarClass(self, cls: GrammarClass) -> Matcher:
+        classMatchers = self.classMatchers
+        if cls not in classMatchers:
+            # grammars can reference their own class, so the matcher is looked up when called
+            classMatchers[cls] = None
+            classMatchers[cls] = self.compileRule(cls.grammar)
+
+        def matchGrammarClass(mytext, startPos, ruleId2recursionContext, currentObject, memo):
+            return classMatchers[cls](
+                mytext, startPos, ruleId2recursionContext, currentObject, memo
+            )
+
+        return matchGrammarClass
+
+
+def compileGrammar(
+    rule: GrammarRule, textType: type[Text] = StringText
+) -> CompiledGrammar:
+    """
+    Walks the grammar once, canonizing its rules and resolving forward references,
+    and returns a CompiledGrammar that parses instances of textType without
+    re-interpreting the rule objects.
+    The grammar must not be changed after it was compiled.
+    """
+    return CompiledGrammar(rule, textType)
@@ -0,0 +1,365 @@
+from dataclasses import dataclass
+from threading import Lock
+from typing import Any, Iterable
+import re
+from .text import Text
+from ._rules import (
+    Concat,
+    Opt,
+    OneOrMore,
+    ZeroOrMore,
+    Cut,
+    Attr,
+    SelectionFirst,
+    Selection,
+    SelectionLongest,
+    GrammarClass,
+    GrammarRule,
+    grammarVersion,
+)
+from ._rule_canonize import tryCanonize
+import forward_decl as fw
+
+try:
+    from re import _parser as sre_parse
+except ImportError:
+    import sre_parse
+
+
+# Character ranges of patterns that are larger than this aren't expanded into sets
+MAX_RANGE_SIZE = 256
+
+# How many (rule, text type) pairs `dispatchTablesFor()` keeps tables for
+MAX_CACHED_TABLES = 64
+
+
+@dataclass(frozen=True)
+class FirstSet:
+    """
+    What the matches of a rule can start with.
+    `chars` are the characters a non-empty match can start with, None if it can start with any.
+    `nullable` tells whether the rule can match the empty string
+    """
+
+    chars: frozenset | None
+    nullable: bool
+
+
+EMPTY_FIRST_SET = FirstSet(frozenset(), False)
+ANY_FIRST_SET = FirstSet(None, True)
+
+
+def concatFirstSets(firstSets: Iterable[FirstSet]) -> FirstSet:
+    """
+    Returns the FirstSet of a sequence. The sequence is only consumed up to its first non-nullable part
+    """
+    chars = frozenset()
+    for firstSet in firstSets:
+        chars = None if chars is None or firstSet.chars is None else chars | firstSet.chars
+        if not firstSet.nullable:
+            return FirstSet(chars, False)
+    return FirstSet(chars, True)
+
+
+def unionFirstSets(firstSets: Iterable[FirstSet]) -> FirstSet:
+    """
+    Returns the FirstSet of a choice between alternatives
+    """
+    chars = frozenset()
+    nullable = False
+    for firstSet in firstSets:
+        chars = None if chars is None or firstSet.chars is None else chars | firstSet.chars
+        nullable = nullable or firstSet.nullable
+    return FirstSet(chars, nullable)
+
+
+def patternFirstSet(pattern: re.Pattern) -> FirstSet:
+    """
+    Returns the FirstSet of a regular expression, as far as it can be told from its parsed form
+    """
+    if isinstance(pattern.pattern, str):
+        unit = chr
+    else:
+        unit = lambda c: bytes([c])
+
+    firstSet = subpatternFirstSet(sre_parse.parse(pattern.pattern, pattern.flags), unit)
+    if pattern.flags & re.IGNORECASE:
+        return FirstSet(None, firstSet.nullable)
+    return firstSet
+
+
+def subpatternFirstSet(items: Iterable, unit) -> FirstSet:
+    return concatFirstSets(patternItemFirstSet(op, av, unit) for op, av in items)
+
+
+def patternItemFirstSet(op, av, unit) -> FirstSet:
+    if op is sre_parse.LITERAL:
+        return FirstSet(frozenset([unit(av)]), False)
+    elif op is sre_parse.IN:
+        chars = set()
+        for setOp, setAv in av:
+            if setOp is sre_parse.LITERAL:
+                chars.add(unit(setAv))
+            elif setOp is sre_parse.RANGE and setAv[1] - setAv[0] < MAX_RANGE_SIZE:
+                chars.update(unit(c) for c in range(setAv[0], setAv[1] + 1))
+            else:
+                # negated sets, categories and large ranges
+                return FirstSet(None, False)
+        return FirstSet(frozenset(chars), False)
+    elif op is sre_parse.BRANCH:
+        return unionFirstSets(subpatternFirstSet(branch, unit) for branch in av[1])
+    elif op is sre_parse.SUBPATTERN:
+        group, addFlags, delFlags, subpattern = av
+        firstSet = subpatternFirstSet(subpattern, unit)
+        if addFlags & re.IGNORECASE:
+            return FirstSet(None, firstSet.nullable)
+        return firstSet
+    elif op in (
+        sre_parse.MAX_REPEAT,
+        sre_parse.MIN_REPEAT,
+        getattr(sre_parse, "POSSESSIVE_REPEAT", None),
+    ):
+        minCount, maxCount, subpattern = av
+        firstSet = subpatternFirstSet(subpattern, unit)
+        return FirstSet(firstSet.chars, firstSet.nullable or minCount == 0)
+    elif op is getattr(sre_parse, "ATOMIC_GROUP", None):
+        return subpatternFirstSet(av, unit)
+    elif op in (sre_parse.AT, sre_parse.ASSERT, sre_parse.ASSERT_NOT):
+        # anchors and lookarounds don't consume any characters
+        return FirstSet(frozenset(), True)
+    else:
+        return ANY_FIRST_SET
+
+
+class FirstSetAnalysis:
+    """
+    Computes the FIRST sets and nullability of grammar rules for texts of the given type.
+    Recursive grammars are walked repeatedly until the results of their classes stop growing.
+    The results are kept, so they are only valid while the grammar isn't changed.
+    """
+
+    def __init__(self, textType: type[Text]) -> None:
+        self.NatT = textType.GetNativeType()
+        self.PatternT = textType.GetPatternType()
+
+        # results of the GrammarClasses, through which all recursion in a grammar goes
+        self.classFirstSets: dict[GrammarClass, FirstSet] = {}
+        # results that can't grow anymore, so their classes aren't walked again
+        self.finalFirstSets: dict[GrammarClass, FirstSet] = {}
+        self.patternFirstSets: dict[Any, FirstSet] = {}
+        self.visited: set[GrammarClass] = set()
+        self.changed = False
+
+    def firstSet(self, rule: GrammarRule) -> FirstSet:
+        """
+        Returns the FirstSet of the rule
+        """
+        while True:
+            self.visited = set()
+            self.changed = False
+            firstSet = self.visit(rule)
+            if not self.changed:
+                # the classes reached by the last walk agree with each other
+                for grammarClass in self.visited:
+                    self.finalFirstSets[grammarClass] = self.classFirstSets[
+                        grammarClass
+                    ]
+                return firstSet
+
+    def visit(self, rule: GrammarRule) -> FirstSet:
+        if isinstance(rule, fw.OpaqueFwRef):
+            rule = rule.get_ref()
+        rule = tryCanonize(rule)
+
+        if isinstance(rule, self.NatT):
+            if len(rule) == 0:
+                return FirstSet(frozenset(), True)
+            return FirstSet(frozenset([rule[:1]]), False)
+        elif isinstance(rule, self.PatternT):
+            if rule not in self.patternFirstSets:
+                self.patternFirstSets[rule] = patternFirstSet(rule)
+            return self.patternFirstSets[rule]
+        elif rule is Cut:
+            return FirstSet(frozenset(), True)
+        elif isinstance(rule, Concat):
+            return concatFirstSets(self.visit(item) for item in rule.items)
+        elif isinstance(rule, (SelectionFirst, Selection, SelectionLongest)):
+            return unionFirstSets(self.visit(option) for option in rule.options)
+        elif isinstance(rule, (Opt, ZeroOrMore)):
+            return FirstSet(self.visit(rule.rule).chars, True)
+        elif isinstance(rule, OneOrMore):
+            return self.visit(rule.rule)
+        elif isinstance(rule, Attr):
+            return unionFirstSets(
+                self.visit(attrClass) for attrClass in rule.attrClasses.options
+            )
+        elif isinstance(rule, GrammarClass):
+            if rule in self.finalFirstSets:
+                return self.finalFirstSets[rule]
+            if rule in self.visited:
+                # a recursive reference sees the result so far
+                return self.classFirstSets.get(rule, EMPTY_FIRST_SET)
+            self.visited.add(rule)
+
+            firstSet = self.visit(rule.grammar)
+            if self.classFirstSets.get(rule) != firstSet:
+                self.classFirstSets[rule] = firstSet
+                self.changed = True
+            return firstSet
+        else:
+            return ANY_FIRST_SET
+
+
+class OptionDispatch:
+    """
+    A table from the next character in the text to the options of a selection
+    that can match there, in their original order.
+    Options that can match the empty string are always tried,
+    and options whose first characters are unknown are tried unless the text ended.
+    """
+
+    def __init__(
+        self,
+        options: list[Any],
+        firstSets: list[FirstSet],
+        textType: type[Text],
+    ) -> None:
+        self.options = options
+        self.textType = textType
+        # slices of byte texts can be memoryviews of writable buffers, which can't be hashed
+        self.copiesKeys = issubclass(textType.GetNativeType(), bytes)
+
+        self.fallback = [
+            option
+            for option, firstSet in zip(options, firstSets)
+            if firstSet.chars is None or firstSet.nullable
+        ]
+        self.charOptions: dict[Any, list[Any]] = {
+            char: [
+                option
+                for option, firstSet in zip(options, firstSets)
+                if firstSet.chars is None or firstSet.nullable or char in firstSet.chars
+            ]
+            for firstSet in firstSets
+            if firstSet.chars is not None
+            for char in firstSet.chars
+        }
+        # the end of the text
+        self.charOptions[textType.GetNativeType()()] = [
+            option
+            for option, firstSet in zip(options, firstSets)
+            if firstSet.nullable
+        ]
+
+    def candidates(self, mytext: Text, pos: int) -> list[Any]:
+        """
+        Returns the options that can match at pos
+        """
+        key = mytext[pos : pos + 1]
+        if self.copiesKeys:
+            key = bytes(key)
+        return self.charOptions.get(key, self.fallback)
+
+
+class DispatchTables:
+    """
+    The OptionDispatch tables of the selections reached by parses of a text type.
+    A table is built on the first use of its selection, the grammar rules aren't changed.
+    Parses of the same rule share their tables, see `dispatchTablesFor()`
+    """
+
+    def __init__(self, textType: type[Text]) -> None:
+        self.textType = textType
+        self.analysis = FirstSetAnalysis(textType)
+        self.grammarVersion = grammarVersion()
+        # keyed by the id of the selection, which is kept so that its id can't be reused
+        self.dispatches: dict[int, tuple[SelectionFirst, OptionDispatch]] = {}
+        # the analysis isn't thread safe, tables are built by one thread at a time
+        self.lock = Lock()
+        # whether the rules reach a Cut, by rule id, with the rule to keep its id
+        self.cutRules: dict[int, tuple[GrammarRule, bool]] = {}
+
+    def reachesCut(self, rule: GrammarRule) -> bool:
+        if id(rule) not in self.cutRules:
+            self.cutRules[id(rule)] = (rule, reachesCut(rule))
+        return self.cutRules[id(rule)][1]
+
+    def candidates(
+        self, selection: SelectionFirst, mytext: Text, pos: int
+    ) -> list[Any]:
+        """
+        Returns the options of the selection that can match at pos, in their original order
+        """
+        if len(selection.options) < 2:
+            return selection.options
+
+        entry = self.dispatches.get(id(selection))
+        if entry is None:
+            with self.lock:
+                entry = self.dispatches.get(id(selection))
+                if entry is None:
+                    firstSets = [
+                        self.analysis.firstSet(option) for option in selection.options
+                    ]
+                    entry = (
+                        selection,
+                        OptionDispatch(selection.options, firstSets, self.textType),
+                    )
+                    self.dispatches[id(selection)] = entry
+        return entry[1].candidates(mytext, pos)
+
+
+def reachesCut(rule: GrammarRule) -> bool:
+    """
+    Returns whether parsing the rule can match a Cut, in it or in its classes
+    """
+    pending = [rule]
+    visited: set[GrammarClass] = set()
+    while len(pending) > 0:
+        rule = pending.pop()
+        if isinstance(rule, fw.OpaqueFwRef):
+            rule = rule.get_ref()
+        rule = tryCanonize(rule)
+
+        if rule is Cut:
+            return True
+        elif isinstance(rule, Concat):
+            pending.extend(rule.items)
+        elif isinstance(rule, (SelectionFirst, Selection, SelectionLongest)):
+            pending.extend(rule.options)
+        elif isinstance(rule, (Opt, ZeroOrMore, OneOrMore)):
+            pending.append(rule.rule)
+        elif isinstance(rule, Attr):
+            pending.extend(rule.attrClasses.options)
+        elif isinstance(rule, GrammarClass) and rule not in visited:
+            # classes are the only way back to a rule that was already walked
+            visited.add(rule)
+            pending.append(rule.grammar)
+    return False
+
+
+# the tables of the most recently parsed rules, the oldest first
+_cachedTables: dict[tuple[GrammarRule, type[Text]], DispatchTables] = {}
+_cachedTablesLock = Lock()
+
+
+def dispatchTablesFor(rule: GrammarRule, textType: type[Text]) -> DispatchTables:
+    """
+    Returns the DispatchTables for parsing the rule in texts of textType.
+    They are shared by the parses of the rule, until the grammar of a GrammarClass
+    is assigned. Rules changed in place, like the options of a selection, aren't seen.
+    Rules that can't be hashed, like dicts, get new tables
+    """
+    key = (rule, textType)
+    with _cachedTablesLock:
+        try:
+            tables = _cachedTables.pop(key, None)
+        except TypeError:
+            return DispatchTables(textType)
+        if tables is None or tables.grammarVersion != grammarVersion():
+            tables = DispatchTables(textType)
+        # reinserted as the most recent one
+        _cachedTables[key] = tables
+        if len(_cachedTables) > MAX_CACHED_TABLES:
+            del _cachedTables[next(iter(_cachedTables))]
+    return tables
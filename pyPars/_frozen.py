@@ -0,0 +1,113 @@
+from .text import Text, NatT, PosT, PatternT, MatchT
+from .text.string import StringText
+from ._syntax_object import SyntaxObject
+from ._rules import GrammarRule
+from ._packrat import PackratMemo
+from ._parsing import LeftRecursiveIterationContext, CutFailure
+from ._compile import CompiledGrammar, Matcher
+
+
+class FrozenGrammar:
+    """
+    A compiled grammar that can't be changed, shared by threads that parse different texts at once.
+    The grammar is compiled when it is frozen, so later changes to its rules or to the
+    `grammar` of its GrammarClasses don't affect it. It keeps the rule objects it uses alive,
+    so the ids that key the left recursion state can't be reused during a parse.
+    All the state of a parse is in its ParserContext and in the objects it creates.
+    Use `freezeGrammar()` to make one.
+    """
+
+    __slots__ = ("rule", "textType", "matcher")
+
+    rule: GrammarRule
+    textType: type[Text]
+    matcher: Matcher
+
+    def __init__(self, rule: GrammarRule, textType: type[Text]) -> None:
+        compiledGrammar = CompiledGrammar(rule, textType)
+        # only the matchers are kept: nothing else refers to the tables they read
+        object.__setattr__(self, "rule", rule)
+        object.__setattr__(self, "textType", textType)
+        object.__setattr__(self, "matcher", compiledGrammar.matcher)
+
+    def __setattr__(self, name: str, value) -> None:
+        raise AttributeError(f"Can't set '{name}', a FrozenGrammar can't be changed")
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError(f"Can't delete '{name}', a FrozenGrammar can't be changed")
+
+    def newContext(
+        self,
+        mytext: Text[NatT, PosT, PatternT, MatchT],
+        memo: PackratMemo | None = None,
+    ) -> "ParserContext":
+        """
+        Returns a context for parsing mytext, with an optional memo of its own
+        """
+        if (
+            mytext.GetNativeType() is not self.textType.GetNativeType()
+            or mytext.GetPatternType() is not self.textType.GetPatternType()
+        ):
+            raise TypeError(
+                f"The grammar was frozen for texts like '{self.textType.__name__}', not '{type(mytext).__name__}'"
+            )
+        return ParserContext(self, mytext, memo)
+
+    def parse(
+        self,
+        mytext: Text[NatT, PosT, PatternT, MatchT],
+        pos: PosT,
+        attrStore: SyntaxObject | None = None,
+        memo: PackratMemo | None = None,
+    ) -> PosT | None:
+        """
+        Same as `parse()`, in a new ParserContext
+        """
+        return self.newContext(mytext, memo).parse(pos, attrStore)
+
+
+class ParserContext:
+    """
+    The state of parsing a text with a FrozenGrammar: the text, its packrat memo
+    and the left recursive selections that are being grown.
+    A context must only be used by one thread at a time, each parse makes its own
+    with `FrozenGrammar.newContext()`.
+    """
+
+    def __init__(
+        self,
+        grammar: FrozenGrammar,
+        mytext: Text[NatT, PosT, PatternT, MatchT],
+        memo: PackratMemo | None = None,
+    ) -> None:
+        self.grammar = grammar
+        self.mytext = mytext
+        self.memo = memo
+        # the recursion state of the selections at the position of the last parse
+        self.ruleId2recursionContext: dict[int, LeftRecursiveIterationContext] = {}
+
+    def parse(self, pos: PosT, attrStore: SyntaxObject | None = None) -> PosT | None:
+        """
+        Parses the grammar at pos and stores the parsed attributes in attrStore.
+        Returns the end position of the successful match or None if it failed
+        """
+        if attrStore is None:
+            attrStore = SyntaxObject()
+        self.ruleId2recursionContext = {}
+        try:
+            return self.grammar.matcher(
+                self.mytext, pos, self.ruleId2recursionContext, attrStore, self.memo
+            )
+        except CutFailure:
+            return None
+
+
+def freezeGrammar(
+    rule: GrammarRule, textType: type[Text] = StringText
+) -> FrozenGrammar:
+    """
+    Compiles the grammar into a FrozenGrammar for parsing instances of textType
+    from several threads at once.
+    Each thread parses with its own ParserContext and memo, the grammar is shared
+    """
+    return FrozenGrammar(rule, textType)
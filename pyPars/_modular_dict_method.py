@@ -1,16 +1,52 @@
+from types import GetSetDescriptorType
 from typing import Callable
 
-class ModularDictMethodObject:
 
-    def __init__(
-        self
-    ) -> None:
-        super().__init__()
-        self._dict_extractor_modules: list[Callable[[__class__], dict[str, any]]] = []
+class ModularDictMethodType(type):
+    """
+    The metaclass of ModularDictMethodObject. A subclass whose objects get
+    an instance dict, because it has no `__slots__` or combines bases with and without one,
+    would hide the `__dict__()` method behind the dict's descriptor.
+    So each class gets the method of its bases in its own namespace.
+    """
+
+    def __new__(mcls, name, bases, attrs, **kwargs):
+        if "__dict__" not in attrs:
+            for base in bases:
+                for mroClass in base.__mro__:
+                    method = vars(mroClass).get("__dict__")
+                    if method is not None and not isinstance(
+                        method, GetSetDescriptorType
+                    ):
+                        attrs["__dict__"] = method
+                        break
+                if "__dict__" in attrs:
+                    break
+        return super().__new__(mcls, name, bases, attrs, **kwargs)
+
+
+class ModularDictMethodObject(metaclass=ModularDictMethodType):
+    """
+    Builds the `__dict__()` output by merging the dicts returned by
+    the `_dict_extractor` methods of all classes in the hierarchy, bases first.
+    The extractors are collected once per class, so objects don't carry them.
+    """
+
+    __slots__ = ()
+
+    _dict_extractor_modules: list[Callable[["ModularDictMethodObject"], dict[str, any]]] = []
+
+    def __init_subclass__(cls, **kwargs) -> None:
+        super().__init_subclass__(**kwargs)
+        cls._dict_extractor_modules = [
+            vars(base)["_dict_extractor"]
+            for base in reversed(cls.__mro__)
+            if "_dict_extractor" in vars(base)
+        ]
 
     def __dict__(self) -> dict[str, "any"]:
         d = {}
         for extractor in self._dict_extractor_modules:
             d |= extractor(self)
 
-        return d
\ No newline at end of file
+        return d
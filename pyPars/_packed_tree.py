@@ -0,0 +1,417 @@
+from array import array
+import importlib
+import struct
+import sys
+from typing import Any, Iterable, Iterator
+from ._syntax_object import SyntaxObject, syntaxClass, viewClass
+from ._serialize import classLayout, attributeItems
+from ._packrat import PositionMap
+
+
+# Values of textStarts for nodes whose text isn't a slice of the source
+NO_TEXT = -1
+# the text is in the `texts` table, at the index in textEnds
+STORED_TEXT = -2
+
+MAGIC = b"pyPT"
+FORMAT_VERSION = 1
+
+
+class PackedTree:
+    """
+    A syntax tree flattened into typed arrays, for caching it or sending it to another process.
+    Nodes are numbered, the root is node 0. For node i:
+    `nodeClasses[i]` is the index of its class in `classes`,
+    `textStarts[i]:textEnds[i]` is the span of its saved text in the source
+    (or NO_TEXT, or STORED_TEXT with the index in `texts` in textEnds),
+    `spanStarts[i]`, `spanEnds[i]` is its so_span (-1 if it has none),
+    `edgeOffsets[i]:edgeOffsets[i+1]` are its attribute edges, each one the index of
+    the attribute name in `attributeNames` (`edgeNames`) and of the subobject (`edgeTargets`),
+    and `groupOffsets[i]:groupOffsets[i+1]` are the option groups in `nodeGroups`.
+    The members of group g are `members[memberOffsets[g]:memberOffsets[g+1]]`.
+
+    Nodes are only turned back into SyntaxObjects by `build()` or `root()`, and only
+    as far as their attributes are read. The other methods read the arrays directly.
+    """
+
+    def __init__(self, source: Any = None) -> None:
+        #: the text the saved texts are sliced from, None if no text refers to it
+        self.source = source
+        self.classes: list[type] = []
+        self.attributeNames: list[str] = []
+        self.texts: list = []
+        self.nodeClasses = array("i")
+        self.textStarts = array("q")
+        self.textEnds = array("q")
+        self.spanStarts = array("q")
+        self.spanEnds = array("q")
+        self.edgeOffsets = array("q", [0])
+        self.edgeNames = array("i")
+        self.edgeTargets = array("q")
+        self.groupOffsets = array("q", [0])
+        self.nodeGroups = array("q")
+        self.memberOffsets = array("q", [0])
+        self.members = array("q")
+
+        # objects and option groups already built, by index
+        self.builtNodes: dict[int, SyntaxObject] = {}
+        self.builtGroups: dict[int, tuple[SyntaxObject, ...]] = {}
+        # the nodes of the objects not filled yet, by object id
+        self.unfilledNodes: dict[int, int] = {}
+        self.viewClasses: dict[int, type] = {}
+
+    def __len__(self) -> int:
+        return len(self.nodeClasses)
+
+    def nodeClass(self, node: int) -> type:
+        return self.classes[self.nodeClasses[node]]
+
+    def nodeText(self, node: int) -> Any:
+        """
+        Returns the saved text of the node, or None if it has none
+        """
+        start = self.textStarts[node]
+        if start == NO_TEXT:
+            return None
+        elif start == STORED_TEXT:
+            return self.texts[self.textEnds[node]]
+        return self.source[start : self.textEnds[node]]
+
+    def nodeSpan(self, node: int) -> tuple[int, int] | None:
+        if self.spanStarts[node] == -1:
+            return None
+        return self.spanStarts[node], self.spanEnds[node]
+
+    def iterEdges(self, node: int) -> Iterator[tuple[str, int]]:
+        """
+        Yields the attribute name and the subobject node of each attribute value of the node
+        """
+        for edge in range(self.edgeOffsets[node], self.edgeOffsets[node + 1]):
+            yield self.attributeNames[self.edgeNames[edge]], self.edgeTargets[edge]
+
+    def iterNodes(self, cls: type) -> Iterator[int]:
+        """
+        Yields the nodes that are instances of cls, without building them
+        """
+        classIndices = {
+            index
+            for index, nodeClass in enumerate(self.classes)
+            if issubclass(nodeClass, cls)
+        }
+        for node, classIndex in enumerate(self.nodeClasses):
+            if classIndex in classIndices:
+                yield node
+
+    def root(self) -> SyntaxObject:
+        return self.build(0)
+
+    def build(self, node: int) -> SyntaxObject:
+        """
+        Returns the object of the node, the same one on every call.
+        Like the objects of a ParseArena, it is created empty and filled from the arrays
+        when one of its attributes is first read, and its subobjects are created
+        the same way. Until then its type is a view subclass of the node's class,
+        `syntaxClass()` fills it and returns the class.
+        Nodes shared in the original tree are shared in the built one too
+        """
+        syntaxObject = self.builtNodes.get(node)
+        if syntaxObject is None:
+            classIndex = self.nodeClasses[node]
+            if classIndex not in self.viewClasses:
+                self.viewClasses[classIndex] = viewClass(
+                    self.classes[classIndex], self.fillObject
+                )
+            syntaxObject = object.__new__(self.viewClasses[classIndex])
+            self.builtNodes[node] = syntaxObject
+            self.unfilledNodes[id(syntaxObject)] = node
+        return syntaxObject
+
+    def fillObject(self, syntaxObject: SyntaxObject) -> None:
+        """
+        Sets the text, span, attributes and option groups of an object created empty
+        """
+        node = self.unfilledNodes.pop(id(syntaxObject))
+        cls = self.nodeClass(node)
+        object.__setattr__(syntaxObject, "__class__", cls)
+        cls.__init__(syntaxObject)
+
+        start = self.textStarts[node]
+        if start == STORED_TEXT:
+            syntaxObject.so_savedText = self.texts[self.textEnds[node]]
+        elif start != NO_TEXT:
+            if self.source is None:
+                raise ValueError("The tree refers to the source, but it wasn't given")
+            syntaxObject.so_textSource = (self.source, start, self.textEnds[node])
+        if self.spanStarts[node] != -1:
+            syntaxObject.so_span = (self.spanStarts[node], self.spanEnds[node])
+
+        edgeNames, edgeTargets = self.edgeNames, self.edgeTargets
+        edge = self.edgeOffsets[node]
+        edgesEnd = self.edgeOffsets[node + 1]
+        while edge < edgesEnd:
+            # the values of an attribute are consecutive edges
+            nameIndex = edgeNames[edge]
+            valuesEnd = edge + 1
+            while valuesEnd < edgesEnd and edgeNames[valuesEnd] == nameIndex:
+                valuesEnd += 1
+            syntaxObject.extendGrammarAttribute(
+                self.attributeNames[nameIndex],
+                [self.build(subobj) for subobj in edgeTargets[edge:valuesEnd]],
+            )
+            edge = valuesEnd
+
+        groupsStart, groupsEnd = self.groupOffsets[node], self.groupOffsets[node + 1]
+        if groupsStart < groupsEnd:
+            syntaxObject.addOptionGroups(
+                [
+                    self.buildGroup(group)
+                    for group in self.nodeGroups[groupsStart:groupsEnd]
+                ]
+            )
+
+    def buildGroup(self, group: int) -> tuple[SyntaxObject, ...]:
+        if group not in self.builtGroups:
+            self.builtGroups[group] = tuple(
+                self.build(member)
+                for member in self.members[
+                    self.memberOffsets[group] : self.memberOffsets[group + 1]
+                ]
+            )
+        return self.builtGroups[group]
+
+    def arrays(self) -> list[array]:
+        return [
+            self.nodeClasses,
+            self.textStarts,
+            self.textEnds,
+            self.spanStarts,
+            self.spanEnds,
+            self.edgeOffsets,
+            self.edgeNames,
+            self.edgeTargets,
+            self.groupOffsets,
+            self.nodeGroups,
+            self.memberOffsets,
+            self.members,
+        ]
+
+    def toBytes(self, includeSource: bool = False) -> bytes:
+        """
+        Encodes the tree. The classes are stored by module and name, so they must be
+        importable where the tree is decoded. With includeSource, the content of the
+        source is stored too, otherwise it must be passed to `fromBytes()`
+        """
+        classPaths = []
+        for cls in self.classes:
+            if "<locals>" in cls.__qualname__:
+                raise ValueError(f"The class '{cls.__qualname__}' can't be imported")
+            classPaths.append(f"{cls.__module__}:{cls.__qualname__}")
+
+        chunks = [
+            MAGIC,
+            struct.pack("<BB", FORMAT_VERSION, sys.byteorder == "little"),
+            packValues(classPaths),
+            packValues(self.attributeNames),
+            packValues(self.texts),
+        ]
+        if includeSource and self.source is not None:
+            chunks.append(packValues([self.sourceContent()]))
+        else:
+            chunks.append(packValues([]))
+        for values in self.arrays():
+            packed = narrowArray(values)
+            chunks.append(struct.pack("<cQ", packed.typecode.encode(), len(packed)))
+            chunks.append(packed.tobytes())
+        return b"".join(chunks)
+
+    def sourceContent(self) -> str | bytes:
+        """
+        Returns the content of the source as a string or bytes.
+        The source is a Text, or the string or bytes of a decoded tree
+        """
+        source = self.source
+        if not isinstance(source, (str, bytes, bytearray, memoryview)):
+            if not hasattr(source, "getStartPos"):
+                raise TypeError(
+                    f"The source can't be stored, it is a '{type(source).__name__}' instead of a Text, string or bytes"
+                )
+            source = source[source.getStartPos() :]
+        if isinstance(source, (bytearray, memoryview)):
+            source = bytes(source)
+        return source
+
+    @classmethod
+    def fromBytes(cls, data: bytes, source: Any = None) -> "PackedTree":
+        """
+        Decodes a tree encoded by `toBytes()`. The source is needed if the tree refers to it
+        and it wasn't included. Nothing is built until the nodes are accessed
+        """
+        view = memoryview(data)
+        if view[: len(MAGIC)] != MAGIC:
+            raise ValueError("The data isn't an encoded PackedTree")
+        version, littleEndian = struct.unpack_from("<BB", view, len(MAGIC))
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported PackedTree format version {version}")
+        offset = len(MAGIC) + 2
+
+        classPaths, offset = unpackValues(view, offset)
+        attributeNames, offset = unpackValues(view, offset)
+        texts, offset = unpackValues(view, offset)
+        includedSource, offset = unpackValues(view, offset)
+
+        tree = cls(includedSource[0] if len(includedSource) > 0 else source)
+        tree.classes = [importClass(classPath) for classPath in classPaths]
+        tree.attributeNames = attributeNames
+        tree.texts = texts
+        for values in tree.arrays():
+            typecode, count = struct.unpack_from("<cQ", view, offset)
+            offset += 9
+            packed = array(typecode.decode())
+            end = offset + count * packed.itemsize
+            packed.frombytes(view[offset:end])
+            if littleEndian != (sys.byteorder == "little"):
+                packed.byteswap()
+            # replaces the initial offsets of an empty tree
+            values[:] = array(values.typecode, packed)
+            offset = end
+        return tree
+
+    def __reduce__(self):
+        return (PackedTree.fromBytes, (self.toBytes(includeSource=True),))
+
+
+def packTree(syntaxObject: SyntaxObject, source: Any = None) -> PackedTree:
+    """
+    Flattens the tree into a PackedTree. Saved texts that weren't read yet are stored
+    as their span in the source, the text they are sliced from. If source isn't given,
+    it is the text of the first such object. Other saved texts are stored as they are.
+    Only the grammar attributes, saved texts, spans and option groups are packed
+    """
+    tree = PackedTree(source)
+    nodeClasses = tree.nodeClasses
+    edgeNames, edgeTargets = tree.edgeNames, tree.edgeTargets
+    classIndices: dict[type, int] = {}
+    nameIndices: dict[str, int] = {}
+    groupIndices: dict[int, int] = {}
+    nodeIndices: dict[int, int] = {id(syntaxObject): 0}
+    # the nodes in the order of their indices, filled while they are discovered
+    nodes = [syntaxObject]
+
+    def nodeIndex(subobj: SyntaxObject) -> int:
+        if not isinstance(subobj, SyntaxObject):
+            raise TypeError(
+                f"Only SyntaxObjects can be packed, not '{type(subobj).__name__}'"
+            )
+        if id(subobj) not in nodeIndices:
+            nodeIndices[id(subobj)] = len(nodes)
+            nodes.append(subobj)
+        return nodeIndices[id(subobj)]
+
+    index = 0
+    while index < len(nodes):
+        current = nodes[index]
+        index += 1
+
+        cls = syntaxClass(current)
+        if cls not in classIndices:
+            classIndices[cls] = len(tree.classes)
+            tree.classes.append(cls)
+        nodeClasses.append(classIndices[cls])
+        layout = classLayout(cls)
+
+        textStart, textEnd = NO_TEXT, 0
+        if layout.hasText:
+            if current.so_textSource is not None:
+                mytext, start, end = current.so_textSource
+                if isinstance(mytext, PositionMap):
+                    mytext, start, end = mytext.textSource(start, end)
+                if tree.source is None:
+                    tree.source = mytext
+                if mytext is tree.source:
+                    textStart, textEnd = start, end
+            if textStart == NO_TEXT and current.so_savedText is not None:
+                savedText = current.so_savedText
+                if isinstance(savedText, memoryview):
+                    savedText = bytes(savedText)
+                textStart, textEnd = STORED_TEXT, len(tree.texts)
+                tree.texts.append(savedText)
+        tree.textStarts.append(textStart)
+        tree.textEnds.append(textEnd)
+
+        span = current.so_span if layout.hasSpan else None
+        tree.spanStarts.append(-1 if span is None else span[0])
+        tree.spanEnds.append(-1 if span is None else span[1])
+
+        for grammarAttrName, _, values in attributeItems(current, layout):
+            if grammarAttrName not in nameIndices:
+                nameIndices[grammarAttrName] = len(tree.attributeNames)
+                tree.attributeNames.append(grammarAttrName)
+            nameIndex = nameIndices[grammarAttrName]
+            for subobj in values:
+                edgeNames.append(nameIndex)
+                subobjIndex = nodeIndices.get(id(subobj))
+                edgeTargets.append(
+                    nodeIndex(subobj) if subobjIndex is None else subobjIndex
+                )
+        tree.edgeOffsets.append(len(edgeTargets))
+
+        for group in current.so_options:
+            # groups are shared between objects
+            if id(group) not in groupIndices:
+                groupIndices[id(group)] = len(tree.memberOffsets) - 1
+                tree.members.extend(nodeIndex(member) for member in group)
+                tree.memberOffsets.append(len(tree.members))
+            tree.nodeGroups.append(groupIndices[id(group)])
+        tree.groupOffsets.append(len(tree.nodeGroups))
+    return tree
+
+
+def narrowArray(values: array) -> array:
+    """
+    Returns the values in an array of the smallest signed type that holds them
+    """
+    low = min(values, default=0)
+    high = max(values, default=0)
+    for typecode in ("b", "h", "i"):
+        limit = 1 << (array(typecode).itemsize * 8 - 1)
+        if -limit <= low and high < limit:
+            return array(typecode, values)
+    return values
+
+
+def packValues(values: list[str | bytes]) -> bytes:
+    """
+    Encodes a list of strings and bytes, each with its type and length
+    """
+    chunks = [struct.pack("<Q", len(values))]
+    for value in values:
+        isText = isinstance(value, str)
+        data = value.encode("utf-8", "surrogatepass") if isText else bytes(value)
+        chunks.append(struct.pack("<BQ", isText, len(data)))
+        chunks.append(data)
+    return b"".join(chunks)
+
+
+def unpackValues(view: memoryview, offset: int) -> tuple[list[str | bytes], int]:
+    """
+    Decodes the values encoded by `packValues()` at offset.
+    Returns them and the offset after them
+    """
+    (count,) = struct.unpack_from("<Q", view, offset)
+    offset += 8
+    values = []
+    for _ in range(count):
+        isText, length = struct.unpack_from("<BQ", view, offset)
+        offset += 9
+        data = bytes(view[offset : offset + length])
+        values.append(data.decode("utf-8", "surrogatepass") if isText else data)
+        offset += length
+    return values, offset
+
+
+def importClass(classPath: str) -> type:
+    moduleName, qualname = classPath.split(":")
+    value = importlib.import_module(moduleName)
+    for name in qualname.split("."):
+        value = getattr(value, name)
+    return value
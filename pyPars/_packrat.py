@@ -0,0 +1,395 @@
+from bisect import bisect_left, bisect_right, insort
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any
+from .text import PosT, Text
+from ._syntax_object import SyntaxObject
+from . import so_modifiers as mod
+
+try:
+    from re import _parser as sre_parse
+except ImportError:
+    import sre_parse
+
+
+@dataclass
+class TextEdit:
+    """
+    Replacement of `removedLength` characters at `offset` with `insertedText`.
+    The offset is in the text as it was before this edit
+    """
+
+    offset: int
+    removedLength: int
+    insertedText: str
+
+
+@dataclass
+class MemoEntry:
+    """
+    The result of parsing a rule at a position.
+    `position` is the end position of the match, or None if the rule failed.
+    """
+
+    # Referencing the rule keeps it alive, so its id can't be reused while the entry exists
+    rule: Any
+    position: PosT | None
+    syntaxObjects: list[SyntaxObject] = field(default_factory=list)
+    # End of the text that was looked at while parsing, None if it wasn't tracked
+    examinedEnd: PosT | None = None
+    # The offset of the region of the entry and the number of edits
+    # when its positions were last updated (see PositionMap)
+    offset: int = 0
+    editCount: int = 0
+
+
+class PositionMap:
+    """
+    Maps the positions stored in a PackratMemo to the positions in its current text.
+    Each edit splits the text into regions, and the positions in a region move by
+    the same offset. The results and the objects of the memo keep the positions
+    of the text they were parsed in, so an edit only updates the regions after it.
+    The text inserted by an edit gets stored positions below the used ones.
+    """
+
+    def __init__(self) -> None:
+        # the current text, sliced by the TextSaver objects of the memo
+        self.text: Text | None = None
+        # the regions in text order: their current start, their offset
+        # (current - stored position) and the edit that made the boundary at their start
+        self.starts: list[int] = [0]
+        self.offsets: list[int] = [0]
+        self.editCounts: list[int] = [0]
+        # the stored starts of the regions in order, and their offsets
+        self.storedStarts: list[int] = [0]
+        self.storedOffsets: list[int] = [0]
+        self.editCount = 0
+        self.insertedStart = 0
+
+    def toStored(self, pos: PosT) -> tuple[PosT, int]:
+        """
+        Returns the stored position of pos and the offset of its region
+        """
+        if self.editCount == 0:
+            return pos, 0
+        offset = self.offsets[bisect_right(self.starts, pos) - 1]
+        return pos - offset, offset
+
+    def span(self, storedStart: PosT, storedEnd: PosT) -> tuple[PosT, PosT]:
+        """
+        Returns the current span of a stored one, which lies in a single region
+        """
+        if self.editCount == 0:
+            return storedStart, storedEnd
+        offset = self.storedOffsets[bisect_right(self.storedStarts, storedStart) - 1]
+        return storedStart + offset, storedEnd + offset
+
+    def __getitem__(self, storedSpan: slice) -> Any:
+        start, end = self.span(storedSpan.start, storedSpan.stop)
+        return self.text[start:end]
+
+    def textSource(self, storedStart: PosT, storedEnd: PosT) -> tuple[Text, PosT, PosT]:
+        """
+        Returns the current text and the current span of a stored span
+        """
+        return (self.text, *self.span(storedStart, storedEnd))
+
+    def editedBetween(self, start: int, end: int, editCount: int) -> bool:
+        """
+        Whether an edit after the first editCount ones was made strictly between
+        the current positions start and end
+        """
+        first = bisect_right(self.starts, start)
+        last = bisect_left(self.starts, end)
+        return first < last and max(self.editCounts[first:last]) > editCount
+
+    def applyEdit(self, edit: TextEdit) -> list[tuple[int, int]]:
+        """
+        Splits the regions at the edit and moves the regions after it.
+        Returns the stored spans of the removed text
+        """
+        editEnd = edit.offset + edit.removedLength
+        insertedLength = len(edit.insertedText)
+        shift = insertedLength - edit.removedLength
+        if edit.removedLength == 0 and insertedLength == 0:
+            return []
+        self.editCount += 1
+
+        first = bisect_right(self.starts, edit.offset) - 1
+        last = bisect_right(self.starts, editEnd) - 1
+        removed = []
+        for index in range(first, last + 1):
+            start = max(self.starts[index], edit.offset)
+            end = editEnd if index == last else min(self.starts[index + 1], editEnd)
+            if start < end:
+                removed.append((start - self.offsets[index], end - self.offsets[index]))
+
+        # the regions up to the edit, the inserted text and the rest of the last region
+        keep = first + 1 if self.starts[first] < edit.offset else first
+        starts, offsets = self.starts[:keep], self.offsets[:keep]
+        editCounts = self.editCounts[:keep]
+        if insertedLength > 0:
+            self.insertedStart -= insertedLength
+            starts.append(edit.offset)
+            offsets.append(edit.offset - self.insertedStart)
+            editCounts.append(self.editCount)
+        starts.append(edit.offset + insertedLength)
+        offsets.append(self.offsets[last] + shift)
+        editCounts.append(self.editCount)
+        starts.extend(start + shift for start in self.starts[last + 1 :])
+        offsets.extend(offset + shift for offset in self.offsets[last + 1 :])
+        editCounts.extend(self.editCounts[last + 1 :])
+        self.starts, self.offsets, self.editCounts = starts, offsets, editCounts
+
+        stored = sorted(
+            (start - offset, offset) for start, offset in zip(starts, offsets)
+        )
+        self.storedStarts = [storedStart for storedStart, _ in stored]
+        self.storedOffsets = [offset for _, offset in stored]
+        return removed
+
+
+class PackratMemo:
+    """
+    A memo table of parsing results, keyed by the rule identity and the start position.
+    Pass it to `parse()` to avoid re-parsing the same rule at the same position,
+    which makes parsing linear in the size of the input at the cost of memory.
+
+    `maxEntries` bounds the size of the table (None means unbounded).
+    `eviction` selects which entry is dropped when the table is full:
+    "lru" drops the least recently used entry, "fifo" drops the oldest stored entry.
+
+    A memo belongs to a single text. With `trackExtents`, it also records how far
+    each result looked into the text, so that after editing the text, `applyEdits()`
+    can keep the results that weren't affected and the next `parse()` reuses them.
+    Patterns are assumed to look at most `lookahead` characters past where they stop.
+    The results are then keyed by their stored position in `positionMap`.
+    """
+
+    EVICTION_POLICIES = ("lru", "fifo")
+
+    def __init__(
+        self,
+        maxEntries: int | None = None,
+        eviction: str = "lru",
+        trackExtents: bool = False,
+        lookahead: int = 1,
+    ) -> None:
+        if eviction not in PackratMemo.EVICTION_POLICIES:
+            raise ValueError(
+                f"Unknown eviction policy '{eviction}', expected one of {PackratMemo.EVICTION_POLICIES}"
+            )
+        if maxEntries is not None and maxEntries < 1:
+            raise ValueError("maxEntries must be a positive number or None")
+
+        self.maxEntries = maxEntries
+        self.eviction = eviction
+        self.entries: OrderedDict[tuple[int, PosT], MemoEntry] = OrderedDict()
+        # the positions that have entries in order, and the rule ids of their entries
+        self.positions: list[PosT] = []
+        self.positionRules: dict[PosT, set[int]] = {}
+
+        # Left recursion seeds read while still growing.
+        # Results that depend on an unfinished seed can't be memoized.
+        self.seedReads: list = []
+
+        self.trackExtents = trackExtents
+        self.lookahead = lookahead
+        self.positionMap = PositionMap() if trackExtents else None
+        # End of the text looked at by the rule that is currently being parsed
+        self.examinedEnd: int | None = None
+        self.patternWidths: dict[Any, int | None] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def lookup(self, rule: Any, pos: PosT) -> MemoEntry | None:
+        """
+        Returns the stored result of parsing `rule` at `pos`, or None if it isn't known
+        """
+        offset = 0
+        if self.positionMap is not None:
+            storedPos, offset = self.positionMap.toStored(pos)
+            key = (id(rule), storedPos)
+        else:
+            key = (id(rule), pos)
+        entry = self.entries.get(key)
+        if (
+            entry is not None
+            and self.positionMap is not None
+            and entry.editCount != self.positionMap.editCount
+            and not self.revalidate(key, entry, pos, offset)
+        ):
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        if self.eviction == "lru":
+            self.entries.move_to_end(key)
+        return entry
+
+    def revalidate(
+        self, key: tuple[int, PosT], entry: MemoEntry, pos: int, offset: int
+    ) -> bool:
+        """
+        Moves an entry stored before the last edits to pos.
+        Drops it and returns False if an edit was made in the text it looked at
+        """
+        shift = offset - entry.offset
+        if entry.examinedEnd is None or self.positionMap.editedBetween(
+            pos, entry.examinedEnd + shift, entry.editCount
+        ):
+            del self.entries[key]
+            self.unindex(*key)
+            return False
+
+        if entry.position is not None:
+            entry.position += shift
+        entry.examinedEnd += shift
+        entry.offset = offset
+        entry.editCount = self.positionMap.editCount
+        return True
+
+    def store(
+        self,
+        rule: Any,
+        pos: PosT,
+        endPos: PosT | None,
+        syntaxObjects: list[SyntaxObject],
+        examinedEnd: PosT | None = None,
+    ) -> None:
+        """
+        Stores the result of parsing `rule` at `pos`, evicting old entries if the table is full
+        """
+        entry = MemoEntry(rule, endPos, syntaxObjects, examinedEnd)
+        if self.positionMap is not None:
+            pos, entry.offset = self.positionMap.toStored(pos)
+            entry.editCount = self.positionMap.editCount
+        key = (id(rule), pos)
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        if pos not in self.positionRules:
+            insort(self.positions, pos)
+            self.positionRules[pos] = set()
+        self.positionRules[pos].add(id(rule))
+
+        if self.maxEntries is not None:
+            while len(self.entries) > self.maxEntries:
+                (ruleId, evictedPos), _ = self.entries.popitem(last=False)
+                self.unindex(ruleId, evictedPos)
+                self.evictions += 1
+
+    def unindex(self, ruleId: int, pos: PosT) -> None:
+        rules = self.positionRules[pos]
+        rules.discard(ruleId)
+        if len(rules) == 0:
+            del self.positionRules[pos]
+            del self.positions[bisect_left(self.positions, pos)]
+
+    def dropPositions(self, first: int, last: int) -> None:
+        """
+        Drops the results at self.positions[first:last]
+        """
+        for droppedPos in self.positions[first:last]:
+            for ruleId in self.positionRules.pop(droppedPos):
+                del self.entries[(ruleId, droppedPos)]
+        del self.positions[first:last]
+
+    def release(self, pos: PosT) -> None:
+        """
+        Drops the results at the positions before pos, which the parse won't go back to.
+        Parses with a Cut call it for the positions they committed
+        """
+        self.dropPositions(0, bisect_left(self.positions, pos))
+
+    def clear(self) -> None:
+        self.entries.clear()
+        self.positions.clear()
+        self.positionRules.clear()
+        self.seedReads.clear()
+
+    def examine(self, end: int | None) -> None:
+        """
+        Notes that the text was looked at up to end
+        """
+        if end is not None and (self.examinedEnd is None or end > self.examinedEnd):
+            self.examinedEnd = end
+
+    def examineLiteral(self, prefix: Any, pos: int) -> None:
+        self.examine(pos + len(prefix))
+
+    def examinePattern(self, pattern: Any, pos: int, match: Any) -> None:
+        if match is not None:
+            self.examine(match.span[1] + self.lookahead)
+            return
+
+        if pattern not in self.patternWidths:
+            maxWidth = sre_parse.parse(pattern.pattern, pattern.flags).getwidth()[1]
+            self.patternWidths[pattern] = (
+                None if maxWidth >= sre_parse.MAXREPEAT else maxWidth
+            )
+        maxWidth = self.patternWidths[pattern]
+        self.examine(pos + (0 if maxWidth is None else maxWidth) + self.lookahead)
+
+    def beginExamining(self, pos: int) -> int | None:
+        """
+        Starts tracking the extent of a new result, returns the extent of the enclosing one
+        """
+        outerExaminedEnd = self.examinedEnd
+        self.examinedEnd = pos
+        return outerExaminedEnd
+
+    def endExamining(self, outerExaminedEnd: int | None) -> int | None:
+        """
+        Returns the extent of the finished result and continues tracking the enclosing one
+        """
+        examinedEnd = self.examinedEnd
+        self.examinedEnd = outerExaminedEnd
+        self.examine(examinedEnd)
+        return examinedEnd
+
+    def applyEdits(self, edits: list[TextEdit]) -> None:
+        """
+        Drops the results at the edited parts of the text and moves the results
+        after each edit to their new positions, along with the spans and the saved
+        texts of their objects. This only updates the regions of `positionMap`,
+        the results that looked at an edited part are dropped when they are looked up.
+        The previous parse result shouldn't be used after its memo was edited.
+        """
+        if self.positionMap is None:
+            # the results don't know which part of the text they looked at
+            self.clear()
+        else:
+            for edit in edits:
+                for storedStart, storedEnd in self.positionMap.applyEdit(edit):
+                    self.dropPositions(
+                        bisect_left(self.positions, storedStart),
+                        bisect_left(self.positions, storedEnd),
+                    )
+        self.seedReads.clear()
+        self.examinedEnd = None
+
+
+def shiftSpans(syntaxObject: SyntaxObject, shift: int, shifted: set[int]) -> None:
+    """
+    Moves the spans in the tree rooted at syntaxObject, visiting shared objects once
+    """
+    stack = [syntaxObject]
+    while len(stack) > 0:
+        current = stack.pop()
+        if id(current) in shifted:
+            continue
+        shifted.add(id(current))
+
+        if isinstance(current, mod.SpanSaver) and current.so_span is not None:
+            current.so_span = (current.so_span[0] + shift, current.so_span[1] + shift)
+        for grammarAttrName in current.so_grammarAttributeNames:
+            stack.extend(getattr(current, grammarAttrName))
+        for group in current.so_options:
+            stack.extend(group)
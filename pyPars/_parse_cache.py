@@ -0,0 +1,240 @@
+import hashlib
+import os
+import re
+import struct
+import tempfile
+from .text import Text, NatT, PosT, PatternT, MatchT
+from ._syntax_object import SyntaxObject
+from ._rules import (
+    Concat,
+    Opt,
+    OneOrMore,
+    ZeroOrMore,
+    Cut,
+    Attr,
+    SelectionFirst,
+    Selection,
+    SelectionLongest,
+    GrammarClass,
+    GrammarRule,
+)
+from ._rule_canonize import tryCanonize
+from ._parsing import parse
+from ._packed_tree import packTree, PackedTree, FORMAT_VERSION
+import forward_decl as fw
+
+
+# Changes when the layout of the cache entries changes
+CACHE_VERSION = 1
+ENTRY_SUFFIX = ".tree"
+
+
+def grammarFingerprint(rule: GrammarRule) -> str:
+    """
+    Returns a hash of the structure of the grammar: its rules, literals and patterns,
+    and the names and bases of its GrammarClasses.
+    It is the same in every process for the same grammar, and changes with any change
+    to the grammar that could change the parsed trees
+    """
+    digest = hashlib.sha256()
+    # the GrammarClasses in the order they were reached, referred to by their index
+    classIndices: dict[GrammarClass, int] = {}
+    pending = [rule]
+    while len(pending) > 0:
+        current = pending.pop()
+        if isinstance(current, fw.OpaqueFwRef):
+            current = current.get_ref()
+        current = tryCanonize(current)
+
+        if isinstance(current, (str, bytes)):
+            token = f"literal {current!r}"
+        elif isinstance(current, re.Pattern):
+            token = f"pattern {current.pattern!r} {current.flags}"
+        elif current is Cut:
+            token = "cut"
+        elif isinstance(current, Concat):
+            items = list(current.items)
+            token = f"concat {len(items)}"
+            pending.extend(reversed(items))
+        elif isinstance(current, (SelectionFirst, Selection, SelectionLongest)):
+            token = f"{type(current).__name__} {len(current.options)}"
+            pending.extend(reversed(current.options))
+        elif isinstance(current, (Opt, OneOrMore, ZeroOrMore)):
+            token = type(current).__name__
+            pending.append(current.rule)
+        elif isinstance(current, Attr):
+            token = f"attr {current.name!r}"
+            pending.append(current.attrClasses)
+        elif isinstance(current, GrammarClass):
+            if current in classIndices:
+                token = f"class {classIndices[current]}"
+            else:
+                classIndices[current] = len(classIndices)
+                bases = " ".join(
+                    f"{base.__module__}:{base.__qualname__}" for base in current.__mro__
+                )
+                token = f"class {bases}"
+                pending.append(current.grammar)
+        else:
+            token = f"{type(current).__qualname__} {current!r}"
+            if " at 0x" in token:
+                raise TypeError(
+                    f"Can't fingerprint the rule {token}, its representation isn't stable"
+                )
+        digest.update(token.encode("utf-8", "backslashreplace"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class ParseCache:
+    """
+    A cache of parsed trees in a directory, shared by runs and processes.
+    Entries are keyed by the fingerprint of the grammar, the type of the text,
+    the parsed position and a hash of the content of the text, so a changed grammar
+    or input never loads a stale tree. The trees are stored packed, see `packTree()`.
+
+    When the entries take more than maxSize bytes, the least recently used ones are removed.
+    The fingerprints of the grammars are computed on their first use by the cache,
+    so a grammar must not be changed while the cache is used with it.
+    """
+
+    def __init__(self, directory: str | os.PathLike, maxSize: int = 1 << 30) -> None:
+        self.directory = os.fspath(directory)
+        self.maxSize = maxSize
+        self.hits = 0
+        self.misses = 0
+        # the size of the entries as of the last scan and the entries stored since,
+        # None before the first scan
+        self.knownSize: int | None = None
+        # the rules are kept, so that their ids can't be reused
+        self.fingerprints: dict[int, tuple[GrammarRule, str]] = {}
+        os.makedirs(self.directory, exist_ok=True)
+
+    def fingerprint(self, rule: GrammarRule) -> str:
+        if id(rule) not in self.fingerprints:
+            self.fingerprints[id(rule)] = (rule, grammarFingerprint(rule))
+        return self.fingerprints[id(rule)][1]
+
+    def entryKey(self, mytext: Text, pos: PosT, rule: GrammarRule) -> str:
+        content = mytext[mytext.getStartPos() :]
+        if isinstance(content, str):
+            content = content.encode("utf-8", "surrogatepass")
+        digest = hashlib.sha256()
+        digest.update(
+            f"{CACHE_VERSION} {FORMAT_VERSION} {self.fingerprint(rule)}"
+            f" {type(mytext).__module__}:{type(mytext).__qualname__} {pos}\0".encode()
+        )
+        digest.update(content)
+        return digest.hexdigest()
+
+    def entryPath(self, key: str) -> str:
+        return os.path.join(self.directory, key + ENTRY_SUFFIX)
+
+    def parse(
+        self,
+        mytext: Text[NatT, PosT, PatternT, MatchT],
+        pos: PosT,
+        rule: GrammarRule,
+        attrStore: SyntaxObject | None = None,
+        engine: str = "recursive",
+    ) -> PosT | None:
+        """
+        Same as `parse()`, but loads the parsed attributes from the cache if the text
+        was already parsed with the grammar, and stores them otherwise.
+        The text must keep its content, so that it can be hashed
+        """
+        if not mytext.keepsContent:
+            raise TypeError(
+                f"Texts of type '{type(mytext).__name__}' don't keep their content, they can't be cached"
+            )
+        if attrStore is None:
+            attrStore = SyntaxObject()
+
+        path = self.entryPath(self.entryKey(mytext, pos, rule))
+        try:
+            with open(path, "rb") as file:
+                data = file.read()
+        except FileNotFoundError:
+            data = None
+        if data is not None:
+            # marks the entry as recently used
+            os.utime(path)
+            self.hits += 1
+            (endPos,) = struct.unpack_from("<q", data)
+            attrStore.extend(PackedTree.fromBytes(data[8:], mytext).root())
+            return None if endPos == -1 else endPos
+
+        self.misses += 1
+        endPos = parse(mytext, pos, rule, attrStore, engine=engine)
+        self.store(
+            path,
+            struct.pack("<q", -1 if endPos is None else endPos)
+            + packTree(attrStore, mytext).toBytes(),
+        )
+        return endPos
+
+    def store(self, path: str, data: bytes) -> None:
+        """
+        Writes an entry atomically, so that other processes never read part of it
+        """
+        fd, temporaryPath = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                file.write(data)
+            os.replace(temporaryPath, path)
+        except BaseException:
+            os.unlink(temporaryPath)
+            raise
+
+        # the directory is only scanned again when the entries may take too much space
+        if self.knownSize is None:
+            self.knownSize = self.size()
+        else:
+            self.knownSize += len(data)
+        if self.knownSize > self.maxSize:
+            self.evict()
+
+    def entries(self) -> list[tuple[float, int, str]]:
+        """
+        Returns the last use, size and path of each entry, the least recently used first
+        """
+        entries = []
+        with os.scandir(self.directory) as scan:
+            for entry in scan:
+                if not entry.name.endswith(ENTRY_SUFFIX):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    # removed by another process
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        entries.sort()
+        return entries
+
+    def size(self) -> int:
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self) -> None:
+        """
+        Removes the least recently used entries until they take at most maxSize bytes
+        """
+        entries = self.entries()
+        totalSize = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if totalSize <= self.maxSize:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            totalSize -= size
+        self.knownSize = totalSize
+
+    def clear(self) -> None:
+        for _, _, path in self.entries():
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+        self.knownSize = 0
@@ -5,6 +5,7 @@ from ._rules import (
     Opt,
     OneOrMore,
     ZeroOrMore,
+    Cut,
     Attr,
     SelectionFirst,
     Selection,
@@ -14,6 +15,9 @@ from ._rules import (
     CanonGrammarRule,
 )
 from ._rule_canonize import tryCanonize
+from ._packrat import PackratMemo, PositionMap, TextEdit
+from ._tracing import ParseTracer
+from ._first_sets import DispatchTables, dispatchTablesFor
 from . import so_modifiers as mod
 from dataclasses import dataclass
 import forward_decl as fw
@@ -23,6 +27,7 @@ import forward_decl as fw
 class LeftRecursiveIterationContext:
     position: PosT
     attrStore: SyntaxObject | None
+    complete: bool = False
 
 
 class LeftRecursionException(Exception):
@@ -31,78 +36,363 @@ class LeftRecursionException(Exception):
         self.grammar_cls = grammar_cls
 
 
+class CutFailure(Exception):
+    """
+    Raised when an option fails after its Cut matched.
+    The enclosing selection or GrammarClass fails without trying other options
+    """
+
+
+class CommitPoints:
+    """
+    The positions a parse may still go back to, so that a matched Cut can tell the text
+    and the memo that the positions before them won't be read again.
+    `choices` are where the next attempt starts if the current one fails:
+    optional parts, repetition items, and the options left in a selection.
+    The selections and attributes that stop a CutFailure note in `boundaries`
+    how many choices are still tried after they stopped one.
+    `resumes` are read again when the current attempt succeeds:
+    the starts of the TextSaver objects being parsed and of growing left recursions.
+    Each method that adds positions returns a mark to remove them with `reset()`
+    """
+
+    def __init__(self, mytext: Text, memo: PackratMemo | None) -> None:
+        self.mytext = mytext
+        # the results kept for reparsing edits aren't released
+        self.memo = memo if memo is not None and not memo.trackExtents else None
+        self.choices: list[PosT] = []
+        self.boundaries: list[int] = []
+        self.resumes: list[PosT] = []
+        self.committed: PosT | None = None
+
+    def mark(self) -> tuple[int, int, int]:
+        return len(self.choices), len(self.boundaries), len(self.resumes)
+
+    def reset(self, mark: tuple[int, int, int]) -> None:
+        """
+        Removes the positions added since mark, including those of the nested
+        attempts that raised instead of returning
+        """
+        del self.choices[mark[0] :]
+        del self.boundaries[mark[1] :]
+        del self.resumes[mark[2] :]
+
+    def attempt(self, pos: PosT) -> tuple[int, int, int]:
+        """
+        Adds an attempt that is followed by parsing at pos if it fails
+        """
+        mark = self.mark()
+        self.choices.append(pos)
+        return mark
+
+    def option(
+        self, pos: PosT, lastOption: bool, growing: bool
+    ) -> tuple[int, int, int]:
+        """
+        Adds an option of a selection at pos, the selection fails after a CutFailure
+        """
+        mark = self.mark()
+        self.boundaries.append(len(self.choices))
+        if not lastOption:
+            self.choices.append(pos)
+        if growing:
+            # a left recursion is parsed again from pos once it grew
+            self.resumes.append(pos)
+        return mark
+
+    def candidate(
+        self, pos: PosT, lastCandidate: bool, savesText: bool
+    ) -> tuple[int, int, int]:
+        """
+        Adds a class tried by an attribute at pos, the next class is tried after
+        a CutFailure
+        """
+        mark = self.mark()
+        if not lastCandidate:
+            self.choices.append(pos)
+        self.boundaries.append(len(self.choices))
+        if savesText:
+            self.resumes.append(pos)
+        return mark
+
+    def cut(self, pos: PosT) -> None:
+        """
+        Commits the positions before the oldest one that can still be read,
+        after a Cut matched at pos
+        """
+        limit = pos
+        if len(self.boundaries) > 0 and self.boundaries[-1] > 0:
+            # positions only grow from the first choice to the last one
+            limit = min(limit, self.choices[0])
+        if len(self.resumes) > 0:
+            limit = min(limit, self.resumes[0])
+        self.commit(limit)
+
+    def commit(self, pos: PosT) -> None:
+        """
+        Tells the text and the memo that the positions before pos won't be read again
+        """
+        if self.committed is None or pos > self.committed:
+            self.committed = pos
+            self.mytext.commit(pos)
+            if self.memo is not None:
+                self.memo.release(pos)
+
+
+def commitPointsFor(
+    mytext: Text,
+    rule: GrammarRule,
+    memo: PackratMemo | None,
+    dispatchTables: DispatchTables,
+) -> CommitPoints | None:
+    """
+    Returns the CommitPoints of a parse of the rule, or None if its Cuts can't free
+    anything: there are none, the text keeps its content and there is no memo to release
+    """
+    releasesMemo = memo is not None and not memo.trackExtents
+    if (releasesMemo or not mytext.keepsContent) and dispatchTables.reachesCut(rule):
+        return CommitPoints(mytext, memo)
+    return None
+
+
+def forgetInvolvedRules(
+    ruleId2recursionContext: dict[int, LeftRecursiveIterationContext | None],
+    outerRuleIds: set[int],
+) -> None:
+    """
+    Removes the recursion contexts of the rules entered while growing a left recursion.
+    Their results were built on the seed being grown, so each grown seed parses them again
+    """
+    if len(ruleId2recursionContext) > len(outerRuleIds):
+        for ruleId in [
+            ruleId
+            for ruleId in ruleId2recursionContext
+            if ruleId not in outerRuleIds
+        ]:
+            del ruleId2recursionContext[ruleId]
+
+
 @dataclass
 class ParseState:
     position: PosT
     currentObject: SyntaxObject
 
 
+def finalizeSyntaxObject(
+    mytext: Text[NatT, PosT, PatternT, MatchT],
+    startPos: PosT,
+    endPos: PosT,
+    newSyntaxObject: SyntaxObject,
+    positionMap: PositionMap | None = None,
+) -> list[SyntaxObject]:
+    """
+    Applies the SyntaxObject modifiers to a successfully parsed object.
+    Returns the SyntaxObject options that should be stored in the attribute.
+    With the positionMap of a memo, the span and the text follow the edits of the memo
+    """
+    newSyntaxObjectSpan = (startPos, endPos)
+    spanSource = None
+    if positionMap is not None and isinstance(
+        newSyntaxObject, (mod.TextSaver, mod.SpanSaver)
+    ):
+        storedStart, offset = positionMap.toStored(startPos)
+        spanSource = (positionMap, storedStart, endPos - offset)
+
+    # Satisfy the TextSaver modifier
+    if isinstance(newSyntaxObject, mod.TextSaver):
+        if not mytext.keepsContent:
+            newSyntaxObject.so_savedText = mytext[
+                newSyntaxObjectSpan[0] : newSyntaxObjectSpan[1]
+            ]
+        elif spanSource is not None:
+            # sliced from the current text of the memo when it is read
+            newSyntaxObject.so_textSource = spanSource
+        else:
+            # sliced when it is read
+            newSyntaxObject.so_textSource = (mytext, startPos, endPos)
+    # Satisfy the SpanSaver modifier
+    if isinstance(newSyntaxObject, mod.SpanSaver):
+        if spanSource is not None:
+            newSyntaxObject.so_spanSource = spanSource
+        else:
+            newSyntaxObject.so_spanValue = newSyntaxObjectSpan
+    # Satisfy the SelfReplacable modifier
+    trySelfReplace = True
+    newSyntaxObjectOptions = [newSyntaxObject]
+    while trySelfReplace:
+        trySelfReplace = False
+        nextSyntaxObjectOptions = []
+        for opt in newSyntaxObjectOptions:
+            if (
+                isinstance(opt, mod.SelfReplacable)
+                and "self" in opt.so_grammarAttributeNames
+            ):
+                trySelfReplace = True
+                nextSyntaxObjectOptions.extend(opt.self)
+            else:
+                nextSyntaxObjectOptions.append(opt)
+        newSyntaxObjectOptions = nextSyntaxObjectOptions
+
+    return newSyntaxObjectOptions
+
+
+def parseGrammarClassInstance(
+    mytext: Text[NatT, PosT, PatternT, MatchT],
+    startPos: PosT,
+    attrClass: GrammarClass,
+    ruleId2recursionContext: dict[int, LeftRecursiveIterationContext],
+    memo: PackratMemo | None = None,
+    tracer: ParseTracer | None = None,
+    dispatchTables: DispatchTables | None = None,
+    commits: CommitPoints | None = None,
+) -> tuple[PosT | None, list[SyntaxObject]]:
+    """
+    Parses a new instance of attrClass and applies the SyntaxObject modifiers to it.
+    Returns the end position (or None if it failed) and the resulting SyntaxObject options
+    """
+    newSyntaxObject: SyntaxObject = attrClass()
+
+    newPos = None
+    if tracer is not None:
+        tracer.enterRule(attrClass, startPos)
+    try:
+        newPos = parseLeftRecursive(
+            mytext,
+            startPos,
+            attrClass.grammar,
+            ruleId2recursionContext,
+            newSyntaxObject,
+            memo,
+            tracer,
+            dispatchTables,
+            commits,
+        )
+    finally:
+        if tracer is not None:
+            tracer.exitRule(attrClass, startPos, newPos)
+
+    if newPos is None:
+        return None, []
+    return newPos, finalizeSyntaxObject(
+        mytext,
+        startPos,
+        newPos,
+        newSyntaxObject,
+        None if memo is None else memo.positionMap,
+    )
+
+
 def parseLeftRecursive(
     mytext: Text[NatT, PosT, PatternT, MatchT],
     startPos: PosT,
     currentRule: GrammarRule,
     ruleId2recursionContext: dict[int, LeftRecursiveIterationContext],
-) -> list[ParseState]:
+    currentObject: SyntaxObject,
+    memo: PackratMemo | None = None,
+    tracer: ParseTracer | None = None,
+    dispatchTables: DispatchTables | None = None,
+    commits: CommitPoints | None = None,
+) -> PosT | None:
     """
-    Returns the end position of the successful match or None if it failed
+    Returns the end position of the successful match or None if it failed.
+    `dispatchTables` are shared by the nested calls, a top level call takes those of its rule.
+    `commits` follows the positions that Cuts can commit, None if nothing is committed
     """
+    if dispatchTables is None:
+        dispatchTables = dispatchTablesFor(currentRule, type(mytext))
     PosT = mytext.GetPositionType()
     NatT = mytext.GetNativeType()
     PatternT = mytext.GetPatternType()
     MatchT = mytext.GetMatchType()
 
-    currentObject = SyntaxObject()
-
     currentRule = tryCanonize(currentRule)
 
     if isinstance(currentRule, NatT):
-        if mytext.startswith(currentRule, startPos):
-            return [ParseState(startPos + len(currentRule), currentObject)]
+        m = mytext.startswith(currentRule, startPos)
+        if memo is not None and memo.trackExtents:
+            memo.examineLiteral(currentRule, startPos)
+        if m is None:
+            return None
         else:
-            return []
+            return m.span[1]
     elif isinstance(currentRule, PatternT):
         m = mytext.matchedby(currentRule, startPos)
+        if memo is not None and memo.trackExtents:
+            memo.examinePattern(currentRule, startPos, m)
         if m is None:
-            return []
+            return None
         else:
-            return [(m.span[1], currentObject)]
+            return m.span[1]
+    elif currentRule is Cut:
+        # outside of a concatenation there is nothing left to commit to
+        return startPos
     elif isinstance(currentRule, Concat):
-        if len(currentRule) >= 1:
-            newPos, newObject = parseLeftRecursive(
-                mytext, startPos, currentRule[0], ruleId2recursionContext
+        newPos = startPos
+        # only the first part starts at the same position, so only it can recurse to the left
+        recursionContext = ruleId2recursionContext
+        committed = False
+        for rulepart in currentRule.items:
+            if rulepart is Cut:
+                committed = True
+                if commits is not None:
+                    commits.cut(newPos)
+                continue
+            newPos = parseLeftRecursive(
+                mytext,
+                newPos,
+                rulepart,
+                recursionContext,
+                currentObject,
+                memo,
+                tracer,
+                dispatchTables,
+                commits,
             )
-            if newPos is not None:
-                currentObject.extend(newObject)
-            else:
+            if newPos is None:
+                if committed:
+                    raise CutFailure()
                 return None
-            for rulepart in currentRule[1:]:
-                newPos = parseLeftRecursive(mytext, newPos, rulepart, {}, currentObject)
-                if newPos is not None:
-                    currentObject.extend(newObject)
-                else:
-                    return None
-            return [(newPos, currentObject)]
-        else:
-            return [(startPos, currentObject)]
+            recursionContext = {}
+        return newPos
     elif isinstance(currentRule, Selection):
         minPos = None
         validOptions: list[SyntaxObject] = []
 
-        for option in currentRule.options:
-            tempObject = SyntaxObject(set())
-            newPos = parseLeftRecursive(
-                mytext, startPos, option, ruleId2recursionContext, tempObject
-            )
+        for index, option in enumerate(currentRule.options):
+            tempObject = SyntaxObject()
+            if commits is not None:
+                mark = commits.option(
+                    startPos, index == len(currentRule.options) - 1, False
+                )
+            try:
+                newPos = parseLeftRecursive(
+                    mytext,
+                    startPos,
+                    option,
+                    ruleId2recursionContext,
+                    tempObject,
+                    memo,
+                    tracer,
+                    dispatchTables,
+                    commits,
+                )
+            except CutFailure:
+                return None
+            finally:
+                if commits is not None:
+                    commits.reset(mark)
+            if newPos is None and tracer is not None:
+                tracer.backtrack(startPos)
             if newPos is not None:
                 if minPos is None or newPos < minPos:
                     minPos = newPos
-                    multiAttrStores = [tempObject]
+                    validOptions = [tempObject]
                 elif newPos == minPos:
-                    multiAttrStores.append(tempObject)
+                    validOptions.append(tempObject)
 
         if len(validOptions) > 0:
             currentObject.extendOptions(validOptions)
-            return minPos
+        return minPos
     elif isinstance(currentRule, SelectionFirst) or isinstance(
         currentRule, SelectionLongest
     ):
@@ -110,14 +400,15 @@ def parseLeftRecursive(
 
         # check if we already visited this rule at this position in text
         if id(currentRule) in ruleId2recursionContext:
-            if ruleId2recursionContext[id(currentRule)] is None:
+            recursionContext = ruleId2recursionContext[id(currentRule)]
+            if recursionContext is None:
                 raise LeftRecursionException(currentRule)
             else:
+                if memo is not None and not recursionContext.complete:
+                    memo.seedReads.append(recursionContext)
                 if currentObject is not None:
-                    currentObject.extend(
-                        ruleId2recursionContext[id(currentRule)].attrStore
-                    )
-                return ruleId2recursionContext[id(currentRule)].position
+                    currentObject.extend(recursionContext.attrStore)
+                return recursionContext.position
         else:
             # Prepare for possible recursion later
             ruleId2recursionContext[id(currentRule)] = None
@@ -129,11 +420,20 @@ def parseLeftRecursive(
             higherPriorityRecursions = []
 
             tryRecursions = False
+            newPos = None
 
-            # first check non-left-recursive options
-            for ruleoption in currentRule.options:
-                tempObject = SyntaxObject(set())
+            # first check non-left-recursive options,
+            # skipping those that can't start with the next character
+            candidates = dispatchTables.candidates(currentRule, mytext, startPos)
+            for index, ruleoption in enumerate(candidates):
+                tempObject = SyntaxObject()
                 newPos = None
+                if commits is not None:
+                    mark = commits.option(
+                        startPos,
+                        index == len(candidates) - 1,
+                        len(higherPriorityRecursions) > 0,
+                    )
                 try:
                     newPos = parseLeftRecursive(
                         mytext,
@@ -141,79 +441,162 @@ def parseLeftRecursive(
                         ruleoption,
                         ruleId2recursionContext,
                         tempObject,
+                        memo,
+                        tracer,
+                        dispatchTables,
+                        commits,
                     )
                 except LeftRecursionException as e:
                     if e.grammar_cls is currentRule:
                         higherPriorityRecursions.append(ruleoption)
                         tryRecursions = True
+                        continue
                     else:
+                        del ruleId2recursionContext[id(currentRule)]
                         raise
+                except CutFailure:
+                    del ruleId2recursionContext[id(currentRule)]
+                    return None
+                finally:
+                    if commits is not None:
+                        commits.reset(mark)
 
                 if newPos is not None:
-                    ruleId2recursionContext[
-                        id(currentRule)
-                    ] = LeftRecursiveIterationContext(newPos, tempObject)
+                    recursionContext = LeftRecursiveIterationContext(newPos, tempObject)
+                    ruleId2recursionContext[id(currentRule)] = recursionContext
                     break
+                if tracer is not None:
+                    tracer.backtrack(startPos)
 
             if newPos is None:
+                del ruleId2recursionContext[id(currentRule)]
                 return None
 
             # now keep checking while we can extend current node by deepening the recursion
             oldpos = newPos
+            # rules entered by the growing options are involved in the recursion,
+            # so their contexts are dropped after each attempt while the seed is reused
+            outerRuleIds = set(ruleId2recursionContext)
             while tryRecursions:
+                if tracer is not None:
+                    tracer.leftRecursionGrowth(startPos)
                 tryRecursions = False
                 indexReached = 0
                 for indexReached, ruleoption in enumerate(higherPriorityRecursions):
-                    tempObject = SyntaxObject(set())
-                    newPos = parseLeftRecursive(
-                        mytext,
-                        startPos,
-                        ruleoption,
-                        ruleId2recursionContext,
-                        tempObject,
-                    )
+                    tempObject = SyntaxObject()
+                    if commits is not None:
+                        mark = commits.option(
+                            startPos,
+                            indexReached == len(higherPriorityRecursions) - 1,
+                            True,
+                        )
+                    try:
+                        newPos = parseLeftRecursive(
+                            mytext,
+                            startPos,
+                            ruleoption,
+                            ruleId2recursionContext,
+                            tempObject,
+                            memo,
+                            tracer,
+                            dispatchTables,
+                            commits,
+                        )
+                    except CutFailure:
+                        # a committed option failed to grow the match, keep what it has
+                        forgetInvolvedRules(ruleId2recursionContext, outerRuleIds)
+                        break
+                    finally:
+                        if commits is not None:
+                            commits.reset(mark)
+                    forgetInvolvedRules(ruleId2recursionContext, outerRuleIds)
 
                     if newPos is not None and newPos > oldpos:
                         tryRecursions = True
-                        ruleId2recursionContext[
-                            id(currentRule)
-                        ] = LeftRecursiveIterationContext(newPos, tempObject)
+                        recursionContext.position = newPos
+                        recursionContext.attrStore = tempObject
                         oldpos = newPos
                         break
                 higherPriorityRecursions = higherPriorityRecursions[
                     0 : indexReached + 1
                 ]
 
+            recursionContext.complete = True
             if currentObject is not None:
-                currentObject.extend(ruleId2recursionContext[id(currentRule)].attrStore)
-            return ruleId2recursionContext[id(currentRule)].position
+                currentObject.extend(recursionContext.attrStore)
+            return recursionContext.position
         elif isinstance(currentRule, SelectionLongest):
             maxpos = None
             multiAttrStores: list[SyntaxObject] = []
 
-            for ruleoption in currentRule.options:
-                tempObject = SyntaxObject(set())
-                newPos = parseLeftRecursive(
-                    mytext, startPos, ruleoption, ruleId2recursionContext, tempObject
-                )
+            for index, ruleoption in enumerate(currentRule.options):
+                tempObject = SyntaxObject()
+                if commits is not None:
+                    mark = commits.option(
+                        startPos, index == len(currentRule.options) - 1, False
+                    )
+                try:
+                    newPos = parseLeftRecursive(
+                        mytext,
+                        startPos,
+                        ruleoption,
+                        ruleId2recursionContext,
+                        tempObject,
+                        memo,
+                        tracer,
+                        dispatchTables,
+                        commits,
+                    )
+                except LeftRecursionException:
+                    del ruleId2recursionContext[id(currentRule)]
+                    raise
+                except CutFailure:
+                    del ruleId2recursionContext[id(currentRule)]
+                    return None
+                finally:
+                    if commits is not None:
+                        commits.reset(mark)
+                if newPos is None and tracer is not None:
+                    tracer.backtrack(startPos)
                 if newPos is not None and (maxpos is None or newPos >= maxpos):
                     if maxpos is None or newPos > maxpos:
                         maxpos = newPos
                         multiAttrStores = []
                     multiAttrStores.append(tempObject)
 
-            if currentObject is not None and len(multiAttrStores) > 0:
-                currentObject.extendOptions(multiAttrStores)
+            if maxpos is None:
+                del ruleId2recursionContext[id(currentRule)]
+                return None
+
+            resultObject = SyntaxObject()
+            resultObject.extendOptions(multiAttrStores)
+            ruleId2recursionContext[id(currentRule)] = LeftRecursiveIterationContext(
+                maxpos, resultObject, True
+            )
+            if currentObject is not None:
+                currentObject.extend(resultObject)
             return maxpos
     elif isinstance(currentRule, Opt) or isinstance(currentRule, list):
         if isinstance(currentRule, Opt):
             nonOptRule = currentRule.rule
         else:
             nonOptRule = tuple(currentRule)
-        tempObject = SyntaxObject(set())
+        tempObject = SyntaxObject()
+        if commits is not None:
+            mark = commits.attempt(startPos)
         newPos = parseLeftRecursive(
-            mytext, startPos, nonOptRule, ruleId2recursionContext, tempObject
+            mytext,
+            startPos,
+            nonOptRule,
+            ruleId2recursionContext,
+            tempObject,
+            memo,
+            tracer,
+            dispatchTables,
+            commits,
         )
+        if commits is not None:
+            commits.reset(mark)
 
         if newPos is not None:
             if currentObject is not None:
@@ -222,9 +605,17 @@ def parseLeftRecursive(
         else:
             return startPos
     elif isinstance(currentRule, OneOrMore):
-        tempObject = SyntaxObject(set())
+        tempObject = SyntaxObject()
         newPos = parseLeftRecursive(
-            mytext, startPos, currentRule.rule, ruleId2recursionContext, tempObject
+            mytext,
+            startPos,
+            currentRule.rule,
+            ruleId2recursionContext,
+            tempObject,
+            memo,
+            tracer,
+            dispatchTables,
+            commits,
         )
 
         # first must match
@@ -239,17 +630,41 @@ def parseLeftRecursive(
             startPos = newPos
 
             # try new rule instance
-            tempObject = SyntaxObject(set())
+            tempObject = SyntaxObject()
+            if commits is not None:
+                mark = commits.attempt(startPos)
             newPos = parseLeftRecursive(
-                mytext, startPos, currentRule.rule, set(), tempObject
+                mytext,
+                startPos,
+                currentRule.rule,
+                {},
+                tempObject,
+                memo,
+                tracer,
+                dispatchTables,
+                commits,
             )
+            if commits is not None:
+                commits.reset(mark)
 
         return startPos
     elif isinstance(currentRule, ZeroOrMore):
-        tempObject = SyntaxObject(set())
+        tempObject = SyntaxObject()
+        if commits is not None:
+            mark = commits.attempt(startPos)
         newPos = parseLeftRecursive(
-            mytext, startPos, currentRule.rule, ruleId2recursionContext, tempObject
+            mytext,
+            startPos,
+            currentRule.rule,
+            ruleId2recursionContext,
+            tempObject,
+            memo,
+            tracer,
+            dispatchTables,
+            commits,
         )
+        if commits is not None:
+            commits.reset(mark)
 
         while newPos is not None:
             # store previous attributes
@@ -258,10 +673,22 @@ def parseLeftRecursive(
             startPos = newPos
 
             # try new rule instance
-            tempObject = SyntaxObject(set())
+            tempObject = SyntaxObject()
+            if commits is not None:
+                mark = commits.attempt(startPos)
             newPos = parseLeftRecursive(
-                mytext, startPos, currentRule.rule, {}, tempObject
+                mytext,
+                startPos,
+                currentRule.rule,
+                {},
+                tempObject,
+                memo,
+                tracer,
+                dispatchTables,
+                commits,
             )
+            if commits is not None:
+                commits.reset(mark)
 
         return startPos
     elif isinstance(currentRule, Attr):
@@ -284,67 +711,92 @@ def parseLeftRecursive(
                 f"An attribute rule's attrClasses must be of GrammarClass or SelectionFirst[GrammarClass] type."
             )
 
-        for attrClass in optionsrule.options:
+        candidates = dispatchTables.candidates(optionsrule, mytext, startPos)
+        for index, attrClass in enumerate(candidates):
             if isinstance(attrClass, fw.OpaqueFwRef):
                 attrClass = attrClass.get_ref()
 
-            newSyntaxObject: SyntaxObject = attrClass()
-            newSyntaxObjectSpan = (startPos, -1)
+            memoEntry = None
+            if memo is not None:
+                memoEntry = memo.lookup(attrClass, startPos)
+
+            if memoEntry is not None:
+                newPos = memoEntry.position
+                newSyntaxObjectOptions = memoEntry.syntaxObjects
+                if memo.trackExtents:
+                    memo.examine(memoEntry.examinedEnd)
+                if tracer is not None:
+                    tracer.memoHit(attrClass, startPos, newPos)
+            else:
+                seedMark = len(memo.seedReads) if memo is not None else 0
+                if memo is not None and memo.trackExtents:
+                    outerExaminedEnd = memo.beginExamining(startPos)
+                examinedEnd = None
+                if commits is not None:
+                    mark = commits.candidate(
+                        startPos,
+                        index == len(candidates) - 1,
+                        issubclass(attrClass, mod.TextSaver),
+                    )
+                try:
+                    newPos, newSyntaxObjectOptions = parseGrammarClassInstance(
+                        mytext,
+                        startPos,
+                        attrClass,
+                        ruleId2recursionContext,
+                        memo,
+                        tracer,
+                        dispatchTables,
+                        commits,
+                    )
+                except CutFailure:
+                    newPos, newSyntaxObjectOptions = None, []
+                finally:
+                    if commits is not None:
+                        commits.reset(mark)
+                    if memo is not None and memo.trackExtents:
+                        examinedEnd = memo.endExamining(outerExaminedEnd)
+                # results built on a still growing left recursion seed are not final
+                if memo is not None and all(
+                    seed.complete for seed in memo.seedReads[seedMark:]
+                ):
+                    del memo.seedReads[seedMark:]
+                    memo.store(
+                        attrClass,
+                        startPos,
+                        newPos,
+                        newSyntaxObjectOptions,
+                        examinedEnd,
+                    )
 
+            if newPos is not None:
+                currentObject.extendGrammarAttribute(
+                    currentRule.name, newSyntaxObjectOptions
+                )
+                return newPos
+            if tracer is not None:
+                tracer.backtrack(startPos)
+        return None
+    elif isinstance(currentRule, GrammarClass):
+        newPos = None
+        if tracer is not None:
+            tracer.enterRule(currentRule, startPos)
+        try:
             newPos = parseLeftRecursive(
                 mytext,
                 startPos,
-                attrClass.grammar,
+                currentRule.grammar,
                 ruleId2recursionContext,
-                newSyntaxObject,
+                currentObject,
+                memo,
+                tracer,
+                dispatchTables,
+                commits,
             )
-
-            if newPos is not None:
-                newSyntaxObjectSpan = (newSyntaxObjectSpan[0], newPos)
-
-                # Satisfy the TextSaver modifier
-                if isinstance(newSyntaxObject, mod.TextSaver):
-                    newSyntaxObject.so_savedText = mytext[
-                        newSyntaxObjectSpan[0] : newSyntaxObjectSpan[1]
-                    ]
-                # Satisfy the SpanSaver modifier
-                if isinstance(newSyntaxObject, mod.SpanSaver):
-                    newSyntaxObject.so_span = newSyntaxObjectSpan
-                # Satisfy the SelfReplacable modifier
-                trySelfReplace = True
-                newSyntaxObjectOptions = [newSyntaxObject]
-                while trySelfReplace:
-                    trySelfReplace = False
-                    nextSyntaxObjectOptions = []
-                    for opt in newSyntaxObjectOptions:
-                        if (
-                            isinstance(opt, mod.SelfReplacable)
-                            and "self" in opt.so_grammarAttributeNames
-                        ):
-                            trySelfReplace = True
-                            nextSyntaxObjectOptions.extend(opt.self)
-                        else:
-                            nextSyntaxObjectOptions.append(opt)
-                    newSyntaxObjectOptions = nextSyntaxObjectOptions
-
-                if currentRule.name in currentObject.so_grammarAttributeNames:
-                    grammarAttrOptions: list = getattr(currentObject, currentRule.name)
-                else:
-                    grammarAttrOptions = []
-                    currentObject.so_grammarAttributeNames.add(currentRule.name)
-                    setattr(currentObject, currentRule.name, grammarAttrOptions)
-                grammarAttrOptions.extend(newSyntaxObjectOptions)
-
-                return newPos
-        return None
-    elif isinstance(currentRule, GrammarClass):
-        return parseLeftRecursive(
-            mytext,
-            startPos,
-            currentRule.grammar,
-            ruleId2recursionContext,
-            currentObject,
-        )
+        finally:
+            if tracer is not None:
+                tracer.exitRule(currentRule, startPos, newPos)
+        return newPos
     else:
         raise ValueError(f"The rule argument is not of a GrammarRule type")
 
@@ -354,5 +806,75 @@ def parse(
     pos: PosT,
     rule: GrammarRule,
     attrStore: SyntaxObject | None = None,
+    memo: PackratMemo | None = None,
+    engine: str = "recursive",
+    edits: list[TextEdit] | None = None,
+    tracer: ParseTracer | None = None,
 ) -> PosT | None:
-    return parseLeftRecursive(mytext, pos, rule, {}, attrStore)
+    """
+    Parses the rule at pos and stores the parsed attributes in attrStore.
+    Returns the end position of the successful match or None if it failed.
+
+    Pass a PackratMemo as `memo` to reuse the results of rules
+    that were already parsed at the same position.
+
+    To reparse an edited text, pass the memo of the previous parse
+    (made with `trackExtents=True`) and the `edits` that turned the previous text into mytext.
+    Only the parts of the text affected by the edits are parsed again.
+
+    `engine` selects how nested rules are parsed:
+    "recursive" uses Python calls, "iterative" uses an explicit stack
+    and isn't limited by the recursion limit on deeply nested inputs.
+    Grammars that are parsed many times are faster compiled once,
+    with `compileGrammar()`, or with `compileArenaGrammar()`, which stores the nodes
+    in a ParseArena and only builds the objects when they are walked into.
+
+    Pass a ParseTracer as `tracer` to observe the parsed rules,
+    for example a RuleProfiler to find the expensive ones.
+    Without a tracer, the hooks are skipped.
+    """
+    if attrStore is None:
+        attrStore = SyntaxObject()
+    if edits is not None:
+        if memo is None:
+            raise ValueError("Reparsing edits needs the memo of the previous parse")
+        memo.applyEdits(edits)
+    if memo is not None and memo.positionMap is not None:
+        memo.positionMap.text = mytext
+    dispatchTables = dispatchTablesFor(rule, type(mytext))
+    commits = commitPointsFor(mytext, rule, memo, dispatchTables)
+    try:
+        if engine == "recursive":
+            return parseLeftRecursive(
+                mytext,
+                pos,
+                rule,
+                {},
+                attrStore,
+                memo,
+                tracer,
+                dispatchTables,
+                commits,
+            )
+        elif engine == "iterative":
+            # imported here, as the iterative engine builds on this module
+            from ._parsing_iterative import parseIterative
+
+            return parseIterative(
+                mytext,
+                pos,
+                rule,
+                {},
+                attrStore,
+                memo,
+                tracer,
+                dispatchTables,
+                commits,
+            )
+        else:
+            raise ValueError(
+                f"Unknown parsing engine '{engine}', expected 'recursive' or 'iterative'"
+            )
+    except CutFailure:
+        # a cut outside of any selection or class commits the whole rule
+        return None
@@ -0,0 +1,481 @@
+from typing import Generator
+from .text import Text, NatT, PosT, PatternT, MatchT
+from ._syntax_object import SyntaxObject
+from ._rules import (
+    Concat,
+    Opt,
+    OneOrMore,
+    ZeroOrMore,
+    Cut,
+    Attr,
+    SelectionFirst,
+    Selection,
+    SelectionLongest,
+    GrammarClass,
+    GrammarRule,
+)
+from ._rule_canonize import tryCanonize
+from ._packrat import PackratMemo
+from ._tracing import ParseTracer
+from ._first_sets import DispatchTables, dispatchTablesFor
+from ._parsing import (
+    CommitPoints,
+    LeftRecursiveIterationContext,
+    LeftRecursionException,
+    CutFailure,
+    finalizeSyntaxObject,
+    forgetInvolvedRules,
+)
+from . import so_modifiers as mod
+import forward_decl as fw
+
+
+#: A request to parse a rule, yielded by a parsing step to its driver:
+#: (startPos, rule, ruleId2recursionContext, currentObject)
+SubparseRequest = tuple[PosT, GrammarRule, dict, SyntaxObject]
+
+#: A parsing step yields sub-parse requests, receives their end positions
+#: and returns its own end position, or None if it failed
+ParseSteps = Generator[SubparseRequest, PosT | None, PosT | None]
+
+
+def parseIterative(
+    mytext: Text[NatT, PosT, PatternT, MatchT],
+    startPos: PosT,
+    currentRule: GrammarRule,
+    ruleId2recursionContext: dict[int, LeftRecursiveIterationContext],
+    currentObject: SyntaxObject,
+    memo: PackratMemo | None = None,
+    tracer: ParseTracer | None = None,
+    dispatchTables: DispatchTables | None = None,
+    commits: CommitPoints | None = None,
+) -> PosT | None:
+    """
+    Same as parseLeftRecursive, but keeps the parsing state on an explicit stack
+    instead of Python's call stack, so deeply nested inputs can't hit the recursion limit.
+    Returns the end position of the successful match or None if it failed
+    """
+    if dispatchTables is None:
+        dispatchTables = dispatchTablesFor(currentRule, type(mytext))
+    NatT = mytext.GetNativeType()
+    PatternT = mytext.GetPatternType()
+
+    stack: list[ParseSteps] = []
+    request: SubparseRequest | None = (
+        startPos,
+        currentRule,
+        ruleId2recursionContext,
+        currentObject,
+    )
+    result: PosT | None = None
+    error: Exception | None = None
+
+    while True:
+        if request is not None:
+            requestPos, requestRule, requestContext, requestObject = request
+            request = None
+            requestRule = tryCanonize(requestRule)
+
+            # terminals are matched right away, without a stack frame
+            if isinstance(requestRule, NatT):
+                m = mytext.startswith(requestRule, requestPos)
+                if memo is not None and memo.trackExtents:
+                    memo.examineLiteral(requestRule, requestPos)
+                result = None if m is None else m.span[1]
+            elif isinstance(requestRule, PatternT):
+                m = mytext.matchedby(requestRule, requestPos)
+                if memo is not None and memo.trackExtents:
+                    memo.examinePattern(requestRule, requestPos, m)
+                result = None if m is None else m.span[1]
+            elif requestRule is Cut:
+                result = requestPos
+            else:
+                stack.append(
+                    parseSteps(
+                        mytext,
+                        requestPos,
+                        requestRule,
+                        requestContext,
+                        requestObject,
+                        memo,
+                        tracer,
+                        dispatchTables,
+                        commits,
+                    )
+                )
+                result = None
+
+        if len(stack) == 0:
+            if error is not None:
+                raise error
+            return result
+
+        # resume the innermost step with the result or error of its sub-parse
+        steps = stack[-1]
+        try:
+            if error is not None:
+                thrown, error = error, None
+                request = steps.throw(thrown)
+            else:
+                request = steps.send(result)
+        except StopIteration as stop:
+            stack.pop()
+            result = stop.value
+        except Exception as e:
+            # propagate to the outer step, like a raised exception would
+            stack.pop()
+            error = e
+
+
+def parseSteps(
+    mytext: Text[NatT, PosT, PatternT, MatchT],
+    startPos: PosT,
+    currentRule: GrammarRule,
+    ruleId2recursionContext: dict[int, LeftRecursiveIterationContext],
+    currentObject: SyntaxObject,
+    memo: PackratMemo | None,
+    tracer: ParseTracer | None,
+    dispatchTables: DispatchTables,
+    commits: CommitPoints | None,
+) -> ParseSteps:
+    """
+    The steps of parsing a non-terminal canonized rule.
+    Every sub-parse is yielded as a request to the driver in `parseIterative`
+    """
+    if isinstance(currentRule, Concat):
+        newPos = startPos
+        # only the first part starts at the same position, so only it can recurse to the left
+        recursionContext = ruleId2recursionContext
+        committed = False
+        for rulepart in currentRule.items:
+            if rulepart is Cut:
+                committed = True
+                if commits is not None:
+                    commits.cut(newPos)
+                continue
+            newPos = yield (newPos, rulepart, recursionContext, currentObject)
+            if newPos is None:
+                if committed:
+                    raise CutFailure()
+                return None
+            recursionContext = {}
+        return newPos
+    elif isinstance(currentRule, Selection):
+        minPos = None
+        validOptions: list[SyntaxObject] = []
+
+        for index, option in enumerate(currentRule.options):
+            tempObject = SyntaxObject()
+            if commits is not None:
+                mark = commits.option(
+                    startPos, index == len(currentRule.options) - 1, False
+                )
+            try:
+                newPos = yield (startPos, option, ruleId2recursionContext, tempObject)
+            except CutFailure:
+                return None
+            finally:
+                if commits is not None:
+                    commits.reset(mark)
+            if newPos is None and tracer is not None:
+                tracer.backtrack(startPos)
+            if newPos is not None:
+                if minPos is None or newPos < minPos:
+                    minPos = newPos
+                    validOptions = [tempObject]
+                elif newPos == minPos:
+                    validOptions.append(tempObject)
+
+        if len(validOptions) > 0:
+            currentObject.extendOptions(validOptions)
+        return minPos
+    elif isinstance(currentRule, SelectionFirst) or isinstance(
+        currentRule, SelectionLongest
+    ):
+        # check if we already visited this rule at this position in text
+        if id(currentRule) in ruleId2recursionContext:
+            recursionContext = ruleId2recursionContext[id(currentRule)]
+            if recursionContext is None:
+                raise LeftRecursionException(currentRule)
+            if memo is not None and not recursionContext.complete:
+                memo.seedReads.append(recursionContext)
+            currentObject.extend(recursionContext.attrStore)
+            return recursionContext.position
+
+        # Prepare for possible recursion later
+        ruleId2recursionContext[id(currentRule)] = None
+
+        if isinstance(currentRule, SelectionFirst):
+            # options that have higher priority than the accepted one,
+            # but rely on lower priority options to be accepted first
+            higherPriorityRecursions = []
+
+            newPos = None
+            candidates = dispatchTables.candidates(currentRule, mytext, startPos)
+            for index, ruleoption in enumerate(candidates):
+                tempObject = SyntaxObject()
+                if commits is not None:
+                    mark = commits.option(
+                        startPos,
+                        index == len(candidates) - 1,
+                        len(higherPriorityRecursions) > 0,
+                    )
+                try:
+                    newPos = yield (
+                        startPos,
+                        ruleoption,
+                        ruleId2recursionContext,
+                        tempObject,
+                    )
+                except LeftRecursionException as e:
+                    if e.grammar_cls is currentRule:
+                        higherPriorityRecursions.append(ruleoption)
+                        continue
+                    del ruleId2recursionContext[id(currentRule)]
+                    raise
+                except CutFailure:
+                    del ruleId2recursionContext[id(currentRule)]
+                    return None
+                finally:
+                    if commits is not None:
+                        commits.reset(mark)
+
+                if newPos is not None:
+                    recursionContext = LeftRecursiveIterationContext(newPos, tempObject)
+                    ruleId2recursionContext[id(currentRule)] = recursionContext
+                    break
+                if tracer is not None:
+                    tracer.backtrack(startPos)
+
+            if newPos is None:
+                del ruleId2recursionContext[id(currentRule)]
+                return None
+
+            # now keep checking while we can extend current node by deepening the recursion
+            tryRecursions = len(higherPriorityRecursions) > 0
+            # rules entered by the growing options are involved in the recursion,
+            # so their contexts are dropped after each attempt while the seed is reused
+            outerRuleIds = set(ruleId2recursionContext)
+            while tryRecursions:
+                if tracer is not None:
+                    tracer.leftRecursionGrowth(startPos)
+                tryRecursions = False
+                indexReached = 0
+                for indexReached, ruleoption in enumerate(higherPriorityRecursions):
+                    tempObject = SyntaxObject()
+                    if commits is not None:
+                        mark = commits.option(
+                            startPos,
+                            indexReached == len(higherPriorityRecursions) - 1,
+                            True,
+                        )
+                    try:
+                        newPos = yield (
+                            startPos,
+                            ruleoption,
+                            ruleId2recursionContext,
+                            tempObject,
+                        )
+                    except CutFailure:
+                        # a committed option failed to grow the match, keep what it has
+                        forgetInvolvedRules(ruleId2recursionContext, outerRuleIds)
+                        break
+                    finally:
+                        if commits is not None:
+                            commits.reset(mark)
+                    forgetInvolvedRules(ruleId2recursionContext, outerRuleIds)
+                    if newPos is not None and newPos > recursionContext.position:
+                        tryRecursions = True
+                        recursionContext.position = newPos
+                        recursionContext.attrStore = tempObject
+                        break
+                higherPriorityRecursions = higherPriorityRecursions[
+                    0 : indexReached + 1
+                ]
+
+            recursionContext.complete = True
+            currentObject.extend(recursionContext.attrStore)
+            return recursionContext.position
+        else:
+            maxpos = None
+            multiAttrStores: list[SyntaxObject] = []
+
+            for index, ruleoption in enumerate(currentRule.options):
+                tempObject = SyntaxObject()
+                if commits is not None:
+                    mark = commits.option(
+                        startPos, index == len(currentRule.options) - 1, False
+                    )
+                try:
+                    newPos = yield (
+                        startPos, ruleoption, ruleId2recursionContext, tempObject
+                    )
+                except LeftRecursionException:
+                    del ruleId2recursionContext[id(currentRule)]
+                    raise
+                except CutFailure:
+                    del ruleId2recursionContext[id(currentRule)]
+                    return None
+                finally:
+                    if commits is not None:
+                        commits.reset(mark)
+                if newPos is None and tracer is not None:
+                    tracer.backtrack(startPos)
+                if newPos is not None and (maxpos is None or newPos >= maxpos):
+                    if maxpos is None or newPos > maxpos:
+                        maxpos = newPos
+                        multiAttrStores = []
+                    multiAttrStores.append(tempObject)
+
+            if maxpos is None:
+                del ruleId2recursionContext[id(currentRule)]
+                return None
+
+            resultObject = SyntaxObject()
+            resultObject.extendOptions(multiAttrStores)
+            ruleId2recursionContext[id(currentRule)] = LeftRecursiveIterationContext(
+                maxpos, resultObject, True
+            )
+            currentObject.extend(resultObject)
+            return maxpos
+    elif isinstance(currentRule, Opt):
+        tempObject = SyntaxObject()
+        if commits is not None:
+            mark = commits.attempt(startPos)
+        newPos = yield (startPos, currentRule.rule, ruleId2recursionContext, tempObject)
+        if commits is not None:
+            commits.reset(mark)
+        if newPos is None:
+            return startPos
+        currentObject.extend(tempObject)
+        return newPos
+    elif isinstance(currentRule, OneOrMore) or isinstance(currentRule, ZeroOrMore):
+        tempObject = SyntaxObject()
+        # the first item of OneOrMore isn't optional
+        optional = isinstance(currentRule, ZeroOrMore)
+        if commits is not None and optional:
+            mark = commits.attempt(startPos)
+        newPos = yield (startPos, currentRule.rule, ruleId2recursionContext, tempObject)
+        if commits is not None and optional:
+            commits.reset(mark)
+
+        # the first must match for OneOrMore
+        if newPos is None and isinstance(currentRule, OneOrMore):
+            return None
+
+        while newPos is not None:
+            # store previous attributes
+            currentObject.extend(tempObject)
+            startPos = newPos
+
+            # try new rule instance
+            tempObject = SyntaxObject()
+            if commits is not None:
+                mark = commits.attempt(startPos)
+            newPos = yield (startPos, currentRule.rule, {}, tempObject)
+            if commits is not None:
+                commits.reset(mark)
+
+        return startPos
+    elif isinstance(currentRule, Attr):
+        attrClasses = currentRule.attrClasses
+        candidates = dispatchTables.candidates(attrClasses, mytext, startPos)
+        for index, attrClass in enumerate(candidates):
+            if isinstance(attrClass, fw.OpaqueFwRef):
+                attrClass = attrClass.get_ref()
+            if not isinstance(attrClass, GrammarClass):
+                raise ValueError(
+                    f"An attribute rule's attrClasses must be of GrammarClass or SelectionFirst[GrammarClass] type."
+                )
+
+            memoEntry = None
+            if memo is not None:
+                memoEntry = memo.lookup(attrClass, startPos)
+
+            if memoEntry is not None:
+                newPos = memoEntry.position
+                newSyntaxObjectOptions = memoEntry.syntaxObjects
+                if memo.trackExtents:
+                    memo.examine(memoEntry.examinedEnd)
+                if tracer is not None:
+                    tracer.memoHit(attrClass, startPos, newPos)
+            else:
+                seedMark = len(memo.seedReads) if memo is not None else 0
+                if memo is not None and memo.trackExtents:
+                    outerExaminedEnd = memo.beginExamining(startPos)
+                newSyntaxObject: SyntaxObject = attrClass()
+                examinedEnd = None
+                newPos = None
+                if tracer is not None:
+                    tracer.enterRule(attrClass, startPos)
+                if commits is not None:
+                    mark = commits.candidate(
+                        startPos,
+                        index == len(candidates) - 1,
+                        issubclass(attrClass, mod.TextSaver),
+                    )
+                try:
+                    newPos = yield (
+                        startPos,
+                        attrClass.grammar,
+                        ruleId2recursionContext,
+                        newSyntaxObject,
+                    )
+                except CutFailure:
+                    newPos = None
+                finally:
+                    if tracer is not None:
+                        tracer.exitRule(attrClass, startPos, newPos)
+                    if memo is not None and memo.trackExtents:
+                        examinedEnd = memo.endExamining(outerExaminedEnd)
+                if newPos is None:
+                    newSyntaxObjectOptions = []
+                else:
+                    newSyntaxObjectOptions = finalizeSyntaxObject(
+                        mytext,
+                        startPos,
+                        newPos,
+                        newSyntaxObject,
+                        None if memo is None else memo.positionMap,
+                    )
+                if commits is not None:
+                    # only once the text of the object is saved
+                    commits.reset(mark)
+                # results built on a still growing left recursion seed are not final
+                if memo is not None and all(
+                    seed.complete for seed in memo.seedReads[seedMark:]
+                ):
+                    del memo.seedReads[seedMark:]
+                    memo.store(
+                        attrClass,
+                        startPos,
+                        newPos,
+                        newSyntaxObjectOptions,
+                        examinedEnd,
+                    )
+
+            if newPos is not None:
+                currentObject.extendGrammarAttribute(
+                    currentRule.name, newSyntaxObjectOptions
+                )
+                return newPos
+            if tracer is not None:
+                tracer.backtrack(startPos)
+        return None
+    elif isinstance(currentRule, GrammarClass):
+        newPos = None
+        if tracer is not None:
+            tracer.enterRule(currentRule, startPos)
+        try:
+            newPos = yield (
+                startPos,
+                currentRule.grammar,
+                ruleId2recursionContext,
+                currentObject,
+            )
+        finally:
+            if tracer is not None:
+                tracer.exitRule(currentRule, startPos, newPos)
+        return newPos
+    else:
+        raise ValueError(f"The rule argument is not of a GrammarRule type")
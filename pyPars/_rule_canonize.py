@@ -1,5 +1,7 @@
 from ._rules import *
 from typing import Callable
+import re
+import forward_decl as fw
 
 
 def tryCanonizeConcat(rule: GrammarRule) -> Concat | None:
@@ -44,7 +46,8 @@ def tryCanonizeAttr(rule: GrammarRule) -> Attr | None:
         assert (
             len(rule.items()) == 1
         ), "When represented as a dict, Attr must have a single key-value pair"
-        return Attr(rule.keys()[0], rule.values()[0])
+        name, attrClasses = next(iter(rule.items()))
+        return Attr(name, attrClasses)
     else:
         return None
 
@@ -63,6 +66,13 @@ def tryCanonizeSelection(rule: GrammarRule) -> Selection | None:
         return None
 
 
+def tryCanonizeSelectionLongest(rule: GrammarRule) -> SelectionLongest | None:
+    if isinstance(rule, SelectionLongest):
+        return rule
+    else:
+        return None
+
+
 def tryCanonizeGrammarClass(rule: GrammarRule) -> GrammarClass | None:
     if isinstance(rule, GrammarClass):
         return rule
@@ -90,6 +100,9 @@ def tryCanonize(rule: GrammarRule) -> CanonGrammarRule:
     if r is not None:
         return r
     r = tryCanonizeSelection(rule)
+    if r is not None:
+        return r
+    r = tryCanonizeSelectionLongest(rule)
     if r is not None:
         return r
     r = tryCanonizeGrammarClass(rule)
@@ -97,3 +110,34 @@ def tryCanonize(rule: GrammarRule) -> CanonGrammarRule:
         return r
 
     return rule  # native type or pattern
+
+
+def tryMergeLiteralOptions(
+    rule: SelectionFirst | SelectionLongest, NatT: type, PatternT: type
+) -> re.Pattern | None:
+    """
+    Returns a single pattern that matches the same as the selection,
+    or None if its options aren't all literals of the native type.
+    The literals are tried in order for SelectionFirst and longest first for SelectionLongest.
+    """
+    if PatternT is not re.Pattern or NatT not in (str, bytes):
+        return None
+
+    literals = []
+    for option in rule.options:
+        if isinstance(option, fw.OpaqueFwRef):
+            option = option.get_ref()
+        option = tryCanonize(option)
+        if not isinstance(option, NatT):
+            return None
+        literals.append(option)
+    if len(literals) < 2:
+        return None
+
+    if isinstance(rule, SelectionLongest):
+        # equal literals would make the selection ambiguous
+        if len(set(literals)) < len(literals):
+            return None
+        literals.sort(key=len, reverse=True)
+    separator = "|" if NatT is str else b"|"
+    return re.compile(separator.join(re.escape(literal) for literal in literals))
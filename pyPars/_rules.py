@@ -2,6 +2,7 @@ from dataclasses import dataclass, field
 from typing import Union, Callable, Iterable
 from .text import Text, NatT, PosT, PatternT, MatchT
 from ._syntax_object import SyntaxObject
+from ._modular_dict_method import ModularDictMethodType
 
 
 @dataclass
@@ -24,6 +25,25 @@ class ZeroOrMore:
     rule: "GrammarRule"
 
 
+class CutRule:
+    """
+    Matches the empty string and commits to the option it is in.
+    If a later part of the option fails, the selection or the GrammarClass
+    containing the option fails without trying any other option.
+    Use the `Cut` instance, for example ("if", Cut, Condition)
+
+    With `parse()` and `iterParse()`, a matched Cut also commits the positions
+    that the parse can't go back to anymore: a StreamText drops them from its window
+    and a PackratMemo releases their results, unless it tracks extents for edits
+    """
+
+    def __repr__(self) -> str:
+        return "Cut"
+
+
+Cut = CutRule()
+
+
 class Attr:
     def __init__(self, name: str, attrClasses: "GrammarClass|SelectionFirst") -> None:
         self.name = name
@@ -39,6 +59,14 @@ class Attr:
         return f"'{{{self.name}':{classNames}}}"
 
 
+def atr(name: str) -> Callable[["GrammarClass|SelectionFirst"], Attr]:
+    """
+    Returns a function that makes an Attr with the given name.
+    For example, atr("value")(Expression) == Attr("value", Expression)
+    """
+    return lambda attrClasses: Attr(name, attrClasses)
+
+
 class SelectionFirst:
     def __init__(self, *options: "GrammarRule|SelectionFirst") -> None:
         self.options = [
@@ -93,17 +121,88 @@ class Selection:
         return "|".join([repr(opt) for opt in self.options])
 
 
-class GrammarClass(type[SyntaxObject]):
+class SelectionLongest:
+    def __init__(self, *options: "GrammarRule|SelectionLongest") -> None:
+        self.options = [
+            opt
+            for options in [
+                opt.options if isinstance(opt, SelectionLongest) else [opt]
+                for opt in options
+            ]
+            for opt in options
+        ]
+
+    def __repr__(self) -> str:
+        return "longest(" + ", ".join([repr(opt) for opt in self.options]) + ")"
+
+
+# Incremented whenever the grammar of a GrammarClass is assigned
+_grammarVersion = 0
+
+
+def grammarVersion() -> int:
+    """
+    Returns a number that changes whenever the `grammar` of a GrammarClass is assigned,
+    so that what was derived from the grammars can be recomputed
+    """
+    return _grammarVersion
+
+
+class GrammarClass(ModularDictMethodType):
     """
     A metaclass for Grammar types
     """
 
-    def __new__(cls, name, bases, attrs):
+    def __new__(cls, name, bases, attrs, slots: bool = True):
         if not any(issubclass(base, SyntaxObject) for base in bases):
             raise TypeError(f"Class '{name}' is not a subclass of 'AttributeStorage'")
-        return super().__new__(cls, name, bases, attrs)
 
-    def __init__(cls, name, bases, dict):
+        # Give the objects a fixed layout, unless the class chose its own
+        if "__slots__" not in attrs:
+            inheritedSlots = set()
+            attributeSlots: list[str] = []
+            modifierSlots: list[str] = []
+            for base in bases:
+                for mroClass in base.__mro__:
+                    inheritedSlots.update(vars(mroClass).get("__slots__", ()))
+                    inheritedSlots.update(vars(mroClass).get("_so_dictSlots", ()))
+                    modifierSlots.extend(vars(mroClass).get("_so_slots", ()))
+                for grammarAttrName in getattr(base, "so_attributeSlots", ()):
+                    if grammarAttrName not in attributeSlots:
+                        attributeSlots.append(grammarAttrName)
+            for grammarAttrName in grammarAttributeNames(attrs.get("grammar")):
+                if grammarAttrName not in attributeSlots and grammarAttrName not in attrs:
+                    attributeSlots.append(grammarAttrName)
+
+            newSlots = tuple(
+                dict.fromkeys(
+                    slot
+                    for slot in modifierSlots + attributeSlots
+                    if slot not in inheritedSlots
+                )
+            )
+            if slots:
+                attrs["__slots__"] = newSlots
+            else:
+                # the fields are kept in an instance dict, so that the class can be
+                # combined with other slotted GrammarClasses as a base
+                attrs["_so_dictSlots"] = newSlots
+            attrs["so_attributeSlots"] = tuple(attributeSlots)
+
+        try:
+            return super().__new__(cls, name, bases, attrs)
+        except TypeError as e:
+            if "lay-out conflict" not in str(e):
+                raise
+            slottedBases = ", ".join(
+                f"'{base.__name__}'" for base in bases if isinstance(base, GrammarClass)
+            )
+            raise TypeError(
+                f"Class '{name}' can't combine the slots of its bases {slottedBases}, "
+                "create all but one of them with 'slots=False' to keep their fields in an instance dict"
+            ) from e
+
+    def __init__(cls, name, bases, dict, slots: bool = True):
         super().__init__(name, bases, dict)
         if not hasattr(cls, "grammar"):
             raise NotImplementedError(
@@ -111,6 +210,12 @@ class GrammarClass(type[SyntaxObject]):
             )
         grammar: "GrammarRule"
 
+    def __setattr__(cls, name: str, value) -> None:
+        super().__setattr__(name, value)
+        if name == "grammar":
+            global _grammarVersion
+            _grammarVersion += 1
+
     def __truediv__(cls, right: "GrammarRule"):
         if isinstance(right, SelectionFirst):
             return SelectionFirst(*([cls] + right.options))
@@ -139,6 +244,43 @@ class GrammarClass(type[SyntaxObject]):
         return self.__name__
 
 
+def grammarAttributeNames(rule: "GrammarRule", visited: set[int] = None) -> list[str]:
+    """
+    Returns the names of the attributes a rule stores into the object it is parsed into,
+    in the order they appear in the rule
+    """
+    if visited is None:
+        visited = set()
+    if id(rule) in visited:
+        return []
+    visited.add(id(rule))
+
+    if isinstance(rule, Attr):
+        return [rule.name]
+    elif isinstance(rule, dict):
+        return list(rule.keys())
+    elif isinstance(rule, GrammarClass):
+        # a class used directly parses its grammar into the same object
+        subrules = [rule.grammar]
+    elif isinstance(rule, tuple) or isinstance(rule, list):
+        subrules = rule
+    elif isinstance(rule, Concat):
+        subrules = rule.items
+    elif isinstance(rule, (Opt, OneOrMore, ZeroOrMore)):
+        subrules = [rule.rule]
+    elif isinstance(rule, (SelectionFirst, Selection, SelectionLongest)):
+        subrules = rule.options
+    else:
+        return []
+
+    names = []
+    for subrule in subrules:
+        for name in grammarAttributeNames(subrule, visited):
+            if name not in names:
+                names.append(name)
+    return names
+
+
 CanonGrammarRule = Union[
     NatT,
     PatternT,
@@ -146,9 +288,11 @@ CanonGrammarRule = Union[
     Opt,  # ? operator
     OneOrMore,  # + operator
     ZeroOrMore,  # * operator
+    CutRule,  # For committing to an option
     Attr,  # For named attributes
     SelectionFirst,  # For multiple options (Union of grammars)
     Selection,  # For multiple options (Union of grammars)
+    SelectionLongest,  # For multiple options (Union of grammars)
     GrammarClass,  # Class containing a 'grammar' class variable
 ]
 
@@ -0,0 +1,231 @@
+from dataclasses import dataclass
+from io import StringIO
+from json.encoder import encode_basestring_ascii
+from typing import Any, Callable, TextIO
+import json
+from ._syntax_object import SyntaxObject, syntaxClass
+from . import so_modifiers as mod
+
+
+# Fields of a layout that aren't extractors
+CLASS_FIELD = "<class>"
+TEXT_FIELD = "<text>"
+SPAN_FIELD = "<span>"
+ATTRIBUTES_FIELD = "<attributes>"
+
+
+@dataclass(frozen=True)
+class ClassLayout:
+    """
+    The fields of a SyntaxObject class, in the order `__dict__()` returns them.
+    Each field is CLASS_FIELD, TEXT_FIELD, SPAN_FIELD, ATTRIBUTES_FIELD for the
+    grammar attributes, or the `_dict_extractor` of another class in the hierarchy,
+    whose dict is written as it is.
+    `attributeKeys` pairs the attribute slots of the class with their JSON encoded names
+    """
+
+    className: str
+    fields: tuple[str | Callable[[SyntaxObject], dict[str, Any]], ...]
+    attributeKeys: tuple[tuple[str, str], ...]
+    hasText: bool
+    hasSpan: bool
+
+
+_classLayouts: dict[type, ClassLayout] = {}
+
+
+def classLayout(cls: type) -> ClassLayout:
+    """
+    Returns the layout of the class, computed once per class
+    """
+    layout = _classLayouts.get(cls)
+    if layout is None:
+        fields = []
+        for base in reversed(cls.__mro__):
+            extractor = vars(base).get("_dict_extractor")
+            if extractor is None:
+                continue
+            if base is SyntaxObject:
+                fields.extend((CLASS_FIELD, ATTRIBUTES_FIELD))
+            elif base is mod.TextSaver:
+                fields.append(TEXT_FIELD)
+            elif base is mod.SpanSaver:
+                fields.append(SPAN_FIELD)
+            else:
+                fields.append(extractor)
+        layout = ClassLayout(
+            cls.__name__,
+            tuple(fields),
+            tuple(
+                (grammarAttrName, encode_basestring_ascii(grammarAttrName))
+                for grammarAttrName in cls.so_attributeSlots
+            ),
+            issubclass(cls, mod.TextSaver),
+            issubclass(cls, mod.SpanSaver),
+        )
+        _classLayouts[cls] = layout
+    return layout
+
+
+def attributeItems(
+    syntaxObject: SyntaxObject, layout: ClassLayout
+) -> list[tuple[str, str, list]]:
+    """
+    Returns the names, JSON encoded names and values of the assigned grammar attributes,
+    in the order of `so_grammarAttributeNames`
+    """
+    items = []
+    for grammarAttrName, encodedName in layout.attributeKeys:
+        values = getattr(syntaxObject, grammarAttrName)
+        if values is not None:
+            items.append((grammarAttrName, encodedName, values))
+    if syntaxObject.so_extraAttributes is not None:
+        for grammarAttrName, values in syntaxObject.so_extraAttributes.items():
+            items.append(
+                (grammarAttrName, encode_basestring_ascii(grammarAttrName), values)
+            )
+    return items
+
+
+def encodeJsonValue(value: Any) -> str:
+    """
+    Returns the JSON of a value that isn't a SyntaxObject
+    """
+    if type(value) is str:
+        return encode_basestring_ascii(value)
+    return json.dumps(value, default=lambda o: o.__dict__())
+
+
+def encodeJsonObject(syntaxObject: SyntaxObject) -> list[str | SyntaxObject]:
+    """
+    Returns the JSON pieces of an object, leaving its subobjects to be encoded later
+    """
+    layout = classLayout(syntaxClass(syntaxObject))
+    pieces: list[str | SyntaxObject] = []
+    chunk = "{"
+    separator = ""
+    for field in layout.fields:
+        if field is CLASS_FIELD:
+            chunk += f'{separator}"<class>": "{layout.className}"'
+        elif field is TEXT_FIELD:
+            savedText = syntaxObject.so_savedText
+            chunk += f'{separator}"<text>": {encodeJsonValue(savedText)}'
+        elif field is SPAN_FIELD:
+            chunk += f'{separator}"<span>": {encodeJsonValue(syntaxObject.so_span)}'
+        elif field is ATTRIBUTES_FIELD:
+            for _, encodedName, values in attributeItems(syntaxObject, layout):
+                chunk += f"{separator}{encodedName}: ["
+                for index, value in enumerate(values):
+                    if index > 0:
+                        chunk += ", "
+                    if isinstance(value, SyntaxObject):
+                        pieces.append(chunk)
+                        pieces.append(value)
+                        chunk = ""
+                    else:
+                        chunk += encodeJsonValue(value)
+                chunk += "]"
+                separator = ", "
+            continue
+        else:
+            for key, value in field(syntaxObject).items():
+                chunk += f"{separator}{encodeJsonValue(key)}: {encodeJsonValue(value)}"
+                separator = ", "
+            continue
+        separator = ", "
+    pieces.append(chunk + "}")
+    return pieces
+
+
+def writeJson(
+    syntaxObject: SyntaxObject, file: TextIO, bufferSize: int = 1 << 16
+) -> None:
+    """
+    Writes the same JSON as
+    `json.dumps(syntaxObject.__dict__(), default=lambda o: o.__dict__())`
+    without building the dicts. The tree is walked iteratively and the output is
+    written in pieces of about bufferSize characters, so the memory used doesn't
+    grow with the size of the tree, and deep trees don't hit the recursion limit
+    """
+    buffer: list[str] = []
+    bufferedSize = 0
+    # the pieces left to write, the next one last
+    pending: list[str | SyntaxObject] = [syntaxObject]
+    while len(pending) > 0:
+        piece = pending.pop()
+        if isinstance(piece, SyntaxObject):
+            pieces = encodeJsonObject(piece)
+            pieces.reverse()
+            pending.extend(pieces)
+            continue
+
+        buffer.append(piece)
+        bufferedSize += len(piece)
+        if bufferedSize >= bufferSize:
+            file.write("".join(buffer))
+            buffer = []
+            bufferedSize = 0
+    file.write("".join(buffer))
+
+
+def toJson(syntaxObject: SyntaxObject) -> str:
+    """
+    Returns the tree as the JSON written by `writeJson()`
+    """
+    output = StringIO()
+    writeJson(syntaxObject, output)
+    return output.getvalue()
+
+
+def toTuple(syntaxObject: SyntaxObject) -> tuple:
+    """
+    Returns the tree as nested tuples of
+    (class name, saved text, span, ((attribute name, (subobject tuples...)), ...)),
+    with None for the text or span of classes that don't save them.
+    The tuples can be pickled, compared and hashed, or passed to other serializers.
+    Subobjects shared by several objects are converted once and shared too.
+    Fields of other `_dict_extractor` methods aren't included
+    """
+    converted: dict[int, tuple] = {}
+    # (object, its layout and attributes once its subobjects were queued)
+    pending: list[tuple[SyntaxObject, ClassLayout | None, list]] = [
+        (syntaxObject, None, None)
+    ]
+    while len(pending) > 0:
+        current, layout, items = pending.pop()
+        if layout is None:
+            if id(current) in converted:
+                continue
+            layout = classLayout(syntaxClass(current))
+            items = attributeItems(current, layout)
+            if len(items) > 0:
+                # converted again after its subobjects
+                pending.append((current, layout, items))
+                for _, _, values in items:
+                    for subobj in values:
+                        if isinstance(subobj, SyntaxObject):
+                            pending.append((subobj, None, None))
+                continue
+
+        converted[id(current)] = (
+            layout.className,
+            current.so_savedText if layout.hasText else None,
+            current.so_span if layout.hasSpan else None,
+            tuple(
+                [
+                    (
+                        grammarAttrName,
+                        tuple(
+                            [
+                                converted[id(subobj)]
+                                if isinstance(subobj, SyntaxObject)
+                                else subobj
+                                for subobj in values
+                            ]
+                        ),
+                    )
+                    for grammarAttrName, _, values in items
+                ]
+            ),
+        )
+    return converted[id(syntaxObject)]
@@ -0,0 +1,75 @@
+from typing import Generator
+from .text import Text, NatT, PosT, PatternT, MatchT
+from ._syntax_object import SyntaxObject
+from ._rules import OneOrMore, GrammarClass
+from ._parsing import parseLeftRecursive, CutFailure, commitPointsFor
+from ._parsing_iterative import parseIterative
+from ._first_sets import dispatchTablesFor
+from ._chunked import repetitionOf
+
+
+def iterParse(
+    mytext: Text[NatT, PosT, PatternT, MatchT],
+    rootClass: GrammarClass,
+    attr: str,
+    pos: PosT | None = None,
+    engine: str = "recursive",
+) -> Generator[SyntaxObject, None, PosT | None]:
+    """
+    Parses a rootClass whose grammar is a repetition, yielding the objects
+    stored into its `attr` attribute as soon as the item they belong to is parsed.
+    Nothing is kept after an item was yielded and its end is committed to the text,
+    so with a StreamText memory is bounded by the largest item.
+    Other attributes of the items, and attributes inside option groups of ambiguous items, aren't yielded.
+    Returns the end position of the repetition, or None if it failed
+    """
+    if engine == "recursive":
+        parseItem = parseLeftRecursive
+    elif engine == "iterative":
+        parseItem = parseIterative
+    else:
+        raise ValueError(
+            f"Unknown parsing engine '{engine}', expected 'recursive' or 'iterative'"
+        )
+    repetition = repetitionOf(rootClass)
+    if pos is None:
+        pos = mytext.getStartPos()
+
+    dispatchTables = dispatchTablesFor(rootClass, type(mytext))
+    # Cuts inside an item commit the text before the end of the item
+    commits = commitPointsFor(mytext, rootClass, None, dispatchTables)
+    itemCount = 0
+    while True:
+        itemObject = SyntaxObject()
+        try:
+            newPos = parseItem(
+                mytext,
+                pos,
+                repetition.rule,
+                {},
+                itemObject,
+                None,
+                None,
+                dispatchTables,
+                commits,
+            )
+        except CutFailure:
+            newPos = None
+        if newPos is None:
+            break
+        itemCount += 1
+
+        if attr in itemObject.so_grammarAttributeNames:
+            yield from getattr(itemObject, attr)
+        if newPos == pos:
+            # an empty item would repeat forever
+            break
+        pos = newPos
+        if commits is not None:
+            commits.commit(pos)
+        else:
+            mytext.commit(pos)
+
+    if isinstance(repetition, OneOrMore) and itemCount == 0:
+        return None
+    return pos
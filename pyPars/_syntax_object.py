@@ -1,49 +1,138 @@
 from dataclasses import dataclass, field
+from typing import Callable, Iterator
+import copy
 from ._modular_dict_method import ModularDictMethodObject
+from . import so_modifiers as mod
 
 
 class SyntaxObject(ModularDictMethodObject):
+    """
+    Holds the grammar attributes parsed for a rule.
+    GrammarClasses get a slot for each attribute named in their grammar,
+    or an instance dict entry if they are created with slots=False.
+    Other attributes are kept in the `so_extraAttributes` dict.
+
+    Ambiguities are packed into `so_options`, a list of option groups.
+    The object stands for each combination of its own attributes with
+    the attributes of one option from every group.
+    The groups are shared between objects instead of being multiplied out,
+    use `iterOptions()` and `countOptions()` to expand them.
+    """
+
+    __slots__ = ("so_options", "so_extraAttributes")
+
+    #: Names of the grammar attributes that have a slot in this class,
+    #: or an instance dict entry in classes created with slots=False
+    so_attributeSlots: tuple[str, ...] = ()
+
     def __init__(
         self,
-        grammarAttributeNames: set[str] = None,
         options: list["SyntaxObject"] = None,
     ) -> None:
         super().__init__()
 
-        self.so_grammarAttributeNames = (
-            set() if grammarAttributeNames is None else grammarAttributeNames
+        if options is not None and (
+            isinstance(options, (set, frozenset))
+            or any(not isinstance(option, SyntaxObject) for option in options)
+        ):
+            # the attribute names used to be the first argument,
+            # they now follow from the grammar of the class
+            raise TypeError(
+                "SyntaxObject() takes a list of option SyntaxObjects, not attribute names"
+            )
+        self.so_options: list[tuple["SyntaxObject", ...]] = (
+            () if options is None else [tuple(options)]
         )
+        self.so_extraAttributes: dict[str, list["SyntaxObject"]] | None = None
 
-        self.so_options: list["SyntaxObject"] = [] if options is None else options
-
-        self._dict_extractor_modules.append(
-            lambda self: (
-                {"<class>": self.__class__.__name__}
-                | {
-                    grammarAttrName: [
-                        subobj for subobj in getattr(self, grammarAttrName)
-                    ]
-                    for grammarAttrName in self.so_grammarAttributeNames
-                }
-            )
+        for grammarAttrName in self.so_attributeSlots:
+            setattr(self, grammarAttrName, None)
+
+    def __getattr__(self, name: str):
+        # only called when the attribute isn't found in a slot or in the class
+        try:
+            extraAttributes = object.__getattribute__(self, "so_extraAttributes")
+        except AttributeError:
+            extraAttributes = None
+        if extraAttributes is not None and name in extraAttributes:
+            return extraAttributes[name]
+        raise AttributeError(
+            f"'{type(self).__name__}' object has no attribute '{name}'"
         )
 
+    def __getstate__(self) -> tuple:
+        # pickle the slot values by position, without repeating their names for every object
+        names = slotNames(type(self))
+        state = [getattr(self, name, None) for name in names]
+        if isinstance(self, mod.TextSaver):
+            # store the saved text instead of the whole text it is sliced from
+            savedText = self.so_textCache
+            if self.so_textSource is not None:
+                mytext, start, end = self.so_textSource
+                savedText = mytext[start:end]
+            if isinstance(savedText, memoryview):
+                # slices of byte texts are views, which can't be pickled
+                savedText = bytes(savedText)
+            state[names.index("so_textCache")] = savedText
+            state[names.index("so_textSource")] = None
+        if isinstance(self, mod.SpanSaver):
+            # store the span instead of the positions of the memo it is mapped from
+            state[names.index("so_spanValue")] = self.so_span
+            state[names.index("so_spanSource")] = None
+        return tuple(state)
+
+    def __setstate__(self, state: tuple) -> None:
+        for name, value in zip(slotNames(type(self)), state):
+            object.__setattr__(self, name, value)
+
+    def _dict_extractor(self) -> dict[str, any]:
+        return {"<class>": self.__class__.__name__} | {
+            grammarAttrName: [subobj for subobj in getattr(self, grammarAttrName)]
+            for grammarAttrName in self.so_grammarAttributeNames
+        }
+
+    @property
+    def so_grammarAttributeNames(self) -> list[str]:
+        """
+        Names of the grammar attributes that were assigned to this object
+        """
+        names = [
+            grammarAttrName
+            for grammarAttrName in self.so_attributeSlots
+            if getattr(self, grammarAttrName) is not None
+        ]
+        if self.so_extraAttributes is not None:
+            names.extend(self.so_extraAttributes.keys())
+        return names
+
     def extend(self, source: "SyntaxObject") -> None:
         """
         Appends all attribute values from source to target's attributes
         """
         for grammarAttrName in source.so_grammarAttributeNames:
-            newGrammarAttr: list = getattr(source, grammarAttrName)
-            if grammarAttrName in self.so_grammarAttributeNames:
-                grammarAttr: list = getattr(self, grammarAttrName)
-            else:
-                grammarAttr = []
-                self.so_grammarAttributeNames.add(grammarAttrName)
-                setattr(self, grammarAttrName, grammarAttr)
-            grammarAttr.extend(newGrammarAttr)
+            self.extendGrammarAttribute(
+                grammarAttrName, getattr(source, grammarAttrName)
+            )
 
         if len(source.so_options) > 0:
-            self.extendOptions(source.so_options)
+            self.addOptionGroups(source.so_options)
+
+    def extendGrammarAttribute(
+        self, grammarAttrName: str, values: "list[SyntaxObject]"
+    ) -> None:
+        """
+        Appends the values to the grammar attribute, creating it if needed
+        """
+        if grammarAttrName in self.so_attributeSlots:
+            grammarAttr: list = getattr(self, grammarAttrName)
+            if grammarAttr is None:
+                grammarAttr = []
+                setattr(self, grammarAttrName, grammarAttr)
+        else:
+            if self.so_extraAttributes is None:
+                self.so_extraAttributes = {}
+            grammarAttr = self.so_extraAttributes.setdefault(grammarAttrName, [])
+        grammarAttr.extend(values)
 
     def extendOptions(self, sources: "list[SyntaxObject]") -> None:
         """
@@ -51,14 +140,202 @@ class SyntaxObject(ModularDictMethodObject):
         """
         if len(sources) == 1:
             self.extend(sources[0])
-        elif len(self.so_options) == 0:
-            self.so_options = sources
         else:
-            newoptions = []
-            for option in self.so_options:
-                for source in sources:
-                    newopt = SyntaxObject(set())
-                    newopt.extend(option)
-                    newopt.extend(source)
-                    newoptions.append(newopt)
-            self.so_options = newoptions
+            self.addOptionGroups([tuple(sources)])
+
+    def addOptionGroups(self, groups: "list[tuple[SyntaxObject, ...]]") -> None:
+        """
+        Adds already packed option groups, sharing them with their other owners
+        """
+        if isinstance(self.so_options, tuple):
+            self.so_options = list(self.so_options)
+        self.so_options.extend(groups)
+
+    def detachedCopy(self, keepAttributes: bool = True) -> "SyntaxObject":
+        """
+        Returns a copy with its own attribute lists and without the option groups.
+        If keepAttributes is False, the attribute lists of the copy are empty
+        """
+        newObject = copy.copy(self)
+        newObject.so_options = ()
+        newObject.so_extraAttributes = None
+        for grammarAttrName in self.so_attributeSlots:
+            setattr(newObject, grammarAttrName, None)
+        for grammarAttrName in self.so_grammarAttributeNames:
+            newObject.extendGrammarAttribute(
+                grammarAttrName,
+                getattr(self, grammarAttrName) if keepAttributes else [],
+            )
+        return newObject
+
+    def iterOptions(self) -> "Iterator[SyntaxObject]":
+        """
+        Lazily yields an unambiguous object for each combination of the option groups.
+        Ambiguities inside the attribute values are kept, see `iterTrees()`
+        """
+        if len(self.so_options) == 0:
+            yield self
+            return
+
+        for choice in iterOptionChoices(self.so_options, 0):
+            newObject = self.detachedCopy()
+            for option in choice:
+                newObject.extend(option)
+            yield newObject
+
+    def countOptions(self) -> int:
+        """
+        Returns the number of objects `iterOptions()` yields, without expanding them
+        """
+        return countOptionChoices(self, {})
+
+    def iterTrees(self) -> "Iterator[SyntaxObject]":
+        """
+        Lazily yields every unambiguous tree rooted in this object,
+        expanding the ambiguities of the attribute values too
+        """
+        for option in self.iterOptions():
+            grammarAttrNames = option.so_grammarAttributeNames
+            if len(grammarAttrNames) == 0:
+                yield option
+                continue
+
+            subobjects = [
+                (grammarAttrName, subobj)
+                for grammarAttrName in grammarAttrNames
+                for subobj in getattr(option, grammarAttrName)
+            ]
+            for subtrees in iterSubtreeChoices(subobjects, 0):
+                newObject = option.detachedCopy(keepAttributes=False)
+                for (grammarAttrName, subobj), subtree in zip(subobjects, subtrees):
+                    newObject.extendGrammarAttribute(grammarAttrName, [subtree])
+                yield newObject
+
+    def countTrees(self) -> int:
+        """
+        Returns the number of trees `iterTrees()` yields, without expanding them
+        """
+        return countTreeChoices(self, {})
+
+
+def syntaxClass(syntaxObject: SyntaxObject) -> type:
+    """
+    Returns the class of the object. The objects that a ParseArena or a PackedTree
+    creates empty have a view subclass as their type until they are filled,
+    reading a slot fills them
+    """
+    syntaxObject.so_options
+    return type(syntaxObject)
+
+
+def viewClass(cls: type, fillObject: Callable[[SyntaxObject], None]) -> type:
+    """
+    Returns a subclass of cls for objects created empty with `object.__new__()`.
+    It has the layout of cls, and calls fillObject before the first attribute
+    of an object is read or set. fillObject must set the class of the object to cls
+    """
+
+    def __getattr__(syntaxObject, name: str):
+        fillObject(syntaxObject)
+        return getattr(syntaxObject, name)
+
+    def __setattr__(syntaxObject, name: str, value) -> None:
+        fillObject(syntaxObject)
+        setattr(syntaxObject, name, value)
+
+    def __reduce_ex__(syntaxObject, protocol):
+        fillObject(syntaxObject)
+        return syntaxObject.__reduce_ex__(protocol)
+
+    return type(cls)(
+        cls.__name__,
+        (cls,),
+        {
+            "__slots__": (),
+            "__module__": cls.__module__,
+            "__qualname__": cls.__qualname__,
+            "__getattr__": __getattr__,
+            "__setattr__": __setattr__,
+            "__reduce_ex__": __reduce_ex__,
+        },
+    )
+
+
+_slotNames: dict[type, tuple[str, ...]] = {}
+
+
+def slotNames(cls: type) -> tuple[str, ...]:
+    """
+    Returns the names of all slots of the class, from its bases to itself
+    """
+    if cls not in _slotNames:
+        names = []
+        for mroClass in reversed(cls.__mro__):
+            slots = vars(mroClass).get("__slots__", ())
+            names.extend([slots] if isinstance(slots, str) else slots)
+            # fields of classes created with slots=False, kept in their instance dict
+            names.extend(vars(mroClass).get("_so_dictSlots", ()))
+        _slotNames[cls] = tuple(
+            dict.fromkeys(
+                name for name in names if name not in ("__dict__", "__weakref__")
+            )
+        )
+    return _slotNames[cls]
+
+
+def iterOptionChoices(
+    groups: list[tuple[SyntaxObject, ...]], index: int
+) -> Iterator[list[SyntaxObject]]:
+    """
+    Yields a list of unambiguous options for each combination of the groups starting at index
+    """
+    if index == len(groups):
+        yield []
+        return
+    for option in groups[index]:
+        for expandedOption in option.iterOptions():
+            for rest in iterOptionChoices(groups, index + 1):
+                yield [expandedOption] + rest
+
+
+def iterSubtreeChoices(
+    subobjects: list[tuple[str, SyntaxObject]], index: int
+) -> Iterator[list[SyntaxObject]]:
+    """
+    Yields a list of unambiguous trees for each combination of the subobjects starting at index
+    """
+    if index == len(subobjects):
+        yield []
+        return
+    for subtree in subobjects[index][1].iterTrees():
+        for rest in iterSubtreeChoices(subobjects, index + 1):
+            yield [subtree] + rest
+
+
+def countOptionChoices(syntaxObject: SyntaxObject, counted: dict[int, int]) -> int:
+    """
+    Counts the options of an object, counting every shared object once
+    """
+    if id(syntaxObject) not in counted:
+        count = 1
+        for group in syntaxObject.so_options:
+            count *= sum(countOptionChoices(option, counted) for option in group)
+        counted[id(syntaxObject)] = count
+    return counted[id(syntaxObject)]
+
+
+def countTreeChoices(syntaxObject: SyntaxObject, counted: dict[int, int]) -> int:
+    """
+    Counts the trees rooted in an object, counting every shared object once
+    """
+    if id(syntaxObject) not in counted:
+        # trees of this object's own attributes
+        count = 1
+        for grammarAttrName in syntaxObject.so_grammarAttributeNames:
+            for subobj in getattr(syntaxObject, grammarAttrName):
+                count *= countTreeChoices(subobj, counted)
+        # combined with the trees of each option group
+        for group in syntaxObject.so_options:
+            count *= sum(countTreeChoices(option, counted) for option in group)
+        counted[id(syntaxObject)] = count
+    return counted[id(syntaxObject)]
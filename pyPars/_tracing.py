@@ -0,0 +1,171 @@
+from dataclasses import dataclass
+from time import perf_counter
+from typing import Any
+from .text import PosT
+from ._rules import GrammarRule
+
+
+class ParseTracer:
+    """
+    Receives the events of a parse, pass it to `parse()` as `tracer`.
+    Rules are the GrammarClasses that are parsed, and the root rule.
+    Backtracks and left recursion growth happen in the rule entered last.
+    All methods do nothing, subclasses override the events they need.
+    """
+
+    def enterRule(self, rule: GrammarRule, pos: PosT) -> None:
+        """
+        Called before the rule is parsed at pos
+        """
+
+    def exitRule(self, rule: GrammarRule, pos: PosT, endPos: PosT | None) -> None:
+        """
+        Called when the rule entered at pos ended at endPos, or failed with endPos None
+        """
+
+    def memoHit(self, rule: GrammarRule, pos: PosT, endPos: PosT | None) -> None:
+        """
+        Called when the result of a rule was taken from the memo instead of parsing it
+        """
+
+    def backtrack(self, pos: PosT) -> None:
+        """
+        Called when an option of a selection failed and the parser went back to pos
+        """
+
+    def leftRecursionGrowth(self, pos: PosT) -> None:
+        """
+        Called for each attempt to grow a left recursive match that starts at pos
+        """
+
+
+@dataclass
+class RuleStats:
+    """
+    The counters of a rule collected by a RuleProfiler.
+    `totalTime` includes the time spent in the rules it called, `selfTime` doesn't.
+    Times are in seconds
+    """
+
+    rule: Any
+    calls: int = 0
+    successes: int = 0
+    failures: int = 0
+    memoHits: int = 0
+    backtracks: int = 0
+    growthIterations: int = 0
+    totalTime: float = 0.0
+    selfTime: float = 0.0
+
+    def getName(self) -> str:
+        return getattr(self.rule, "__name__", repr(self.rule))
+
+
+class RuleProfiler(ParseTracer):
+    """
+    A tracer that counts calls, results, backtracks and left recursion growth per rule
+    and measures their time. Use `report()` to rank the rules by cost.
+    A profiler can be passed to several parses to sum their statistics.
+    """
+
+    SORT_KEYS = ("selfTime", "totalTime", "calls", "failures", "backtracks")
+
+    def __init__(self) -> None:
+        self.stats: dict[Any, RuleStats] = {}
+        # [rule, start time, time spent in the rules it called] of the rules being parsed
+        self.stack: list[list] = []
+        # how many times each rule is on the stack, to count the time of recursive rules once
+        self.activeCounts: dict[Any, int] = {}
+
+    def getStats(self, rule: GrammarRule) -> RuleStats:
+        stats = self.stats.get(rule)
+        if stats is None:
+            stats = self.stats[rule] = RuleStats(rule)
+        return stats
+
+    def enterRule(self, rule: GrammarRule, pos: PosT) -> None:
+        self.getStats(rule).calls += 1
+        self.activeCounts[rule] = self.activeCounts.get(rule, 0) + 1
+        self.stack.append([rule, perf_counter(), 0.0])
+
+    def exitRule(self, rule: GrammarRule, pos: PosT, endPos: PosT | None) -> None:
+        _, startTime, childTime = self.stack.pop()
+        elapsed = perf_counter() - startTime
+        if len(self.stack) > 0:
+            self.stack[-1][2] += elapsed
+
+        stats = self.getStats(rule)
+        if endPos is None:
+            stats.failures += 1
+        else:
+            stats.successes += 1
+        stats.selfTime += elapsed - childTime
+        self.activeCounts[rule] -= 1
+        if self.activeCounts[rule] == 0:
+            stats.totalTime += elapsed
+
+    def memoHit(self, rule: GrammarRule, pos: PosT, endPos: PosT | None) -> None:
+        self.getStats(rule).memoHits += 1
+
+    def backtrack(self, pos: PosT) -> None:
+        if len(self.stack) > 0:
+            self.getStats(self.stack[-1][0]).backtracks += 1
+
+    def leftRecursionGrowth(self, pos: PosT) -> None:
+        if len(self.stack) > 0:
+            self.getStats(self.stack[-1][0]).growthIterations += 1
+
+    def ranking(self, sortBy: str = "selfTime") -> list[RuleStats]:
+        """
+        Returns the statistics of the rules, most expensive first
+        """
+        if sortBy not in RuleProfiler.SORT_KEYS:
+            raise ValueError(
+                f"Unknown sort key '{sortBy}', expected one of {RuleProfiler.SORT_KEYS}"
+            )
+        return sorted(
+            self.stats.values(), key=lambda stats: getattr(stats, sortBy), reverse=True
+        )
+
+    def report(self, sortBy: str = "selfTime", limit: int | None = None) -> str:
+        """
+        Returns a table of the rule statistics, most expensive first
+        """
+        ranking = self.ranking(sortBy)
+        if limit is not None:
+            ranking = ranking[:limit]
+
+        header = (
+            "rule",
+            "calls",
+            "ok",
+            "failed",
+            "memo",
+            "backtracks",
+            "growth",
+            "total ms",
+            "self ms",
+        )
+        rows = [
+            (
+                stats.getName(),
+                str(stats.calls),
+                str(stats.successes),
+                str(stats.failures),
+                str(stats.memoHits),
+                str(stats.backtracks),
+                str(stats.growthIterations),
+                f"{stats.totalTime * 1000:.3f}",
+                f"{stats.selfTime * 1000:.3f}",
+            )
+            for stats in ranking
+        ]
+        widths = [
+            max(len(row[i]) for row in [header, *rows]) for i in range(len(header))
+        ]
+        lines = []
+        for row in [header, *rows]:
+            cells = [row[0].ljust(widths[0])]
+            cells += [cell.rjust(width) for cell, width in zip(row[1:], widths[1:])]
+            lines.append("  ".join(cells))
+        return "\n".join(lines)
@@ -1,4 +1,5 @@
 from dataclasses import dataclass
+from typing import Any
 from .text import Text, NatT, PosT, PatternT, MatchT
 from ._modular_dict_method import ModularDictMethodObject
 
@@ -7,26 +8,74 @@ class TextSaver(ModularDictMethodObject):
     """
     Adds the `so_savedText` attribute to SyntaxObjects inheriting this class.
     `so_savedText` holds the slice of the parsed text spanned by the object.
+    The object only keeps the text and the span, and slices the text when
+    `so_savedText` is first read. The slice is kept if `so_cacheSavedText` is True.
+    Objects parsed with a memo that tracks extents slice the current text of the memo.
     """
 
+    __slots__ = ()
+    # so_textSource is the (text, start, end) to slice, so_textCache the slice once it is taken
+    _so_slots = ("so_textSource", "so_textCache")
+
+    #: Whether the slice is kept after the first read of so_savedText
+    so_cacheSavedText: bool = True
+
     def __init__(self) -> None:
         super().__init__()
-        self.so_savedText: NatT = None
+        self.so_textSource: tuple[Text, PosT, PosT] | None = None
+        self.so_textCache: NatT = None
+
+    @property
+    def so_savedText(self) -> NatT:
+        if self.so_textSource is None:
+            return self.so_textCache
+        mytext, start, end = self.so_textSource
+        savedText = mytext[start:end]
+        if self.so_cacheSavedText:
+            self.so_textCache = savedText
+            self.so_textSource = None
+        return savedText
 
-        self._dict_extractor_modules.append(lambda self: {"<text>": self.so_savedText})
+    @so_savedText.setter
+    def so_savedText(self, savedText: NatT) -> None:
+        self.so_textCache = savedText
+        self.so_textSource = None
+
+    def _dict_extractor(self) -> dict[str, any]:
+        return {"<text>": self.so_savedText}
 
 
 class SpanSaver(ModularDictMethodObject):
     """
     Adds the `so_span` attribute to SyntaxObjects inheriting this class.
     `so_span` is a tuple of the start and end position in the text spanned by the object.
+    Objects parsed with a memo that tracks extents keep the span of the memo,
+    which is mapped to the current text when `so_span` is read.
     """
 
+    __slots__ = ()
+    # so_spanSource is the (positionMap, start, end) to map, so_spanValue the span otherwise
+    _so_slots = ("so_spanSource", "so_spanValue")
+
     def __init__(self) -> None:
         super().__init__()
-        self.so_span: tuple[PosT, PosT] = None
+        self.so_spanSource: tuple[Any, PosT, PosT] | None = None
+        self.so_spanValue: tuple[PosT, PosT] = None
 
-        self._dict_extractor_modules.append(lambda self: {"<span>": self.so_span})
+    @property
+    def so_span(self) -> tuple[PosT, PosT]:
+        if self.so_spanSource is None:
+            return self.so_spanValue
+        positionMap, start, end = self.so_spanSource
+        return positionMap.span(start, end)
+
+    @so_span.setter
+    def so_span(self, span: tuple[PosT, PosT]) -> None:
+        self.so_spanValue = span
+        self.so_spanSource = None
+
+    def _dict_extractor(self) -> dict[str, any]:
+        return {"<span>": self.so_span}
 
 
 class SelfReplacable(ModularDictMethodObject):
@@ -34,5 +83,7 @@ class SelfReplacable(ModularDictMethodObject):
     Allows replacing the SyntaxObject with its `self` attribute when assigned
     """
 
+    __slots__ = ()
+
     def __init__(self) -> None:
-        super().__init__()
\ No newline at end of file
+        super().__init__()
@@ -12,6 +12,10 @@ PatternT = TypeVar('PatternT')
 MatchT = TypeVar('MatchT')
 
 class Text(Generic[PosT, NatT, PatternT, MatchT]):
+    #: Whether the text can still be sliced after it was parsed,
+    #: so that the saved texts of syntax objects can be sliced when they are read
+    keepsContent: bool = True
+
     @classmethod
     def GetTextSpecialization(cls) -> "Text[Type[PosT], Type[NatT], Type[PatternT], Type[MatchT]]":
         for base in cls.__orig_bases__:
@@ -65,4 +69,11 @@ class Text(Generic[PosT, NatT, PatternT, MatchT]):
         raise NotImplementedError()
 
     def matchedby(self, pattern: PatternT, pos: PosT) -> MatchT | None:
-        raise NotImplementedError()
\ No newline at end of file
+        raise NotImplementedError()
+
+    def commit(self, pos: PosT) -> None:
+        '''
+        Tells the text that the positions before pos won't be accessed anymore,
+        so it can free them. Texts that keep all of their content ignore it
+        '''
+        pass
@@ -0,0 +1,68 @@
+import mmap
+import os
+import re
+from dataclasses import dataclass
+from ._abstract import Text
+
+@dataclass
+class BytesMatch:
+    span: tuple[int,int]
+
+class BytesText(Text[int, bytes, re.Pattern, re.Match]):
+    '''
+    A text over a bytes-like buffer, such as bytes, bytearray or mmap.
+    Grammars use bytes literals and compiled bytes patterns.
+    Slices are memoryviews of the buffer, so the saved texts don't copy any data
+    until they are converted with bytes() or decoded
+    '''
+
+    def __init__(self, data: bytes | bytearray | mmap.mmap) -> None:
+        self.data = data
+        self.view = memoryview(data)
+
+    def getStartPos(self) -> int:
+        return 0
+
+    def __getitem__(self, pos: int|slice) -> memoryview | int:
+        return self.view[pos]
+
+    def startswith(self, prefix: bytes, pos: int) -> BytesMatch | None:
+        if self.view[pos:pos+len(prefix)] == prefix:
+            return BytesMatch((pos, pos+len(prefix)))
+        else:
+            return None
+
+    def matchedby(self, pattern: re.Pattern, pos: int) -> BytesMatch | None:
+        m = pattern.match(self.data, pos)
+        if m is not None:
+            return BytesMatch(m.span())
+        else:
+            return None
+
+class MmapText(BytesText):
+    '''
+    A BytesText over a memory-mapped file, so parsing doesn't read the whole file first.
+    Close it (or use it as a context manager) once the saved texts aren't needed:
+    closing fails while memoryviews of it are still referenced,
+    and saved texts that weren't read before can't be read after it
+    '''
+
+    def __init__(self, path: str | os.PathLike) -> None:
+        with open(path, 'rb') as file:
+            if os.fstat(file.fileno()).st_size == 0:
+                # empty files can't be mapped
+                data = b''
+            else:
+                data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        super().__init__(data)
+
+    def close(self) -> None:
+        self.view.release()
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+
+    def __enter__(self) -> "MmapText":
+        return self
+
+    def __exit__(self, *excInfo) -> None:
+        self.close()
@@ -1,8 +1,11 @@
 import re
+from array import array
+from bisect import bisect_right
 from dataclasses import dataclass
+from itertools import accumulate
 from ._abstract import Text
 
-@dataclass
+@dataclass(frozen=True, order=True)
 class MultilinePos:
     line: int
     char: int
@@ -10,43 +13,53 @@ class MultilinePos:
 
 @dataclass
 class MultilineMatch:
-    span: tuple[MultilinePos,MultilinePos]
+    span: tuple[int,int]
 
-class MultilineText(Text[MultilinePos, str, re.Pattern, re.Match]):
+class MultilineText(Text[int, str, re.Pattern, re.Match]):
+    '''
+    A text whose positions are absolute character offsets, like StringText,
+    that can also tell the line and the char in the line of a position.
+    The line starts are indexed on first use, so each lookup is a binary search.
+    '''
 
     def __init__(self, text: str) -> None:
         self.text = text
+        self.lineStarts: array | None = None
 
-    def shiftedMultilinePos(self, start: MultilinePos, shift: int) -> MultilinePos:
-        numNL = self.text.count('\n', start.abspos, start.abspos+shift)
+    def getLineStarts(self) -> array:
+        '''
+        Returns the offsets at which the lines start
+        '''
+        if self.lineStarts is None:
+            self.lineStarts = array('q', accumulate(
+                (len(line) + 1 for line in self.text.split('\n')[:-1]),
+                initial=0
+            ))
+        return self.lineStarts
 
-        if numNL == 0:
-            return MultilinePos(start.line, start.char+shift, start.abspos+shift)
-        else:
-            lastNL = self.text.rfind('\n', start.abspos, start.abspos+shift)
-            return MultilinePos(start.line + numNL, start.abspos+shift - lastNL, start.abspos+shift)
-    
-    def getStartPos(self) -> MultilinePos:
-        return MultilinePos(0,0,0)
-    
-    def __getitem__(self, pos: MultilinePos|slice) -> str:
-        if isinstance(pos, slice):
-            return self.text[pos.start.abspos:pos.stop.abspos:pos.step]
-        else:
-            return self.text[pos.abspos]
+    def getMultilinePos(self, pos: int) -> MultilinePos:
+        '''
+        Returns the line and the char in the line of the position
+        '''
+        lineStarts = self.getLineStarts()
+        line = bisect_right(lineStarts, pos) - 1
+        return MultilinePos(line, pos - lineStarts[line], pos)
 
-    def startswith(self, prefix: str, pos: MultilinePos) -> MultilineMatch | None:
-        if self.text.startswith(prefix, pos.abspos):
-            return MultilineMatch((pos, self.shiftedMultilinePos(pos, len(prefix))))
+    def getStartPos(self) -> int:
+        return 0
+
+    def __getitem__(self, pos: int|slice) -> str:
+        return self.text[pos]
+
+    def startswith(self, prefix: str, pos: int) -> MultilineMatch | None:
+        if self.text.startswith(prefix, pos):
+            return MultilineMatch((pos, pos+len(prefix)))
         else:
             return None
 
-    def matchedby(self, pattern: re.Pattern, pos: MultilinePos) -> MultilineMatch | None:
-        m = pattern.match(self.text, pos.abspos)
+    def matchedby(self, pattern: re.Pattern, pos: int) -> MultilineMatch | None:
+        m = pattern.match(self.text, pos)
         if m is not None:
-            return MultilineMatch(
-                pos,
-                self.shiftedMultilinePos(pos, m.span()[1] - m.span()[0])
-            )
+            return MultilineMatch(m.span())
         else:
-            return None
\ No newline at end of file
+            return None
@@ -0,0 +1,116 @@
+import math
+import re
+from dataclasses import dataclass
+from typing import Iterable, TextIO
+from ._abstract import Text
+
+@dataclass
+class StreamMatch:
+    span: tuple[int,int]
+
+class StreamText(Text[int, str, re.Pattern, re.Match]):
+    '''
+    A text that is read lazily from a file object or an iterable of str chunks,
+    like a pipe or a socket's makefile().
+    Only a window of the text is kept in memory: it is read up to where the parser looks,
+    and trimmed behind the positions the parser commits.
+
+    Patterns are matched against at least readAhead characters after their position,
+    and read further while a match reaches the end of the window.
+    A pattern that needs to look further ahead than readAhead to fail may fail too early.
+    Lookbehinds can't see committed text.
+    '''
+
+    # committed text is dropped, so texts are saved right away
+    keepsContent = False
+
+    def __init__(self, source: TextIO | Iterable[str], chunkSize: int = 1 << 16, readAhead: int = 1 << 12) -> None:
+        if hasattr(source, 'read'):
+            self.file = source
+            self.chunks = None
+        else:
+            self.file = None
+            self.chunks = iter(source)
+        self.chunkSize = chunkSize
+        self.readAhead = readAhead
+
+        self.buffer = ''
+        # position of the first character in the buffer
+        self.bufferStart = 0
+        self.exhausted = False
+
+    def getBufferEnd(self) -> int:
+        return self.bufferStart + len(self.buffer)
+
+    def readChunk(self) -> str | None:
+        '''
+        Returns the next chunk of the source or None if it ended
+        '''
+        if self.file is not None:
+            data = self.file.read(self.chunkSize)
+            return data if len(data) > 0 else None
+        for data in self.chunks:
+            if len(data) > 0:
+                return data
+        return None
+
+    def fill(self, end: int | float) -> None:
+        '''
+        Reads the source until the buffer reaches end or the source ends
+        '''
+        bufferEnd = self.getBufferEnd()
+        if end <= bufferEnd or self.exhausted:
+            return
+        chunks = [self.buffer]
+        while bufferEnd < end:
+            data = self.readChunk()
+            if data is None:
+                self.exhausted = True
+                break
+            chunks.append(data)
+            bufferEnd += len(data)
+        self.buffer = ''.join(chunks)
+
+    def bufferIndex(self, pos: int) -> int:
+        if pos < self.bufferStart:
+            raise ValueError(f"Position {pos} was already committed")
+        return pos - self.bufferStart
+
+    def getStartPos(self) -> int:
+        return 0
+
+    def __getitem__(self, pos: int|slice) -> str:
+        if isinstance(pos, slice):
+            start = 0 if pos.start is None else pos.start
+            self.fill(math.inf if pos.stop is None else pos.stop)
+            stop = None if pos.stop is None else self.bufferIndex(max(start, pos.stop))
+            return self.buffer[self.bufferIndex(start):stop]
+        self.fill(pos + 1)
+        return self.buffer[self.bufferIndex(pos)]
+
+    def startswith(self, prefix: str, pos: int) -> StreamMatch | None:
+        self.fill(pos + len(prefix))
+        if self.buffer.startswith(prefix, self.bufferIndex(pos)):
+            return StreamMatch((pos, pos+len(prefix)))
+        else:
+            return None
+
+    def matchedby(self, pattern: re.Pattern, pos: int) -> StreamMatch | None:
+        self.fill(pos + self.readAhead)
+        while True:
+            m = pattern.match(self.buffer, self.bufferIndex(pos))
+            if m is None or self.exhausted or m.end() < len(self.buffer):
+                break
+            # the match reached the end of the window and could go on
+            self.fill(self.getBufferEnd() + max(self.readAhead, len(self.buffer)))
+        if m is not None:
+            return StreamMatch((m.start() + self.bufferStart, m.end() + self.bufferStart))
+        else:
+            return None
+
+    def commit(self, pos: int) -> None:
+        # trimming copies the rest of the window, so it's only done once enough can be dropped
+        dropped = self.bufferIndex(pos)
+        if dropped >= self.chunkSize and dropped * 2 >= len(self.buffer):
+            self.buffer = self.buffer[dropped:]
+            self.bufferStart = pos
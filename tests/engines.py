@@ -0,0 +1,56 @@
+"""
+Runs a parse with each of the engines, so that their results can be compared
+"""
+from pyPars import (
+    SyntaxObject,
+    PackratMemo,
+    parse,
+    compileGrammar,
+    compileArenaGrammar,
+    freezeGrammar,
+    generateParserModule,
+)
+
+
+ENGINES = [
+    "recursive",
+    "iterative",
+    "memo",
+    "compiled",
+    "arena",
+    "frozen",
+    "generated",
+]
+
+_parsers: dict[tuple, object] = {}
+
+
+def parser(engine: str, rule, textType: type):
+    key = (engine, id(rule), textType)
+    if key not in _parsers:
+        if engine == "compiled":
+            parseFunction = compileGrammar(rule, textType).parse
+        elif engine == "arena":
+            parseFunction = compileArenaGrammar(rule, textType).parse
+        elif engine == "frozen":
+            parseFunction = freezeGrammar(rule, textType).parse
+        elif engine == "generated":
+            namespace = {}
+            exec(generateParserModule(rule, textType), namespace)
+            parseFunction = namespace["parse"]
+        else:
+            raise ValueError(f"Unknown engine '{engine}'")
+        # the rule is kept, so that its id can't be reused
+        _parsers[key] = (rule, parseFunction)
+    return _parsers[key][1]
+
+
+def parseWith(engine: str, mytext, pos, rule, attrStore: SyntaxObject):
+    """
+    Parses the rule at pos with the engine, the same way as `parse()`
+    """
+    if engine in ("recursive", "iterative"):
+        return parse(mytext, pos, rule, attrStore, engine=engine)
+    elif engine == "memo":
+        return parse(mytext, pos, rule, attrStore, PackratMemo())
+    return parser(engine, rule, type(mytext))(mytext, pos, attrStore)
@@ -0,0 +1,50 @@
+"""
+Grammars shared by the tests
+"""
+import re
+from pyPars import SyntaxObject, GrammarClass, SelectionFirst, K
+from pyPars.so_modifiers import TextSaver, SpanSaver, SelfReplacable
+
+
+class WS(SyntaxObject, metaclass=GrammarClass):
+    grammar = re.compile("[ \t]*")
+
+
+class NL(SyntaxObject, metaclass=GrammarClass):
+    grammar = re.compile("\n")
+
+
+class Num(SyntaxObject, TextSaver, SpanSaver, metaclass=GrammarClass):
+    grammar = re.compile("[1-9][0-9]*")
+
+
+class Id(SyntaxObject, TextSaver, SpanSaver, metaclass=GrammarClass):
+    grammar = re.compile("[a-zA-Z_][0-9a-zA-Z_]*")
+
+
+class Literal(SyntaxObject, SelfReplacable, metaclass=GrammarClass):
+    grammar = {"self": Id / Num}
+
+
+class Expression(SyntaxObject, SpanSaver, SelfReplacable, metaclass=GrammarClass):
+    grammar = None
+
+
+Expression.grammar = (
+    SelectionFirst()
+    / ({"left": Expression}, WS, SelectionFirst("+", "-"), WS, {"right": Expression})
+    / ({"left": Expression}, WS, SelectionFirst("*", "/"), WS, {"right": Expression})
+    / {"self": Literal}
+)
+
+
+class Assignment(SyntaxObject, SpanSaver, metaclass=GrammarClass):
+    grammar = {"assignee": Id}, WS, "=", WS, {"value": Expression}, NL
+
+
+class Program(SyntaxObject, metaclass=GrammarClass):
+    grammar = ({"stat": Assignment} / NL) * K
+
+
+def programText(count: int) -> str:
+    return "".join(f"v{i} = a + {i + 1} * b{i} - c\n\n" for i in range(count))
@@ -0,0 +1,93 @@
+import itertools
+import re
+import pytest
+from pyPars import (
+    SyntaxObject,
+    GrammarClass,
+    Selection,
+    SelectionLongest,
+    K,
+    parse,
+    toJson,
+)
+from pyPars.text.string import StringText
+from .engines import ENGINES, parseWith
+
+
+class Word(SyntaxObject, metaclass=GrammarClass):
+    grammar = re.compile("[a-z]+")
+
+
+class Item(SyntaxObject, metaclass=GrammarClass):
+    grammar = Selection({"a": Word}, {"b": Word}), ";"
+
+
+class Items(SyntaxObject, metaclass=GrammarClass):
+    grammar = {"item": Item} * K
+
+
+class Pair(SyntaxObject, metaclass=GrammarClass):
+    grammar = (
+        Selection(({"a": Word}, "!"), ({"b": Word}, "!")),
+        Selection(({"a": Word}, "?"), ({"b": Word}, "?")),
+    )
+
+
+class Longest(SyntaxObject, metaclass=GrammarClass):
+    grammar = SelectionLongest({"a": Word}, ({"b": Word}, "!"), ({"c": Word}, "!!"))
+
+
+def parsed(rule, text, engine="recursive"):
+    attrStore = rule()
+    assert parseWith(engine, StringText(text), 0, rule, attrStore) == len(text)
+    return attrStore
+
+
+def treeNames(items: Items) -> list[str]:
+    return [
+        "".join("a" if getattr(item, "a", None) else "b" for item in tree.item)
+        for tree in items.iterTrees()
+    ]
+
+
+def test_every_combination_is_expanded_once():
+    items = parsed(Items, "x;y;z;")
+    assert items.countTrees() == 8
+    names = treeNames(items)
+    assert sorted(names) == ["".join(p) for p in itertools.product("ab", repeat=3)]
+
+
+def test_counting_does_not_expand_the_trees():
+    count = 40
+    items = parsed(Items, "x;" * count)
+    assert items.countTrees() == 2**count
+    assert all(len(item.so_options) == 1 for item in items.item)
+
+
+def test_option_groups_are_shared():
+    pair = parsed(Pair, "x!y?")
+    assert len(pair.so_options) == 2
+    assert pair.countOptions() == 4
+    options = [
+        (len(getattr(o, "a", None) or []), len(getattr(o, "b", None) or []))
+        for o in pair.iterOptions()
+    ]
+    assert sorted(options) == [(0, 2), (1, 1), (1, 1), (2, 0)]
+
+
+@pytest.mark.parametrize("text, attrName", [("ab", "a"), ("ab!", "b"), ("ab!!", "c")])
+def test_longest_option_wins(text, attrName):
+    longest = parsed(Longest, text)
+    assert longest.countTrees() == 1
+    assert [name for name in "abc" if getattr(longest, name, None)] == [attrName]
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_engines_find_the_same_trees(engine):
+    for rule, text in [(Items, "x;y;"), (Pair, "x!y?"), (Longest, "ab!")]:
+        expected = parsed(rule, text)
+        attrStore = parsed(rule, text, engine)
+        assert attrStore.countTrees() == expected.countTrees()
+        assert sorted(map(toJson, attrStore.iterTrees())) == sorted(
+            map(toJson, expected.iterTrees())
+        )
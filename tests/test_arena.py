@@ -0,0 +1,90 @@
+import pickle
+import pytest
+from pyPars import (
+    PackratMemo,
+    compileArenaGrammar,
+    packTree,
+    parse,
+    syntaxClass,
+    toJson,
+    toTuple,
+)
+from pyPars.text.bytes import BytesText
+from pyPars.text.string import StringText
+from .grammars import Assignment, Program, programText
+
+
+def arenaProgram(text: str) -> Program:
+    root = Program()
+    grammar = compileArenaGrammar(Program)
+    assert grammar.parse(StringText(text), 0, root) == len(text)
+    return root
+
+
+def test_views_are_filled_on_first_read():
+    root = arenaProgram(programText(3))
+    assignment = root.stat[0]
+    assert isinstance(assignment, Assignment)
+    assert type(assignment) is not Assignment
+    assert syntaxClass(assignment) is Assignment
+    assert type(assignment) is Assignment
+
+
+def test_serializers_see_the_classes_of_views():
+    text = programText(5)
+    expected = Program()
+    parse(StringText(text), 0, Program, expected)
+
+    assert toJson(arenaProgram(text)) == toJson(expected)
+    assert toTuple(arenaProgram(text)) == toTuple(expected)
+    packed = packTree(arenaProgram(text), StringText(text))
+    assert Assignment in packed.classes
+    assert toJson(packed.root()) == toJson(expected)
+
+
+def test_arena_queries():
+    text = programText(2)
+    arena = compileArenaGrammar(Program).parseArena(StringText(text), 0)
+    assert arena.position == len(text)
+    assignments = list(arena.iterNodes(Assignment))
+    assert len(assignments) == 2
+    assert arena.nodeSpan(assignments[1]) == (text.index("v1"), len(text) - 1)
+
+
+def test_arena_grammars_are_compiled_explicitly():
+    with pytest.raises(ValueError, match="Unknown parsing engine"):
+        parse(StringText("a = 1\n"), 0, Program, engine="arena")
+
+
+def test_arena_tree_structure():
+    text = "v = a + 1\n"
+    arena = compileArenaGrammar(Program).parseArena(StringText(text), 0)
+    (assignment,) = arena.iterNodes(Assignment)
+    parents = arena.parents()
+    attributes = dict(arena.attributes(assignment))
+    assert arena.nodeText(attributes["assignee"]) == "v"
+    assert parents[attributes["value"]] == assignment
+    assert parents[0] == -1
+    assert arena.getObject(assignment) is arena.getObject(assignment)
+
+
+def test_views_are_filled_when_written_or_pickled():
+    text = programText(3)
+    root = arenaProgram(text)
+    first, second = root.stat[:2]
+    first.assignee = second.assignee
+    assert type(first) is Assignment
+    assert first.assignee[0].so_savedText == "v1"
+
+    copy = pickle.loads(pickle.dumps(arenaProgram(text)))
+    expected = Program()
+    parse(StringText(text), 0, Program, expected)
+    assert toJson(copy) == toJson(expected)
+
+
+def test_arena_grammars_reject_other_texts_and_memos():
+    grammar = compileArenaGrammar(Program)
+    with pytest.raises(TypeError, match="compiled for texts like"):
+        grammar.parse(BytesText(b"v = a\n"), 0)
+    with pytest.raises(ValueError, match="packrat memos"):
+        grammar.parse(StringText("v = a\n"), 0, Program(), PackratMemo())
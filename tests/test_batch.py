@@ -0,0 +1,66 @@
+import pytest
+from pyPars import PackedTree, parse, parseMany, toJson
+from pyPars.text.bytes import BytesText, MmapText
+from pyPars.text.string import StringText
+from .grammars import Program, programText
+from .test_bytes_text import DATA, Config
+
+
+def expectedResult(text):
+    expected = Program()
+    return parse(StringText(text), 0, Program, expected), toJson(expected)
+
+
+TEXTS = [programText(count) for count in range(12)] + ["v =\n", "v = a\n"]
+
+
+@pytest.mark.parametrize("ordered", [True, False])
+def test_results_match_single_parses(ordered):
+    results = list(parseMany(TEXTS, Program, workers=2, ordered=ordered, chunkSize=3))
+    if ordered:
+        assert [result.index for result in results] == list(range(len(TEXTS)))
+    assert sorted(result.index for result in results) == list(range(len(TEXTS)))
+    for result in results:
+        assert result.path is None
+        assert (result.position, toJson(result.syntaxObject)) == expectedResult(
+            TEXTS[result.index]
+        )
+
+
+def test_paths_are_read_by_the_workers(tmp_path):
+    paths = []
+    for index, text in enumerate(TEXTS[:5]):
+        path = tmp_path / f"program{index}.txt"
+        path.write_text(text)
+        paths.append(path)
+
+    for result in parseMany(paths, Program, workers=2, chunkSize=2, packed=True):
+        assert result.path == paths[result.index]
+        assert isinstance(result.syntaxObject, PackedTree)
+        assert (result.position, toJson(result.syntaxObject.root())) == expectedResult(
+            TEXTS[result.index]
+        )
+
+
+def test_invalid_chunk_size():
+    with pytest.raises(ValueError):
+        list(parseMany(TEXTS, Program, chunkSize=0))
+
+
+@pytest.mark.parametrize("textType", [BytesText, MmapText])
+def test_bytes_text_types_read_files_in_binary_mode(tmp_path, textType):
+    path = tmp_path / "config.txt"
+    path.write_bytes(DATA)
+    [result] = parseMany([path], Config, workers=1, textType=textType)
+    assert result.position == len(DATA)
+    keys = [bytes(entry.key[0].so_savedText) for entry in result.syntaxObject.entry]
+    assert keys == [b"alpha", b"beta", b"gamma"]
+
+
+@pytest.mark.parametrize(
+    "source, textType",
+    [(DATA, StringText), ("alpha=1\n", BytesText), (DATA, MmapText)],
+)
+def test_sources_must_fit_the_text_type(source, textType):
+    with pytest.raises(TypeError):
+        list(parseMany([source], Config, workers=1, textType=textType))
@@ -0,0 +1,53 @@
+import json
+import random
+import pytest
+from pyPars import toJson
+from pyPars.text.string import StringText
+from benchmarks.runner import (
+    ENGINES,
+    WORKLOADS,
+    compareResults,
+    loadResults,
+    makeParser,
+    runSuite,
+    saveResults,
+    scalingExponents,
+)
+
+
+@pytest.mark.parametrize("name", list(WORKLOADS))
+def test_engines_parse_the_workloads_alike(name):
+    workload = WORKLOADS[name]
+    text = workload.generate(2000, 3, random.Random(1))
+    assert text == workload.generate(2000, 3, random.Random(1))
+
+    outputs = set()
+    for engine in ENGINES:
+        attrStore = workload.rootClass()
+        parser = makeParser(engine, workload.rootClass)
+        assert parser(StringText(text), attrStore) == len(text)
+        outputs.add(toJson(attrStore))
+    assert len(outputs) == 1
+
+
+def test_json_workload_is_json():
+    text = WORKLOADS["json"].generate(3000, 4, random.Random(0))
+    assert isinstance(json.loads(text), list)
+
+
+def test_suite_results_round_trip(tmp_path):
+    results = runSuite(["ini"], ["recursive"], [500, 2000], depth=2, repeat=1)
+    assert [result.size for result in results] == [500, 2000]
+    assert all(result.nodes > 0 and result.peakMemory > 0 for result in results)
+    assert ("ini", "recursive") in scalingExponents(results)
+
+    path = tmp_path / "results.json"
+    saveResults(results, str(path))
+    loaded = loadResults(str(path))
+    assert loaded == results
+    assert "1.00x speed" in compareResults(loaded, results)
+
+
+def test_unknown_engine():
+    with pytest.raises(ValueError, match="Unknown engine"):
+        makeParser("fastest", WORKLOADS["ini"].rootClass)
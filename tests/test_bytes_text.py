@@ -0,0 +1,85 @@
+import gc
+import mmap
+import re
+import pytest
+from pyPars import SyntaxObject, GrammarClass, SelectionFirst, K, toTuple
+from pyPars.so_modifiers import TextSaver, SpanSaver
+from pyPars.text.bytes import BytesText, MmapText
+from .engines import ENGINES, parseWith
+
+
+class Key(SyntaxObject, TextSaver, metaclass=GrammarClass):
+    grammar = re.compile(rb"[a-z]+")
+
+
+class Value(SyntaxObject, TextSaver, SpanSaver, metaclass=GrammarClass):
+    grammar = re.compile(rb"[0-9]+")
+
+
+class Entry(SyntaxObject, metaclass=GrammarClass):
+    grammar = {"key": Key}, b"=", {"value": Value}, b"\n"
+
+
+class Blank(SyntaxObject, metaclass=GrammarClass):
+    grammar = b"\n"
+
+
+class Config(SyntaxObject, metaclass=GrammarClass):
+    grammar = SelectionFirst({"entry": Entry}, {"blank": Blank}) * K
+
+
+DATA = b"alpha=1\n\nbeta=22\ngamma=333\n\n"
+
+
+def parsedEntries(engine: str, mytext: BytesText) -> list[tuple[bytes, bytes, tuple]]:
+    config = Config()
+    assert parseWith(engine, mytext, 0, Config, config) == len(DATA)
+    return [
+        (
+            bytes(entry.key[0].so_savedText),
+            bytes(entry.value[0].so_savedText),
+            entry.value[0].so_span,
+        )
+        for entry in config.entry
+    ]
+
+
+EXPECTED = [
+    (b"alpha", b"1", (6, 7)),
+    (b"beta", b"22", (14, 16)),
+    (b"gamma", b"333", (23, 26)),
+]
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+@pytest.mark.parametrize("makeData", [bytes, bytearray])
+def test_bytes_and_bytearray(engine, makeData):
+    assert parsedEntries(engine, BytesText(makeData(DATA))) == EXPECTED
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_mmap(engine, tmp_path):
+    path = tmp_path / "config.txt"
+    path.write_bytes(DATA)
+    with MmapText(path) as mytext:
+        assert parsedEntries(engine, mytext) == EXPECTED
+        # the trees of the arena engine are in reference cycles, freed by the collector
+        gc.collect()
+
+    with open(path, "r+b") as file:
+        writable = mmap.mmap(file.fileno(), 0)
+        try:
+            assert parsedEntries(engine, BytesText(writable)) == EXPECTED
+            gc.collect()
+        finally:
+            writable.close()
+
+
+def test_saved_texts_are_views():
+    data = bytearray(DATA)
+    config = Config()
+    parseWith("recursive", BytesText(data), 0, Config, config)
+    savedText = config.entry[0].key[0].so_savedText
+    assert isinstance(savedText, memoryview)
+    assert savedText.obj is data
+    assert toTuple(config)[0] == "Config"
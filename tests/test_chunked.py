@@ -0,0 +1,33 @@
+import pytest
+from pyPars import parse, parseChunked, toJson
+from pyPars.text.string import StringText
+from .grammars import Assignment, Program, programText
+
+
+@pytest.mark.parametrize("chunkSize", [1, 7, 100, 1 << 20])
+def test_chunks_match_a_single_parse(chunkSize):
+    text = programText(40)
+    expected = Program()
+    expectedPos = parse(StringText(text), 0, Program, expected)
+
+    chunked = Program()
+    pos = parseChunked(text, Program, "\n", chunked, workers=2, chunkSize=chunkSize)
+    assert pos == expectedPos == len(text)
+    assert toJson(chunked) == toJson(expected)
+
+
+def test_items_crossing_chunks_and_failures():
+    # the sync points inside statements make items cross the chunk ends
+    text = programText(20).replace(" + ", " +\n")
+    expected = Program()
+    expectedPos = parse(StringText(text), 0, Program, expected)
+
+    chunked = Program()
+    pos = parseChunked(text, Program, "[+\n]", chunked, workers=2, chunkSize=10)
+    assert pos == expectedPos
+    assert toJson(chunked) == toJson(expected)
+
+
+def test_non_repetition_roots_are_rejected():
+    with pytest.raises(ValueError):
+        parseChunked("a = 1\n", Assignment, "\n")
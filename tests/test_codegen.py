@@ -0,0 +1,49 @@
+import importlib.util
+import re
+import pytest
+from pyPars import (
+    SyntaxObject,
+    GrammarClass,
+    PackratMemo,
+    generateParserModule,
+    writeParserModule,
+    parse,
+    toJson,
+)
+from pyPars.text.string import StringText
+from .grammars import Assignment, Program, programText
+
+
+def importModule(path):
+    spec = importlib.util.spec_from_file_location("generated_parser", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_written_module_parses_like_the_grammar(tmp_path):
+    path = tmp_path / "program_parser.py"
+    writeParserModule(str(path), Program)
+    module = importModule(path)
+
+    text = programText(10) + "v = a +"
+    expected = Program()
+    expectedPos = parse(StringText(text), 0, Program, expected)
+    for memo in (None, PackratMemo()):
+        attrStore = Program()
+        assert module.parse(StringText(text), 0, attrStore, memo) == expectedPos
+        assert toJson(attrStore) == toJson(expected)
+
+
+def test_generated_module_imports_the_grammar_classes():
+    source = generateParserModule(Program)
+    assert f"from {Assignment.__module__} import Assignment as" in source
+    assert "def parse(mytext, pos, attrStore=None, memo=None):" in source
+
+
+def test_local_classes_are_rejected():
+    class Word(SyntaxObject, metaclass=GrammarClass):
+        grammar = re.compile("[a-z]+")
+
+    with pytest.raises(ValueError, match="must be importable"):
+        generateParserModule({"word": Word})
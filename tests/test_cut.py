@@ -0,0 +1,235 @@
+import re
+import pytest
+from pyPars import (
+    SyntaxObject,
+    GrammarClass,
+    SelectionFirst,
+    Cut,
+    K,
+    PackratMemo,
+    iterParse,
+    parse,
+    toJson,
+)
+from pyPars.so_modifiers import TextSaver
+from pyPars.text.stream import StreamText
+from pyPars.text.string import StringText
+from .engines import ENGINES, parseWith
+from .grammars import WS
+
+
+class Word(SyntaxObject, metaclass=GrammarClass):
+    grammar = re.compile("[a-z]+")
+
+
+class Statement(SyntaxObject, metaclass=GrammarClass):
+    grammar = SelectionFirst(
+        ("if", Cut, WS, {"condition": Word}, ";"),
+        ({"word": Word}, ";"),
+    )
+
+
+class UncutStatement(SyntaxObject, metaclass=GrammarClass):
+    grammar = SelectionFirst(
+        ("if", WS, {"condition": Word}, ";"),
+        ({"word": Word}, ";"),
+    )
+
+
+class Block(SyntaxObject, metaclass=GrammarClass):
+    grammar = ({"statement": Statement}, WS) * K
+
+
+class UncutBlock(SyntaxObject, metaclass=GrammarClass):
+    grammar = ({"statement": UncutStatement}, WS) * K
+
+
+class Marked(SyntaxObject, metaclass=GrammarClass):
+    grammar = SelectionFirst(
+        ("mark ", {"statement": Statement}, "!"),
+        ("mark ", {"statement": Statement}, "?"),
+    )
+
+
+class SavedStatement(SyntaxObject, TextSaver, metaclass=GrammarClass):
+    grammar = "let ", {"name": Word}, Cut, ";"
+
+
+class SavedBlock(SyntaxObject, metaclass=GrammarClass):
+    grammar = {"statement": SavedStatement} * K
+
+
+class Declaration(SyntaxObject, metaclass=GrammarClass):
+    grammar = "let ", {"name": Word}, Cut, ";"
+
+
+class Declarations(SyntaxObject, metaclass=GrammarClass):
+    # the last declaration is parsed as an item, then again as the end
+    grammar = ({"declaration": Declaration}, " ok ") * K, "let last; done"
+
+
+class OptionalDeclaration(SyntaxObject, metaclass=GrammarClass):
+    grammar = (
+        "let abcdefgh; ok ",
+        [{"declaration": Declaration}, " ok "],
+        "let last; done",
+    )
+
+
+class Element(SyntaxObject, metaclass=GrammarClass):
+    grammar = {"word": Word}, Cut, ","
+
+
+class List(SyntaxObject, metaclass=GrammarClass):
+    grammar = "[", {"element": Element} * K, "]"
+
+
+class Lists(SyntaxObject, metaclass=GrammarClass):
+    grammar = {"list": List} * K
+
+
+class Sum(SyntaxObject, metaclass=GrammarClass):
+    grammar = None
+
+
+# the left operand has two candidates, so growing the sum reads its start again
+Sum.grammar = SelectionFirst(
+    ({"left": SelectionFirst(Sum, Word)}, "+", Cut, {"right": Word}),
+    {"word": Word},
+)
+
+
+class PeakStreamText(StreamText):
+    """
+    Records the largest window it held
+    """
+
+    def __init__(self, text: str) -> None:
+        super().__init__([text[i : i + 4] for i in range(0, len(text), 4)], 4, 4)
+        self.peak = 0
+
+    def fill(self, end) -> None:
+        super().fill(end)
+        self.peak = max(self.peak, len(self.buffer))
+
+
+def parsed(engine, rule, text):
+    attrStore = rule()
+    return parseWith(engine, StringText(text), 0, rule, attrStore), attrStore
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_cut_commits_to_the_option(engine):
+    pos, statement = parsed(engine, Statement, "if x;")
+    assert pos == 5
+    assert statement.condition is not None
+
+    # without the cut, "if" is parsed as a word by the second option
+    assert parsed(engine, UncutStatement, "if;")[0] == 3
+    assert parsed(engine, Statement, "if;")[0] is None
+    assert parsed(engine, Statement, "go;")[0] == 3
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_cut_failure_stops_at_the_grammar_class(engine):
+    text = "a; if x; b; if; c;"
+    pos, block = parsed(engine, Block, text)
+    expectedPos, expected = parsed("recursive", Block, text)
+    assert pos == expectedPos == text.index("if;")
+    assert len(block.statement) == 3
+    assert toJson(block) == toJson(expected)
+
+
+@pytest.mark.parametrize("engine", ["recursive", "iterative", "memo"])
+def test_cut_outside_of_a_selection_fails_the_parse(engine):
+    rule = ("a", Cut, "b")
+    assert parseWith(engine, StringText("ab"), 0, rule, SyntaxObject()) == 2
+    assert parseWith(engine, StringText("ac"), 0, rule, SyntaxObject()) is None
+
+
+BLOCK_TEXT = "a; if x; " * 200
+
+
+@pytest.mark.parametrize("engine", ["recursive", "iterative"])
+def test_cuts_commit_the_stream(engine):
+    mytext = PeakStreamText(BLOCK_TEXT)
+    block = Block()
+    assert parse(mytext, 0, Block, block, engine=engine) == len(BLOCK_TEXT)
+    assert toJson(block) == toJson(parsed("recursive", Block, BLOCK_TEXT)[1])
+    assert mytext.peak < 32
+
+    # without cuts nothing is committed
+    mytext = PeakStreamText(BLOCK_TEXT)
+    parse(mytext, 0, UncutBlock, UncutBlock(), engine=engine)
+    assert mytext.peak == len(BLOCK_TEXT)
+
+
+@pytest.mark.parametrize("engine", ["recursive", "iterative"])
+def test_cuts_release_the_memo(engine):
+    memo = PackratMemo()
+    block = Block()
+    assert parse(StringText(BLOCK_TEXT), 0, Block, block, memo, engine) == len(
+        BLOCK_TEXT
+    )
+    assert toJson(block) == toJson(parsed("recursive", Block, BLOCK_TEXT)[1])
+    assert 0 < len(memo) < 8
+    assert min(memo.positions) > len(BLOCK_TEXT) - 20
+
+    # the results of a memo that can reparse edits are kept
+    memo = PackratMemo(trackExtents=True)
+    parse(StringText(BLOCK_TEXT), 0, Block, Block(), memo, engine)
+    assert len(memo) > 400
+
+
+@pytest.mark.parametrize("engine", ["recursive", "iterative"])
+@pytest.mark.parametrize("text", ["mark if x;!", "mark if x;?", "mark go;?"])
+def test_options_before_a_cut_can_still_be_tried(engine, text):
+    marked = Marked()
+    assert parse(PeakStreamText(text), 0, Marked, marked, engine=engine) == len(text)
+    assert toJson(marked) == toJson(parsed("recursive", Marked, text)[1])
+
+
+@pytest.mark.parametrize("engine", ["recursive", "iterative"])
+@pytest.mark.parametrize(
+    "rule, text",
+    [
+        (Declarations, "let abcdefgh; ok " * 10 + "let last; done"),
+        (OptionalDeclaration, "let abcdefgh; ok let last; done"),
+    ],
+)
+def test_failed_items_are_parsed_again_after_a_cut(engine, rule, text):
+    result = rule()
+    assert parse(PeakStreamText(text), 0, rule, result, engine=engine) == len(text)
+    assert toJson(result) == toJson(parsed("recursive", rule, text)[1])
+
+
+@pytest.mark.parametrize("engine", ["recursive", "iterative"])
+def test_saved_texts_that_start_before_a_cut(engine):
+    text = "let abcdefgh;let d;let efghijkl;" * 20
+    mytext = PeakStreamText(text)
+    statements = list(iterParse(mytext, SavedBlock, "statement", engine=engine))
+    assert len(statements) == 60
+    assert [statement.so_savedText for statement in statements[:3]] == [
+        "let abcdefgh;",
+        "let d;",
+        "let efghijkl;",
+    ]
+
+
+@pytest.mark.parametrize("engine", ["recursive", "iterative"])
+def test_cuts_commit_inside_a_streamed_item(engine):
+    text = "[" + "abc," * 300 + "]"
+    mytext = PeakStreamText(text)
+    lists = list(iterParse(mytext, Lists, "list", engine=engine))
+    assert len(lists) == 1
+    assert len(lists[0].element) == 300
+    assert mytext.peak < 32
+
+
+@pytest.mark.parametrize("engine", ["recursive", "iterative"])
+def test_cuts_in_growing_left_recursions(engine):
+    text = "+".join(["ab", "c", "de"] * 10)
+    result = Sum()
+    assert parse(PeakStreamText(text), 0, Sum, result, engine=engine) == len(text)
+    assert toJson(result) == toJson(parsed("recursive", Sum, text)[1])
+    assert parse(PeakStreamText("ab+c+"), 0, Sum, Sum(), engine=engine) == 4
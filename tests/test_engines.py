@@ -0,0 +1,71 @@
+import re
+import pytest
+from pyPars import (
+    SyntaxObject,
+    GrammarClass,
+    K,
+    SelectionFirst,
+    compileGrammar,
+    parse,
+    toJson,
+)
+from pyPars.text.string import StringText
+from .engines import ENGINES, parseWith
+from .grammars import Assignment, Expression, Program, programText
+
+
+class Word(SyntaxObject, metaclass=GrammarClass):
+    grammar = re.compile("[a-z]+")
+
+
+class Call(SyntaxObject, metaclass=GrammarClass):
+    grammar = {"name": Word}, "(", [{"arg": Word}, (",", {"arg": Word}) * K], ")"
+
+
+class Statement(SyntaxObject, metaclass=GrammarClass):
+    grammar = SelectionFirst(({"call": Call}, ";"), ({"word": Word}, ";"))
+
+
+CASES = [
+    (Program, programText(10)),
+    # the last statement is incomplete, the repetition stops before it
+    (Program, "v = 1\nv = a +"),
+    (Assignment, "v = a +\n"),
+    (Expression, "a - 1 * b / 2 + c"),
+    (Statement, "f(a,b);"),
+    (Statement, "f;"),
+    (Statement, "f(a);"),
+    (Statement, "f(a,);"),
+]
+
+
+def expectedResult(rule, text):
+    attrStore = rule()
+    return parse(StringText(text), 0, rule, attrStore), toJson(attrStore)
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+@pytest.mark.parametrize("rule, text", CASES)
+def test_engine_matches_the_recursive_engine(engine, rule, text):
+    attrStore = rule()
+    pos = parseWith(engine, StringText(text), 0, rule, attrStore)
+    assert (pos, toJson(attrStore)) == expectedResult(rule, text)
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_engine_parses_at_an_offset(engine):
+    text = "xx" + programText(2)
+    attrStore = Program()
+    pos = parseWith(engine, StringText(text), 2, Program, attrStore)
+    expected = Program()
+    assert pos == parse(StringText(text), 2, Program, expected) == len(text)
+    assert toJson(attrStore) == toJson(expected)
+
+
+def test_compiled_grammar_is_reusable():
+    grammar = compileGrammar(Program)
+    for count in (0, 1, 5):
+        text = programText(count)
+        attrStore = Program()
+        assert grammar.parse(StringText(text), 0, attrStore) == len(text)
+        assert len(attrStore.stat or []) == count
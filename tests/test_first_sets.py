@@ -0,0 +1,111 @@
+import re
+import threading
+import pytest
+from pyPars import (
+    SyntaxObject,
+    GrammarClass,
+    SelectionFirst,
+    FirstSet,
+    FirstSetAnalysis,
+    parse,
+    toJson,
+)
+from pyPars._first_sets import dispatchTablesFor
+from pyPars.text.bytes import BytesText
+from pyPars.text.string import StringText
+from .grammars import Assignment, Program, programText
+
+
+ENGINES = ["recursive", "iterative"]
+
+
+class Word(SyntaxObject, metaclass=GrammarClass):
+    grammar = re.compile("[a-z]+")
+
+
+class Digit(SyntaxObject, metaclass=GrammarClass):
+    grammar = re.compile("[0-9]")
+
+
+def test_first_sets():
+    analysis = FirstSetAnalysis(StringText)
+    assert analysis.firstSet(Digit) == FirstSet(frozenset("0123456789"), False)
+    assert analysis.firstSet(["x", Digit]).nullable
+    assert analysis.firstSet(re.compile("[^a]")).chars is None
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_parsing_leaves_the_selections_unchanged(engine):
+    selection = SelectionFirst({"word": Word}, {"digit": Digit}, "-")
+    before = dict(vars(selection))
+    assert parse(StringText("7"), 0, selection, engine=engine) == 1
+    assert vars(selection) == before
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_parsing_sees_grammar_changes(engine):
+    class Changed(SyntaxObject, metaclass=GrammarClass):
+        grammar = "a"
+
+    selection = SelectionFirst({"changed": Changed}, {"digit": Digit})
+    assert parse(StringText("b"), 0, selection, engine=engine) is None
+    Changed.grammar = "b"
+    assert parse(StringText("b"), 0, selection, engine=engine) == 1
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_threads_parse_the_same_grammar(engine):
+    text = programText(30)
+    expected = Program()
+    parse(StringText(text), 0, Program, expected)
+    results = []
+
+    def parseProgram():
+        root = Program()
+        parse(StringText(text), 0, Program, root, engine=engine)
+        results.append(toJson(root))
+
+    threads = [threading.Thread(target=parseProgram) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == [toJson(expected)] * 4
+
+
+class Counted(SyntaxObject, metaclass=GrammarClass):
+    grammar = SelectionFirst({"word": Word}, {"digit": Digit})
+
+
+def test_parses_of_a_rule_share_their_tables():
+    tables = dispatchTablesFor(Program, StringText)
+    assert dispatchTablesFor(Program, StringText) is tables
+    assert dispatchTablesFor(Program, BytesText) is not tables
+    # dicts can't be keys of the cache
+    rule = {"word": Word}
+    assert dispatchTablesFor(rule, StringText) is not dispatchTablesFor(
+        rule, StringText
+    )
+
+    parse(StringText(programText(2)), 0, Program)
+    assert len(tables.dispatches) > 0
+    builtCount = len(tables.dispatches)
+    parse(StringText(programText(2)), 0, Program)
+    assert len(tables.dispatches) == builtCount
+
+
+def test_assigned_grammars_renew_the_tables():
+    tables = dispatchTablesFor(Counted, StringText)
+    Counted.grammar = Counted.grammar
+    assert dispatchTablesFor(Counted, StringText) is not tables
+
+
+def test_classes_are_walked_once_their_first_set_is_known():
+    analysis = FirstSetAnalysis(StringText)
+    analysis.firstSet(Program)
+    assert Program in analysis.finalFirstSets
+    walks = []
+    visit = analysis.visit
+    analysis.visit = lambda rule: walks.append(rule) or visit(rule)
+    assert analysis.firstSet(Assignment) == analysis.finalFirstSets[Assignment]
+    assert walks == [Assignment]
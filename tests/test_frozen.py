@@ -0,0 +1,68 @@
+import re
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from pyPars import (
+    SyntaxObject,
+    GrammarClass,
+    PackratMemo,
+    freezeGrammar,
+    parse,
+    toJson,
+)
+from pyPars.text.bytes import BytesText
+from pyPars.text.string import StringText
+from .grammars import Program, programText
+
+
+class Letter(SyntaxObject, metaclass=GrammarClass):
+    grammar = "a"
+
+
+def expectedJson(text, pos=0):
+    expected = Program()
+    parse(StringText(text), pos, Program, expected)
+    return toJson(expected)
+
+
+def test_threads_share_a_frozen_grammar():
+    grammar = freezeGrammar(Program)
+    texts = [programText(count) for count in range(1, 9)]
+
+    def parseText(text):
+        attrStore = Program()
+        memo = PackratMemo()
+        assert grammar.parse(StringText(text), 0, attrStore, memo) == len(text)
+        return toJson(attrStore)
+
+    with ThreadPoolExecutor(8) as executor:
+        results = list(executor.map(parseText, texts * 4))
+    assert results == [expectedJson(text) for text in texts * 4]
+
+
+def test_contexts_can_be_reused():
+    text = "x" + programText(3)
+    context = freezeGrammar(Program).newContext(StringText(text))
+    first = Program()
+    assert context.parse(1, first) == len(text)
+    second = Program()
+    assert context.parse(1, second) == len(text)
+    assert toJson(first) == toJson(second) == expectedJson(text, 1)
+
+
+def test_frozen_grammars_ignore_later_changes():
+    grammar = freezeGrammar(Letter)
+    Letter.grammar = "b"
+    try:
+        assert grammar.parse(StringText("a"), 0) == 1
+        assert grammar.parse(StringText("b"), 0) is None
+    finally:
+        Letter.grammar = "a"
+    with pytest.raises(AttributeError, match="can't be changed"):
+        grammar.rule = Letter
+
+
+def test_texts_must_match_the_frozen_type():
+    grammar = freezeGrammar(Letter)
+    with pytest.raises(TypeError, match="frozen for texts like 'StringText'"):
+        grammar.parse(BytesText(b"a"), 0)
+    assert freezeGrammar(re.compile(b"a"), BytesText).parse(BytesText(b"a"), 0) == 1
@@ -0,0 +1,82 @@
+import gc
+import random
+import weakref
+import pytest
+from pyPars import parse, toJson, PackratMemo, TextEdit
+from pyPars.text.string import StringText
+from .grammars import Program, programText
+
+
+@pytest.mark.parametrize("engine", ["recursive", "iterative"])
+def test_edits_match_a_full_reparse(engine):
+    random.seed(7)
+    text = programText(60)
+    memo = PackratMemo(trackExtents=True)
+    parse(StringText(text), 0, Program, Program(), memo, engine=engine)
+    for _ in range(60):
+        offset = random.randrange(len(text))
+        # long removals span the regions of several earlier edits
+        removedLength = random.choice([0, 1, 2, 3, 12, 40])
+        insertedText = random.choice(["", "x", " + 7", "\n", "9", "q = 1\n"])
+        text = text[:offset] + insertedText + text[offset + removedLength :]
+
+        edited = Program()
+        editedPos = parse(
+            StringText(text),
+            0,
+            Program,
+            edited,
+            memo,
+            engine=engine,
+            edits=[TextEdit(offset, removedLength, insertedText)],
+        )
+        full = Program()
+        assert editedPos == parse(StringText(text), 0, Program, full)
+        assert toJson(edited) == toJson(full)
+
+
+def test_moved_objects_keep_their_saved_text():
+    text = programText(5)
+    memo = PackratMemo(trackExtents=True)
+    previousText = StringText(text)
+    parse(previousText, 0, Program, Program(), memo)
+    previousTextRef = weakref.ref(previousText)
+    del previousText
+
+    newText = "z = 1\n" + text
+    edited = Program()
+    edits = [TextEdit(0, 0, "z = 1\n")]
+    parse(StringText(newText), 0, Program, edited, memo, edits=edits)
+    last = edited.stat[-1]
+    assignee = last.assignee[0]
+    assert assignee.so_span == (last.so_span[0], last.so_span[0] + 2)
+    assert assignee.so_savedText == newText[slice(*assignee.so_span)] == "v4"
+    gc.collect()
+    assert previousTextRef() is None
+
+
+def test_edits_only_move_the_regions_after_them():
+    text = programText(200)
+    memo = PackratMemo(trackExtents=True)
+    program = Program()
+    parse(StringText(text), 0, Program, program, memo)
+    first, middle, last = program.stat[0], program.stat[100], program.stat[-1]
+    firstEntry = memo.entries[(id(type(first)), first.so_span[0])]
+    lastSpan, lastSpanSource = last.so_span, last.so_spanSource
+    offset = middle.so_span[0]
+    # the results at the removed character
+    keptCount = len(memo) - len(memo.positionRules[offset])
+    memo.applyEdits([TextEdit(offset, 1, "long_name")])
+    # the results and the objects are left as they are, their regions moved
+    assert len(memo) == keptCount
+    assert last.so_spanSource is lastSpanSource
+    assert last.so_span == (lastSpan[0] + 8, lastSpan[1] + 8)
+    assert memo.entries[(id(type(first)), first.so_span[0])] is firstEntry
+
+    newText = text[:offset] + "long_name" + text[offset + 1 :]
+    edited = Program()
+    parse(StringText(newText), 0, Program, edited, memo)
+    full = Program()
+    parse(StringText(newText), 0, Program, full)
+    assert toJson(edited) == toJson(full)
+    assert edited.stat[-1] is last
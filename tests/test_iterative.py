@@ -0,0 +1,65 @@
+import pytest
+from pyPars import (
+    SyntaxObject,
+    GrammarClass,
+    PackratMemo,
+    parse,
+    toJson,
+)
+from pyPars.text.string import StringText
+from .grammars import Expression, Program, programText
+
+
+class Nested(SyntaxObject, metaclass=GrammarClass):
+    grammar = None
+
+
+Nested.grammar = "(", [{"inner": Nested}], ")"
+
+
+def depth(nested: Nested) -> int:
+    count = 0
+    while nested is not None:
+        count += 1
+        inner = getattr(nested, "inner", None)
+        nested = inner[0] if inner else None
+    return count
+
+
+@pytest.mark.parametrize("memo", [False, True])
+def test_iterative_matches_recursive(memo):
+    for rule, text in [
+        (Program, programText(10) + "v ="),
+        (Expression, "a * b + c"),
+        (Expression, "1 + 2 * 3 - 4 / 5"),
+    ]:
+        expected = rule()
+        expectedPos = parse(StringText(text), 0, rule, expected)
+        attrStore = rule()
+        pos = parse(
+            StringText(text),
+            0,
+            rule,
+            attrStore,
+            PackratMemo() if memo else None,
+            engine="iterative",
+        )
+        assert pos == expectedPos
+        assert toJson(attrStore) == toJson(expected)
+
+
+def test_nesting_deeper_than_the_recursion_limit():
+    count = 5000
+    text = "(" * count + ")" * count
+    with pytest.raises(RecursionError):
+        parse(StringText(text), 0, Nested, Nested())
+
+    nested = Nested()
+    assert parse(StringText(text), 0, Nested, nested, engine="iterative") == len(text)
+    assert depth(nested) == count
+
+
+def test_unbalanced_nesting_fails():
+    count = 2000
+    text = "(" * count + ")" * (count - 1)
+    assert parse(StringText(text), 0, Nested, Nested(), engine="iterative") is None
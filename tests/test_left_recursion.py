@@ -0,0 +1,99 @@
+import re
+import pytest
+from pyPars import (
+    SyntaxObject,
+    GrammarClass,
+    SelectionFirst,
+    RuleProfiler,
+    parse,
+    toJson,
+)
+from pyPars.text.string import StringText
+from .engines import ENGINES, parseWith
+from .grammars import Id, Num
+
+
+class Sum(SyntaxObject, metaclass=GrammarClass):
+    grammar = None
+
+
+Sum.grammar = SelectionFirst(({"left": Sum}, "+", {"right": Num}), {"num": Num})
+
+
+class Indirect(SyntaxObject, metaclass=GrammarClass):
+    grammar = None
+
+
+class Middle(SyntaxObject, metaclass=GrammarClass):
+    grammar = {"indirect": Indirect}, "z"
+
+
+Indirect.grammar = SelectionFirst(({"middle": Middle}, "y"), {"id": Id})
+
+
+class Lookup(SyntaxObject, metaclass=GrammarClass):
+    grammar = None
+
+
+class Call(SyntaxObject, metaclass=GrammarClass):
+    grammar = None
+
+
+# mutually left recursive: L = P ".x" / Id, P = P "(n)" / L
+Lookup.grammar = SelectionFirst(({"call": Call}, ".x"), {"id": Id})
+Call.grammar = SelectionFirst(({"call": Call}, "(n)"), {"lookup": Lookup})
+
+
+CASES = [
+    (Sum, "1"),
+    (Sum, "1+2+3"),
+    (Sum, "1+2+"),
+    (Indirect, "a"),
+    (Indirect, "azy"),
+    (Indirect, "azyzy"),
+    (Indirect, "azyz"),
+    (Lookup, "a"),
+    (Lookup, "a.x"),
+    (Lookup, "a(n).x"),
+    (Lookup, "a.x(n).x(n)(n).x"),
+    (Call, "a.x(n)(n)"),
+    (Call, "a(n).x"),
+]
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+@pytest.mark.parametrize("rule, text", CASES)
+def test_engines_grow_the_same_trees(engine, rule, text):
+    expected = rule()
+    expectedPos = parse(StringText(text), 0, rule, expected)
+    attrStore = rule()
+    pos = parseWith(engine, StringText(text), 0, rule, attrStore)
+    assert (pos, toJson(attrStore)) == (expectedPos, toJson(expected))
+
+
+def shape(syntaxObject: SyntaxObject) -> str:
+    if isinstance(syntaxObject, Id):
+        return syntaxObject.so_savedText
+    (name,) = syntaxObject.so_grammarAttributeNames
+    inner = shape(getattr(syntaxObject, name)[0])
+    if name == "call":
+        return inner + (".x" if isinstance(syntaxObject, Lookup) else "(n)")
+    return inner
+
+
+@pytest.mark.parametrize("text", ["a", "a.x", "a(n).x", "a.x(n).x(n)(n).x"])
+def test_mutual_recursion_consumes_the_whole_text(text):
+    lookup = Lookup()
+    assert parse(StringText(text), 0, Lookup, lookup) == len(text)
+    assert shape(lookup) == text
+
+
+@pytest.mark.parametrize("engine", ["recursive", "iterative"])
+def test_chains_grow_in_linear_time(engine):
+    for count in (100, 200):
+        text = "+".join(["1"] * count)
+        profiler = RuleProfiler()
+        pos = parse(StringText(text), 0, Sum, Sum(), engine=engine, tracer=profiler)
+        assert pos == len(text)
+        # each number is parsed once, the grown seed is reused
+        assert profiler.stats[Num].calls <= count + 1
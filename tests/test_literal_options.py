@@ -0,0 +1,70 @@
+import re
+import pytest
+from pyPars import (
+    SyntaxObject,
+    GrammarClass,
+    SelectionFirst,
+    SelectionLongest,
+)
+from pyPars._rule_canonize import tryMergeLiteralOptions
+from pyPars.text.bytes import BytesText
+from pyPars.text.string import StringText
+from .engines import ENGINES, parseWith
+
+
+class FirstKeyword(SyntaxObject, metaclass=GrammarClass):
+    grammar = SelectionFirst("a", "ab", "a+b", ".", "(")
+
+
+class LongestKeyword(SyntaxObject, metaclass=GrammarClass):
+    grammar = SelectionLongest("a", "ab", "a+b", ".*", "(")
+
+
+class BytesKeyword(SyntaxObject, metaclass=GrammarClass):
+    grammar = SelectionLongest(b"=", b"==", b"!=")
+
+
+TEXTS = ["a", "ab", "a+b", ".", ".*", "(", "b", "", "+"]
+
+
+def expectedEnd(rule, text):
+    return parseWith("recursive", StringText(text), 0, rule, rule())
+
+
+def test_merged_patterns():
+    pattern = tryMergeLiteralOptions(FirstKeyword.grammar, str, re.Pattern)
+    assert pattern.match("a+b").group() == "a"
+    pattern = tryMergeLiteralOptions(LongestKeyword.grammar, str, re.Pattern)
+    assert pattern.match("a+b").group() == "a+b"
+    assert pattern.match(".*").group() == ".*"
+    pattern = tryMergeLiteralOptions(BytesKeyword.grammar, bytes, re.Pattern)
+    assert pattern.match(b"==").group() == b"=="
+
+
+def test_selections_that_are_not_merged():
+    def merged(rule):
+        return tryMergeLiteralOptions(rule, str, re.Pattern)
+
+    assert merged(SelectionFirst("a", re.compile("b"))) is None
+    assert merged(SelectionFirst("a", ("b", "c"))) is None
+    assert merged(SelectionFirst("a")) is None
+    # equal options are an ambiguity that SelectionLongest has to report
+    assert merged(SelectionLongest("a", "a")) is None
+    assert merged(SelectionFirst("a", "a")) is not None
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+@pytest.mark.parametrize("rule", [FirstKeyword, LongestKeyword])
+def test_engines_match_the_options_in_order(engine, rule):
+    assert expectedEnd(FirstKeyword, "a+b") == 1
+    assert expectedEnd(LongestKeyword, "a+b") == 3
+    for text in TEXTS:
+        pos = parseWith(engine, StringText(text), 0, rule, rule())
+        assert pos == expectedEnd(rule, text), text
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_engines_merge_bytes_literals(engine):
+    for text, end in [(b"==", 2), (b"=", 1), (b"!=", 2), (b"!", None)]:
+        pos = parseWith(engine, BytesText(text), 0, BytesKeyword, BytesKeyword())
+        assert pos == end
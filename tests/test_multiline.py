@@ -0,0 +1,37 @@
+import pytest
+from pyPars import toJson
+from pyPars.text.multiline import MultilineText, MultilinePos
+from pyPars.text.string import StringText
+from .engines import ENGINES, parseWith
+from .grammars import Program, programText
+
+
+def naivePos(text: str, pos: int) -> MultilinePos:
+    before = text[:pos]
+    return MultilinePos(before.count("\n"), pos - (before.rfind("\n") + 1), pos)
+
+
+@pytest.mark.parametrize(
+    "text", ["", "abc", "\n", "a\n\nbc\n", "\n\nx", programText(3)]
+)
+def test_positions_match_a_naive_count(text):
+    mytext = MultilineText(text)
+    for pos in range(len(text) + 1):
+        assert mytext.getMultilinePos(pos) == naivePos(text, pos)
+
+
+def test_lines_are_indexed_on_first_lookup():
+    mytext = MultilineText("a\nb\nc")
+    assert mytext.lineStarts is None
+    assert mytext.getMultilinePos(4) == MultilinePos(2, 0, 4)
+    assert list(mytext.lineStarts) == [0, 2, 4]
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_parses_like_a_string_text(engine):
+    text = programText(5)
+    expected = Program()
+    parseWith("recursive", StringText(text), 0, Program, expected)
+    attrStore = Program()
+    assert parseWith(engine, MultilineText(text), 0, Program, attrStore) == len(text)
+    assert toJson(attrStore) == toJson(expected)
@@ -0,0 +1,172 @@
+import pickle
+import re
+import pytest
+from pyPars import (
+    SyntaxObject,
+    GrammarClass,
+    PackedTree,
+    Selection,
+    K,
+    packTree,
+    parse,
+    syntaxClass,
+    toJson,
+)
+from pyPars.so_modifiers import TextSaver
+from pyPars.text.bytes import BytesText
+from pyPars.text.string import StringText
+from .grammars import Assignment, Id, Program, programText
+
+
+class Word(SyntaxObject, TextSaver, metaclass=GrammarClass):
+    grammar = re.compile("[a-z]+")
+
+
+class Item(SyntaxObject, metaclass=GrammarClass):
+    grammar = Selection({"a": Word}, {"b": Word}), ";"
+
+
+class Items(SyntaxObject, metaclass=GrammarClass):
+    grammar = {"item": Item} * K
+
+
+class BytesWord(SyntaxObject, TextSaver, metaclass=GrammarClass):
+    grammar = re.compile(b"[a-z]+")
+
+
+def parsedProgram(text):
+    mytext = StringText(text)
+    program = Program()
+    assert parse(mytext, 0, Program, program) == len(text)
+    return mytext, program
+
+
+def test_packed_trees_build_the_same_tree():
+    mytext, program = parsedProgram(programText(10))
+    tree = packTree(program)
+    assert tree.source is mytext
+    assert toJson(tree.root()) == toJson(program)
+    assert tree.root() is tree.root()
+
+
+def test_nodes_are_read_without_building_them():
+    text = programText(3)
+    _, program = parsedProgram(text)
+    tree = packTree(program)
+    assignments = list(tree.iterNodes(Assignment))
+    assert len(assignments) == 3
+    assert tree.nodeSpan(assignments[1]) == program.stat[1].so_span
+    names = [
+        tree.nodeText(target)
+        for name, target in tree.iterEdges(assignments[2])
+        if name == "assignee"
+    ]
+    assert names == ["v2"]
+    assert tree.nodeClass(next(tree.iterNodes(Id))) is Id
+    assert tree.builtNodes == {}
+
+    # building a subtree leaves the rest of the tree packed
+    assignment = tree.build(assignments[0])
+    assert toJson(assignment) == toJson(program.stat[0])
+    assert 0 not in tree.builtNodes
+
+
+def test_objects_are_built_when_their_attributes_are_read():
+    _, program = parsedProgram(programText(3))
+    tree = packTree(program)
+    root = tree.root()
+    assert list(tree.builtNodes) == [0]
+    assert isinstance(root, Program)
+
+    statements = root.stat
+    assert syntaxClass(root) is Program
+    assert len(tree.builtNodes) == 4
+    assert len(tree.unfilledNodes) == 3
+    assert toJson(statements[1]) == toJson(program.stat[1])
+    assert len(tree.unfilledNodes) < len(tree) - 4
+
+
+def test_decoded_trees_can_be_encoded_again():
+    _, program = parsedProgram(programText(5))
+    tree = pickle.loads(pickle.dumps(packTree(program)))
+    assert isinstance(tree.source, str)
+    tree = pickle.loads(pickle.dumps(tree))
+    assert toJson(tree.root()) == toJson(program)
+
+
+@pytest.mark.parametrize("source", ["hello", b"hello", bytearray(b"hello")])
+def test_raw_sources(source):
+    tree = PackedTree(source)
+    tree.classes = [Word]
+    tree.nodeClasses.append(0)
+    tree.textStarts.append(0)
+    tree.textEnds.append(5)
+    tree.spanStarts.append(-1)
+    tree.spanEnds.append(-1)
+    tree.edgeOffsets.append(0)
+    tree.groupOffsets.append(0)
+    decoded = PackedTree.fromBytes(tree.toBytes(includeSource=True))
+    assert decoded.root().so_savedText == source
+
+
+def test_invalid_sources():
+    tree = PackedTree(["not", "a", "text"])
+    with pytest.raises(TypeError, match="can't be stored"):
+        tree.toBytes(includeSource=True)
+
+
+@pytest.mark.parametrize("includeSource", [False, True])
+def test_bytes_round_trip(includeSource):
+    text = programText(10)
+    mytext, program = parsedProgram(text)
+    # a read text is stored in the tree instead of its span
+    program.stat[0].assignee[0].so_savedText = "renamed"
+    data = packTree(program).toBytes(includeSource)
+
+    if includeSource:
+        decoded = PackedTree.fromBytes(data)
+    else:
+        decoded = PackedTree.fromBytes(data, mytext)
+    expected = toJson(program)
+    assert toJson(decoded.root()) == expected
+    assert '"renamed"' in expected
+
+
+def test_pickled_trees_include_the_source():
+    _, program = parsedProgram(programText(5))
+    tree = pickle.loads(pickle.dumps(packTree(program)))
+    assert toJson(tree.root()) == toJson(program)
+
+
+def test_bytes_sources():
+    mytext = BytesText(b"hello")
+    root = SyntaxObject()
+    parse(mytext, 0, {"word": BytesWord}, root)
+    tree = PackedTree.fromBytes(packTree(root).toBytes(includeSource=True))
+    assert tree.root().word[0].so_savedText == b"hello"
+
+
+def test_option_groups_stay_shared():
+    items = Items()
+    parse(StringText("x;y;z;"), 0, Items, items)
+    tree = PackedTree.fromBytes(packTree(items).toBytes(includeSource=True))
+    root = tree.root()
+    assert root.countTrees() == items.countTrees() == 8
+    assert sorted(map(toJson, root.iterTrees())) == sorted(
+        map(toJson, items.iterTrees())
+    )
+
+
+def test_invalid_trees():
+    with pytest.raises(ValueError, match="isn't an encoded PackedTree"):
+        PackedTree.fromBytes(b"not a tree")
+    with pytest.raises(TypeError, match="Only SyntaxObjects"):
+        root = SyntaxObject()
+        root.extendGrammarAttribute("value", ["text"])
+        packTree(root)
+
+    class Local(SyntaxObject, metaclass=GrammarClass):
+        grammar = "a"
+
+    with pytest.raises(ValueError, match="can't be imported"):
+        packTree(Local()).toBytes()
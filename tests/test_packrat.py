@@ -0,0 +1,63 @@
+import re
+import pytest
+from pyPars import (
+    SyntaxObject,
+    GrammarClass,
+    SelectionFirst,
+    PackratMemo,
+    parse,
+    toJson,
+)
+from pyPars.text.string import StringText
+from .grammars import Program, programText
+
+
+class Word(SyntaxObject, metaclass=GrammarClass):
+    grammar = re.compile("[a-z]+")
+
+
+class Statement(SyntaxObject, metaclass=GrammarClass):
+    # both options start with the same attribute, which the memo parses once
+    grammar = SelectionFirst(({"word": Word}, "!"), ({"word": Word}, "?"))
+
+
+@pytest.mark.parametrize("engine", ["recursive", "iterative"])
+def test_memo_gives_the_same_result(engine):
+    text = programText(20)
+    expected = Program()
+    expectedPos = parse(StringText(text), 0, Program, expected)
+
+    memo = PackratMemo()
+    memoized = Program()
+    assert parse(StringText(text), 0, Program, memoized, memo, engine) == expectedPos
+    assert toJson(memoized) == toJson(expected)
+    assert len(memo) > 0
+
+
+def test_memo_reuses_results():
+    memo = PackratMemo()
+    statement = Statement()
+    assert parse(StringText("hello?"), 0, Statement, statement, memo) == 6
+    assert memo.hits == 1
+    assert len(statement.word) == 1
+
+
+@pytest.mark.parametrize("eviction", PackratMemo.EVICTION_POLICIES)
+def test_bounded_memo(eviction):
+    text = programText(10)
+    expected = Program()
+    parse(StringText(text), 0, Program, expected)
+
+    memo = PackratMemo(maxEntries=5, eviction=eviction)
+    bounded = Program()
+    assert parse(StringText(text), 0, Program, bounded, memo) == len(text)
+    assert len(memo) <= 5
+    assert memo.evictions > 0
+    assert toJson(bounded) == toJson(expected)
+
+
+def test_invalid_memo_settings():
+    with pytest.raises(ValueError):
+        PackratMemo(eviction="random")
+    with pytest.raises(ValueError):
+        PackratMemo(maxEntries=0)
@@ -0,0 +1,109 @@
+import io
+import os
+import re
+import subprocess
+import sys
+import pytest
+from pyPars import (
+    ParseCache,
+    grammarFingerprint,
+    parse,
+    toJson,
+)
+from pyPars.text.stream import StreamText
+from pyPars.text.string import StringText
+from .grammars import Assignment, Program, programText
+
+
+# built the same way in another process to compare the fingerprints
+RULE_SOURCE = """
+import re
+from pyPars import SelectionFirst, Cut, K
+rule = SelectionFirst("a", re.compile("b+", re.I), ("c", ["d"], Cut), "e" * K)
+"""
+
+
+def expectedResult(text, rule=Program):
+    expected = rule()
+    return parse(StringText(text), 0, rule, expected), toJson(expected)
+
+
+def cachedResult(cache, text, rule=Program):
+    attrStore = rule()
+    return cache.parse(StringText(text), 0, rule, attrStore), toJson(attrStore)
+
+
+def test_cached_trees_are_reused(tmp_path):
+    text = programText(10)
+    cache = ParseCache(tmp_path)
+    assert cachedResult(cache, text) == expectedResult(text)
+    assert (cache.hits, cache.misses) == (0, 1)
+
+    # shared with other caches of the same directory
+    cache = ParseCache(tmp_path)
+    assert cachedResult(cache, text) == expectedResult(text)
+    failed = "v = a +\n"
+    assert cachedResult(cache, failed, Assignment) == expectedResult(failed, Assignment)
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert cachedResult(cache, failed, Assignment) == expectedResult(failed, Assignment)
+    assert (cache.hits, cache.misses) == (2, 1)
+
+
+def test_changed_texts_and_grammars_miss(tmp_path):
+    cache = ParseCache(tmp_path)
+    text = programText(3)
+    cachedResult(cache, text)
+    cachedResult(cache, text.replace("a", "x"))
+    cachedResult(cache, text, Assignment)
+    assert (cache.hits, cache.misses) == (0, 3)
+    assert len(cache.entries()) == 3
+
+
+def test_fingerprints_are_stable():
+    namespace = {}
+    exec(RULE_SOURCE, namespace)
+    fingerprint = grammarFingerprint(namespace["rule"])
+
+    script = RULE_SOURCE + "from pyPars import grammarFingerprint\n"
+    script += "print(grammarFingerprint(rule))\n"
+    output = subprocess.run(
+        [sys.executable, "-c", script],
+        capture_output=True,
+        check=True,
+        text=True,
+        env=dict(os.environ, PYTHONHASHSEED="1"),
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    ).stdout
+    assert output.strip() == fingerprint
+
+    assert grammarFingerprint(Program) == grammarFingerprint(Program)
+    exec(RULE_SOURCE.replace('"e"', '"f"'), namespace)
+    assert grammarFingerprint(namespace["rule"]) != fingerprint
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    texts = [programText(3).replace("a", letter) for letter in "xyz"]
+    cache = ParseCache(tmp_path)
+    cachedResult(cache, texts[0])
+    entrySize = cache.size()
+    cache.maxSize = entrySize * 5 // 2
+    cachedResult(cache, texts[1])
+    # reading the first entry makes the second one the least recently used
+    cachedResult(cache, texts[0])
+    cachedResult(cache, texts[2])
+    assert len(cache.entries()) == 2
+
+    cache.hits = cache.misses = 0
+    assert cachedResult(cache, texts[0]) == expectedResult(texts[0])
+    assert cachedResult(cache, texts[2]) == expectedResult(texts[2])
+    assert (cache.hits, cache.misses) == (2, 0)
+    cachedResult(cache, texts[1])
+    assert cache.misses == 1
+
+    cache.clear()
+    assert cache.entries() == []
+
+
+def test_streams_cant_be_cached(tmp_path):
+    with pytest.raises(TypeError, match="don't keep their content"):
+        ParseCache(tmp_path).parse(StreamText(io.StringIO("v = a\n")), 0, Program)
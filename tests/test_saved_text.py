@@ -0,0 +1,81 @@
+import io
+import pickle
+import re
+from pyPars import SyntaxObject, GrammarClass, parse, toJson
+from pyPars.so_modifiers import TextSaver
+from pyPars.text.stream import StreamText
+from pyPars.text.string import StringText
+from .grammars import Program, programText
+
+
+class CountingText(StringText):
+    def __init__(self, text: str) -> None:
+        super().__init__(text)
+        self.slices = 0
+
+    def __getitem__(self, pos):
+        if isinstance(pos, slice):
+            self.slices += 1
+        return super().__getitem__(pos)
+
+
+class Word(SyntaxObject, TextSaver, metaclass=GrammarClass):
+    grammar = re.compile("[a-z]+")
+
+
+class UncachedWord(SyntaxObject, TextSaver, metaclass=GrammarClass):
+    grammar = re.compile("[a-z]+")
+    so_cacheSavedText = False
+
+
+def parseWord(mytext, pos, wordClass=Word):
+    # the modifiers apply to the objects stored in attributes
+    attrStore = SyntaxObject()
+    assert parse(mytext, pos, {"word": wordClass}, attrStore) is not None
+    return attrStore.word[0]
+
+
+def test_text_is_sliced_on_first_read():
+    mytext = CountingText("  hello")
+    word = parseWord(mytext, 2)
+    assert mytext.slices == 0
+    assert word.so_textSource == (mytext, 2, 7)
+
+    assert word.so_savedText == "hello"
+    assert word.so_savedText == "hello"
+    assert mytext.slices == 1
+    assert word.so_textSource is None
+
+
+def test_uncached_text_is_sliced_on_every_read():
+    mytext = CountingText("hello")
+    word = parseWord(mytext, 0, UncachedWord)
+    assert word.so_savedText == word.so_savedText == "hello"
+    assert mytext.slices == 2
+    assert word.so_textCache is None
+
+
+def test_assigned_text_replaces_the_source():
+    word = parseWord(StringText("hello"), 0)
+    word.so_savedText = "bye"
+    assert word.so_textSource is None
+    assert word.so_savedText == "bye"
+
+
+def test_stream_texts_are_saved_right_away():
+    word = parseWord(StreamText(io.StringIO("hello")), 0)
+    assert word.so_textSource is None
+    assert word.so_textCache == "hello"
+
+
+def test_pickles_store_the_slices_only():
+    text = programText(5)
+    program = Program()
+    parse(StringText(text), 0, Program, program)
+    assert program.stat[0].assignee[0].so_textSource is not None
+
+    data = pickle.dumps(program)
+    assert text not in data.decode("latin-1")
+    copy = pickle.loads(data)
+    assert copy.stat[0].assignee[0].so_textSource is None
+    assert toJson(copy) == toJson(program)
@@ -0,0 +1,93 @@
+import io
+import json
+import re
+import pytest
+from pyPars import (
+    SyntaxObject,
+    GrammarClass,
+    K,
+    parse,
+    toJson,
+    toTuple,
+    writeJson,
+)
+from pyPars.so_modifiers import TextSaver, SpanSaver
+from pyPars.text.string import StringText
+from .grammars import Program, programText
+
+
+class Word(SyntaxObject, TextSaver, metaclass=GrammarClass):
+    grammar = re.compile("[^ ]+")
+
+    def _dict_extractor(self) -> dict:
+        return {"length": len(self.so_savedText)}
+
+
+class Words(SyntaxObject, SpanSaver, metaclass=GrammarClass):
+    grammar = {"word": Word}, (" ", {"word": Word}) * K
+
+
+class Nested(SyntaxObject, metaclass=GrammarClass):
+    grammar = None
+
+
+Nested.grammar = "(", [{"inner": Nested}], ")"
+
+
+def dictJson(syntaxObject: SyntaxObject) -> str:
+    return json.dumps(syntaxObject.__dict__(), default=lambda o: o.__dict__())
+
+
+def parsed(rule, text, engine="recursive"):
+    attrStore = rule() if isinstance(rule, GrammarClass) else SyntaxObject()
+    assert parse(StringText(text), 0, rule, attrStore, engine=engine) == len(text)
+    return attrStore
+
+
+@pytest.mark.parametrize(
+    "rule, text",
+    [
+        (Program, programText(10)),
+        (Program, ""),
+        (Words, 'plain "quoted" back\\slash tab\there été 😀 \x00'),
+    ],
+)
+def test_json_matches_the_dict_method(rule, text):
+    syntaxObject = parsed(rule, text)
+    assert toJson(syntaxObject) == dictJson(syntaxObject)
+
+
+@pytest.mark.parametrize("bufferSize", [1, 10, 1 << 16])
+def test_written_json_matches_to_json(bufferSize):
+    program = parsed(Program, programText(20))
+    output = io.StringIO()
+    writeJson(program, output, bufferSize)
+    assert output.getvalue() == toJson(program)
+
+
+def test_deep_trees_are_serialized_iteratively():
+    count = 5000
+    nested = parsed(Nested, "(" * count + ")" * count, engine="iterative")
+    text = toJson(nested)
+    assert text.count('"<class>": "Nested"') == count
+    assert text.startswith('{"<class>": "Nested", "inner": [{"<class>": "Nested"')
+
+    depth = 0
+    current = toTuple(nested)
+    while len(current[3]) > 0:
+        [(name, (current,))] = current[3]
+        assert name == "inner"
+        depth += 1
+    assert depth == count - 1
+
+
+def test_tuples():
+    # the modifiers apply to the objects stored in attributes
+    root = parsed({"words": Words}, "ab c")
+    assert toTuple(root.words[0]) == (
+        "Words",
+        None,
+        (0, 4),
+        (("word", (("Word", "ab", None, ()), ("Word", "c", None, ()))),),
+    )
+    assert hash(toTuple(parsed(Program, programText(3))))
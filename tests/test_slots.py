@@ -0,0 +1,106 @@
+import pickle
+import re
+import pytest
+from pyPars import SyntaxObject, GrammarClass, parse, toJson, packTree
+from pyPars.so_modifiers import TextSaver, SpanSaver
+from pyPars.text.string import StringText
+
+
+class Letter(SyntaxObject, TextSaver, metaclass=GrammarClass):
+    grammar = re.compile("[a-z]")
+
+
+class First(SyntaxObject, TextSaver, metaclass=GrammarClass):
+    grammar = {"first": Letter}
+
+
+class Second(SyntaxObject, SpanSaver, metaclass=GrammarClass):
+    grammar = {"second": Letter}
+
+
+class LooseSecond(SyntaxObject, SpanSaver, metaclass=GrammarClass, slots=False):
+    grammar = {"second": Letter}
+
+
+class Both(First, LooseSecond):
+    grammar = {"first": Letter}, {"second": Letter}
+
+
+class Root(SyntaxObject, metaclass=GrammarClass):
+    grammar = {"both": Both}
+
+
+def test_attributes_get_slots():
+    assert "first" in First.__slots__
+    assert First.so_attributeSlots == ("first",)
+    with pytest.raises(AttributeError):
+        First().unknown = 1
+
+
+def test_conflicting_slotted_bases_raise_a_clear_error():
+    with pytest.raises(TypeError, match="slots=False"):
+
+        class Conflict(First, Second):
+            grammar = {"first": Letter}, {"second": Letter}
+
+
+def test_slots_false_bases_can_be_combined():
+    assert LooseSecond.so_attributeSlots == ("second",)
+    assert Both.so_attributeSlots == ("first", "second")
+
+    root = Root()
+    assert parse(StringText("ab"), 0, Root, root) == 2
+    both = root.both[0]
+    assert both.so_savedText == "ab"
+    assert both.so_span == (0, 2)
+    assert both.first[0].so_savedText == "a"
+    assert both.second[0].so_savedText == "b"
+    assert both.__dict__()["<class>"] == "Both"
+
+
+def test_slots_false_objects_round_trip():
+    root = Root()
+    parse(StringText("ab"), 0, Root, root)
+    expected = toJson(root)
+    assert toJson(pickle.loads(pickle.dumps(root))) == expected
+    assert toJson(packTree(root).root()) == expected
+
+    loose = LooseSecond()
+    loose.extendGrammarAttribute("second", [Letter()])
+    loose.so_span = (1, 2)
+    copied = pickle.loads(pickle.dumps(loose))
+    assert copied.so_span == (1, 2)
+    assert len(copied.second) == 1
+
+
+class Plain(SyntaxObject):
+    pass
+
+
+class PlainLetter(Letter):
+    pass
+
+
+class CustomDict(SyntaxObject):
+    def __dict__(self):
+        return {"custom": True}
+
+
+class PlainCustomDict(CustomDict):
+    pass
+
+
+def test_classes_with_an_instance_dict_keep_the_dict_method():
+    plain = Plain()
+    plain.extra = 1
+    assert plain.__dict__() == {"<class>": "Plain"}
+    assert PlainLetter().__dict__() == {"<class>": "PlainLetter", "<text>": None}
+    assert PlainCustomDict().__dict__() == {"custom": True}
+
+
+def test_attribute_names_are_not_arguments():
+    for names in (set(), {"first"}, ["first"]):
+        with pytest.raises(TypeError, match="not attribute names"):
+            SyntaxObject(names)
+    option = Plain()
+    assert SyntaxObject([option]).so_options == [(option,)]
@@ -0,0 +1,54 @@
+import io
+import pytest
+from pyPars import toJson
+from pyPars.text.stream import StreamText
+from pyPars.text.string import StringText
+from .engines import ENGINES, parseWith
+from .grammars import Assignment, Program, programText
+
+
+def chunked(text: str, size: int) -> list[str]:
+    return [text[start : start + size] for start in range(0, len(text), size)]
+
+
+def expectedResult(text, rule=Program):
+    expected = rule()
+    return parseWith("recursive", StringText(text), 0, rule, expected), toJson(expected)
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+@pytest.mark.parametrize("size", [1, 7, 1 << 16])
+def test_parses_like_a_string_text(engine, size):
+    text = programText(8) + "v = a +"
+    for mytext in [
+        StreamText(io.StringIO(text), chunkSize=size, readAhead=3),
+        StreamText(chunked(text, size), chunkSize=size, readAhead=3),
+    ]:
+        attrStore = Program()
+        pos = parseWith(engine, mytext, 0, Program, attrStore)
+        assert (pos, toJson(attrStore)) == expectedResult(text)
+
+
+def test_matches_read_past_the_read_ahead():
+    name = "x" * 1000
+    text = f"{name} = {name}\n"
+    mytext = StreamText(chunked(text, 10), chunkSize=10, readAhead=4)
+    assignment = Assignment()
+    assert parseWith("recursive", mytext, 0, Assignment, assignment) == len(text)
+    assert assignment.assignee[0].so_savedText == name
+    assert assignment.value[0].so_savedText == name
+
+
+def test_committed_text_is_dropped():
+    text = "abcdefghij" * 10
+    mytext = StreamText(chunked(text, 10), chunkSize=10, readAhead=4)
+    assert mytext[45:55] == text[45:55]
+    mytext.commit(50)
+    assert mytext.bufferStart == 50
+    assert mytext[50] == text[50]
+    assert mytext.startswith("abc", 60).span == (60, 63)
+    with pytest.raises(ValueError, match="already committed"):
+        mytext[49]
+    # small commits don't copy the window
+    mytext.commit(55)
+    assert mytext.bufferStart == 50
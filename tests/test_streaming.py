@@ -0,0 +1,53 @@
+import pytest
+from pyPars import SyntaxObject, GrammarClass, K, iterParse, parse, toJson
+from pyPars.text.stream import StreamText
+from pyPars.text.string import StringText
+from .grammars import Assignment, NL, Program, programText
+
+
+class Statements(SyntaxObject, metaclass=GrammarClass):
+    grammar = ({"stat": Assignment} / NL) + K
+
+
+def consume(generator) -> tuple[list, object]:
+    items = []
+    while True:
+        try:
+            items.append(next(generator))
+        except StopIteration as stop:
+            return items, stop.value
+
+
+def expectedItems(text, rule=Program):
+    expected = rule()
+    pos = parse(StringText(text), 0, rule, expected)
+    return list(map(toJson, expected.stat or [])), pos
+
+
+@pytest.mark.parametrize("engine", ["recursive", "iterative"])
+def test_yields_the_items_of_a_full_parse(engine):
+    for text in [programText(10), programText(3) + "v = 1 +", ""]:
+        generator = iterParse(StringText(text), Program, "stat", engine=engine)
+        items, pos = consume(generator)
+        assert (list(map(toJson, items)), pos) == expectedItems(text)
+
+
+def test_one_or_more_needs_an_item():
+    assert consume(iterParse(StringText("v ="), Statements, "stat")) == ([], None)
+    text = programText(2)
+    items, pos = consume(iterParse(StringText(text), Statements, "stat"))
+    assert (list(map(toJson, items)), pos) == expectedItems(text, Statements)
+
+
+def test_stream_window_stays_bounded():
+    count = 500
+    chunks = (programText(1).replace("v0", f"v{i}") for i in range(count))
+    mytext = StreamText(chunks, chunkSize=256, readAhead=64)
+    largestWindow = 0
+    itemCount = 0
+    for item in iterParse(mytext, Program, "stat"):
+        largestWindow = max(largestWindow, len(mytext.buffer))
+        assert item.assignee[0].so_savedText == f"v{itemCount}"
+        itemCount += 1
+    assert itemCount == count
+    assert largestWindow < 1024
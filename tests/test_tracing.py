@@ -0,0 +1,87 @@
+import pytest
+from pyPars import (
+    ParseTracer,
+    PackratMemo,
+    RuleProfiler,
+    SelectionFirst,
+    parse,
+    toJson,
+)
+from pyPars.text.string import StringText
+from .grammars import Assignment, Expression, Id, Program, programText
+
+
+class RecordingTracer(ParseTracer):
+    def __init__(self) -> None:
+        self.events = []
+
+    def enterRule(self, rule, pos):
+        self.events.append(("enter", rule, pos))
+
+    def exitRule(self, rule, pos, endPos):
+        self.events.append(("exit", rule, pos, endPos))
+
+
+@pytest.mark.parametrize("engine", ["recursive", "iterative"])
+def test_tracing_doesnt_change_the_result(engine):
+    text = programText(5)
+    expected = Program()
+    parse(StringText(text), 0, Program, expected)
+
+    tracer = RecordingTracer()
+    traced = Program()
+    assert parse(StringText(text), 0, Program, traced, engine=engine, tracer=tracer)
+    assert toJson(traced) == toJson(expected)
+
+    # every entered rule exits at the position it was entered at
+    stack = []
+    for event in tracer.events:
+        if event[0] == "enter":
+            stack.append(event[1:])
+        else:
+            assert stack.pop() == event[1:3]
+    assert stack == []
+    assert tracer.events[0] == ("enter", Program, 0)
+    assert tracer.events[-1] == ("exit", Program, 0, len(text))
+
+
+@pytest.mark.parametrize("engine", ["recursive", "iterative"])
+def test_profiler_counts_the_rules(engine):
+    profiler = RuleProfiler()
+    text = "v = a + 1\nw = b\nx =\n"
+    parse(StringText(text), 0, Program, Program(), engine=engine, tracer=profiler)
+
+    assignment = profiler.stats[Assignment]
+    assert (assignment.calls, assignment.successes, assignment.failures) == (3, 2, 1)
+    assert profiler.stats[Id].successes >= 4
+    assert profiler.stats[Expression].growthIterations > 0
+    assert profiler.stats[Program].backtracks > 0
+    for stats in profiler.stats.values():
+        assert stats.calls == stats.successes + stats.failures
+        assert 0 <= stats.selfTime <= stats.totalTime + 1e-9
+
+
+def test_profiler_counts_memo_hits_and_sums_parses():
+    profiler = RuleProfiler()
+    # both options start with an Id, the memo parses it once
+    rule = SelectionFirst(({"id": Id}, "!"), ({"id": Id}, "?"))
+    for _ in range(2):
+        parse(StringText("abc?"), 0, rule, None, PackratMemo(), tracer=profiler)
+    assert profiler.stats[Id].calls == 2
+    assert profiler.stats[Id].memoHits == 2
+
+
+def test_report_ranks_the_rules():
+    profiler = RuleProfiler()
+    parse(StringText(programText(3)), 0, Program, Program(), tracer=profiler)
+    ranking = profiler.ranking("calls")
+    assert [stats.calls for stats in ranking] == sorted(
+        (stats.calls for stats in ranking), reverse=True
+    )
+    lines = profiler.report("calls", limit=2).splitlines()
+    assert lines[0].split()[:2] == ["rule", "calls"]
+    assert len(lines) == 3
+    assert lines[1].split()[0] == ranking[0].getName()
+
+    with pytest.raises(ValueError, match="Unknown sort key"):
+        profiler.ranking("name")